@@ -1,11 +1,26 @@
 import sys
 import logging
-import sqlite3
-from PySide6.QtCore import Qt
-from PySide6.QtWidgets import QApplication, QMainWindow, QMessageBox, QTableWidgetItem
-from ui_setup import setup_ui
-from database_operations import switch_database, populate_database_list
-from sql_execution import execute_sql, text
+import time
+from PySide6.QtCore import Qt, QThreadPool, QTimer
+from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QApplication, QMainWindow, QMessageBox, QFileDialog, QInputDialog, QPlainTextEdit, QTableView
+from ui_setup import setup_ui, create_result_view
+from database_operations import switch_database, populate_database_list, fill_database_list, fill_tables_list
+from engine_registry import EngineRegistry
+from row_counts import SqlServerRowCountProvider, RowCountWorker
+from metadata_cache import MetadataCache, MetadataRefreshWorker, fetch_columns, is_ddl_statement
+from sql_execution import create_query_worker, display_result, append_result, FanOutWorker
+from fan_out import DEFAULT_FAN_OUT_WORKERS
+from fan_out_panel import FanOutDialog, FAN_OUT_MERGE_INTERVAL_MS
+from result_cache import ResultCache, CachedResult, result_key
+from export import ExportWorker, EXPORT_FORMATS
+from data_transfer import CloneTableWorker, parse_table_name
+from result_model import resize_columns_to_sample
+from column_store import ResultColumns
+from instrumentation import instrumentation
+from query_history import QueryHistory
+from local_store import LocalStore, EditorState, parse_editor_state
+from startup import start_import_warm_up
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -16,6 +31,11 @@ class SQLManagementStudioPro(QMainWindow):
         self.setWindowTitle("SQL Server Management Studio PRO")
         self.setGeometry(100, 100, 800, 600)
         
+        # One connection to SQL_Pro_data.db for the whole app; opening it applies pending schema migrations
+        self.local_store = LocalStore()
+        # Every executed query is appended to the local history by a background writer
+        self.query_history = QueryHistory(self.local_store)
+
         # Setup UI
         self.ui = setup_ui(self)
         
@@ -23,146 +43,212 @@ class SQLManagementStudioPro(QMainWindow):
         self.status_bar = self.statusBar()
         self.status_bar.showMessage("Enter server and database details to connect.")
         
-        # Initialize the engine attribute
+        # Initialize the engine attribute; engines are pooled per server/database by the registry
         self.engine = None
+        self.engine_registry = EngineRegistry()
+        self.current_server = None
+        self.current_database = None
         logging.info("Initialized SQLManagementStudioPro with no engine.")
+
+        # Queries run on the thread pool; the timer refreshes elapsed time while one is running
+        self.thread_pool = QThreadPool.globalInstance()
+        self.query_worker = None
+        self.query_fetching = False
+        self.query_rows_fetched = 0
+        # Result set number -> view for the running script; the first result set goes to query_view
+        self.query_result_views = {}
+        self.script_tabs = []
+        self.messages_view = None
+        self.query_timer = QTimer(self)
+        self.query_timer.setInterval(100)
+        self.query_timer.timeout.connect(self.update_query_progress)
+        self.query_view = None
+        self.query_cache_key = None
+        self.query_table = None
+        self.query_target = None
+        self.export_worker = None
+        self.transfer_worker = None
+        self.transfer_target_database = None
+        # Fan-out queries share one pool per server and switch databases with USE, so running on
+        # hundreds of databases never holds more connections than there are workers
+        self.fan_out_registry = EngineRegistry(use_database_switch=True)
+        self.fan_out_worker = None
+        self.fan_out_view = None
+        self.fan_out_pending = []
+        self.fan_out_merge_timer = QTimer(self)
+        self.fan_out_merge_timer.setSingleShot(True)
+        self.fan_out_merge_timer.setInterval(FAN_OUT_MERGE_INTERVAL_MS)
+        self.fan_out_merge_timer.timeout.connect(self.flush_fan_out_results)
+        self.fan_out_selection = {}
+        self.fan_out_workers = DEFAULT_FAN_OUT_WORKERS
+
+        # Results are cached per server/database/SQL and shown in one tab per table
+        self.result_cache = ResultCache()
+        self.result_cache.on_evict = self.on_result_evicted
+        self.current_table = None
+        self.result_tabs = {None: self.ui.output_table}
+        self.tab_result_keys = {}
+        self.ui.output_table.model().fetch_more_handler = self.load_more_rows
+        self.ui.output_tabs.currentChanged.connect(self.on_output_tab_changed)
+        self.ui.output_tabs.tabCloseRequested.connect(self.close_result_tab)
         
-        # Check and create the SQLite database and table
-        self.check_and_create_database()
+        self.metadata_cache = MetadataCache(self.local_store)
+        self.metadata_workers = {}
 
-        # Fetch and populate server list
-        self.fetch_and_populate_server_list()
+        # Row counts come from partition stats; swap the provider to run against another backend
+        self.row_count_provider = SqlServerRowCountProvider()
+        self.row_count_key = None
+        self.row_count_workers = {}
+        self.ui.info_label.linkActivated.connect(self.count_rows_exactly)
 
-        # Connect the textChanged signal to the on_text_changed method
-        self.ui.sql_input.textChanged.connect(self.on_text_changed)
-    
-    def on_text_changed(self):
-        self.ui.formatter.format_text(self.ui.sql_input)
+        # Runs once the event loop has started, so the window paints before any further work
+        QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        self.fetch_and_populate_server_list()
+        start_import_warm_up()
     
-    def check_and_create_database(self):
-        db_name = 'SQL_Pro_data.db'
-        conn = sqlite3.connect(db_name)
-        cursor = conn.cursor()
-        
-        # Create queries table if it doesn't exist
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS queries (
-                dbName TEXT(100),
-                tableName TEXT(100),
-                query TEXT,
-                UNIQUE(dbName, tableName)
-            )
-        ''')
-
-        # Create serverList table if it doesn't exist
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS serverList (
-                serverName TEXT PRIMARY KEY
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        logging.info(f"Database '{db_name}' checked and table 'queries' created if it didn't exist.")
+    def closeEvent(self, event):
+        # A worker waiting for "Load more" would otherwise keep the thread pool alive on exit
+        self.release_query_worker()
+        if self.export_worker:
+            self.export_worker.cancel()
+        if self.transfer_worker:
+            self.transfer_worker.cancel()
+        if self.fan_out_worker:
+            self.fan_out_worker.cancel()
+        self.engine_registry.dispose_all()
+        self.fan_out_registry.dispose_all()
+        # Flushes the entries still waiting for the history writer
+        self.query_history.close()
+        self.autosave_query()
+        self.local_store.close()
+        super().closeEvent(event)
 
     def fetch_and_populate_server_list(self):
-        db_name = 'SQL_Pro_data.db'
-        conn = sqlite3.connect(db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT serverName FROM serverList')
-        servers = cursor.fetchall()
-        
-        conn.close()
-        
-        logging.info(servers)
-        # Extract the first element from each tuple
-        server_names = [str(server)[2:-3] for server in servers if server]  # Ensure no empty strings are added
-        logging.info(server_names)
+        server_names = self.local_store.get_servers()
         self.ui.server_input.addItems(server_names)
-        logging.info("Server list populated from database.")
+        logging.info(f"Server list populated with {len(server_names)} servers.")
+
+
+    def start_metadata_refresh(self, database_name=None):
+        # Without a database name the server's database list is refreshed
+        worker = MetadataRefreshWorker(self.metadata_cache, self.engine, self.current_server, database_name)
+        worker.signals.databases_refreshed.connect(self.on_databases_refreshed)
+        worker.signals.tables_refreshed.connect(self.on_tables_refreshed)
+        worker.signals.error.connect(self.on_metadata_error)
+        self.metadata_workers[database_name] = worker
+        self.thread_pool.start(worker)
 
+    def on_databases_refreshed(self, server_name, databases):
+        if server_name == self.current_server:
+            fill_database_list(self.ui.database_list_widget, databases, self)
+            self.status_bar.showMessage("Databases loaded successfully.")
+
+    def on_tables_refreshed(self, server_name, database_name, tables):
+        if server_name == self.current_server and database_name == self.current_database:
+            fill_tables_list(self.ui.tables_list_widget, tables)
+            self.refresh_cache_indicators()
+            self.status_bar.showMessage("Tables loaded successfully.")
+
+    def on_metadata_error(self, message):
+        self.status_bar.showMessage(f"Error loading catalog: {message}")
 
     def load_query(self, table_info):
         logging.info(f"Attempting to load query for table: {table_info}")
         schema_name, table_name = table_info
-        
-        # Fetch the query from the SQLite database
-        db_name = 'SQL_Pro_data.db'
-        conn = sqlite3.connect(db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT query FROM queries WHERE dbName = ? AND tableName = ?
-        ''', (schema_name, table_name))
-        
-        result = cursor.fetchone()
-        if result:
-            query = result  # Extract the query string from the tuple
-            if isinstance(query, bytes):
-                query = query.decode('utf-8')  # Decode if it's stored as bytes
-            
-            # Ensure the query is a string and trim the first two and last three characters
-            if isinstance(query, str):
-                trimmed_query = query[2:-3]
-                self.ui.sql_input.setHtml(trimmed_query)  # Set the HTML representation back to the QTextEdit
+
+        operation = instrumentation.begin('open table', f"[{schema_name}].[{table_name}]")
+        # Clicking the open table again keeps the editor as it is; its text is the saved one anyway
+        if table_info != self.current_table or self.ui.sql_input.document().isModified():
+            # Keep the edits made to the table we are leaving
+            self.autosave_query()
+            saved_query = self.local_store.get_saved_query(schema_name, table_name)
+            # Setting the editor text highlights the whole document synchronously
+            highlight_started = time.perf_counter()
+            if saved_query:
+                self.ui.sql_input.setPlainText(saved_query.query)
+                self.restore_editor_state(parse_editor_state(saved_query.editor_state))
             else:
-                trimmed_query = str(query)[2:-3]
-                self.ui.sql_input.setHtml(trimmed_query)
-        else:
-            query = f'SELECT * FROM [{schema_name}].[{table_name}]'
-            self.ui.sql_input.setPlainText(query)
-        
-        conn.close()
+                query = f'SELECT * FROM [{schema_name}].[{table_name}]'
+                self.ui.sql_input.setPlainText(query)
+            operation.add('highlight', time.perf_counter() - highlight_started)
+            self.ui.sql_input.document().setModified(False)
+
+        # Bring up the table's tab, filled straight from the cache when its query already ran
+        self.current_table = table_info
+        cache_key = result_key(self.current_server, self.current_database, self.ui.sql_input.toPlainText())
+        cached = self.result_cache.get(cache_key)
+        if table_info in self.result_tabs or cached:
+            view = self.open_result_tab(table_info, f"[{schema_name}].[{table_name}]", f"[{schema_name}].[{table_name}]")
+            if cached and self.tab_result_keys.get(table_info) is None:
+                with operation.phase('render'):
+                    self.show_cached_result(view, table_info, cache_key, cached)
+        instrumentation.finish(operation)
         
-        # Run a SELECT COUNT(*) query to get the total number of records from SQL Server
+        # Show the cached row estimate, or fetch one in the background; exact counts are opt-in
         if not self.engine:
             QMessageBox.warning(None, "Connection Error", "Please connect to the database first.")
             logging.error("Execute SQL failed: No database connection.")
             return
         
-        try:
-            with self.engine.connect() as connection:
-                count_query = text(f'SELECT COUNT(*) FROM [{schema_name}].[{table_name}]')
-                result = connection.execute(count_query)
-                record_count = result.scalar()
-
-                # Format the record count with commas
-                formatted_count = f"{record_count:,}"
-                
-                # Update the info_label with the table name and record count
-                self.ui.info_label.setText(f"Tablename: <b>[{schema_name}].[{table_name}]</b> | Total records: <b>{formatted_count}</b>")
-        except Exception as e:
-            logging.error(f"Error executing SQL command: {e}")
-            QMessageBox.critical(None, "Error", str(e))
-            self.status_bar.showMessage(f"Error executing query: {e}")
+        self.cancel_row_counts()
+        self.row_count_key = (self.current_server, self.current_database, schema_name, table_name)
+        row_count = self.row_count_provider.cached_estimate(self.row_count_key)
+        if row_count is None:
+            self.show_row_count(self.row_count_key, None)
+            self.start_row_count(exact=False)
+        else:
+            self.show_row_count(self.row_count_key, row_count)
         
         logging.info(f"Loaded query for table: [{schema_name}].[{table_name}]")
 
+    def start_row_count(self, exact):
+        worker = RowCountWorker(self.row_count_provider, self.engine, self.row_count_key, exact)
+        worker.signals.counted.connect(self.on_row_count)
+        worker.signals.error.connect(self.on_row_count_error)
+        self.row_count_workers[(self.row_count_key, exact)] = worker
+        self.thread_pool.start(worker)
+
+    def cancel_row_counts(self):
+        # Counts for the table being left: queued ones return without connecting, running ones have their result dropped
+        for worker in self.row_count_workers.values():
+            worker.cancel()
+        self.row_count_workers.clear()
+
+    def count_rows_exactly(self, link=None):
+        if self.engine and self.row_count_key:
+            self.cancel_row_counts()
+            self.show_row_count(self.row_count_key, None, exact=True)
+            self.start_row_count(exact=True)
+
+    def show_row_count(self, key, row_count, exact=False):
+        _, _, schema_name, table_name = key
+        if row_count is None:
+            records = "<b>counting...</b>"
+        elif exact:
+            records = f"<b>{row_count:,}</b>"
+        else:
+            records = f"<b>~{row_count:,}</b> (estimate, <a href=\"exact\">count exactly</a>)"
+        self.ui.info_label.setText(f"Tablename: <b>[{schema_name}].[{table_name}]</b> | Total records: {records}")
+
+    def on_row_count(self, key, row_count, exact):
+        self.row_count_workers.pop((key, exact), None)
+        # Ignore counts for a table the user has already moved away from
+        if key == self.row_count_key:
+            self.show_row_count(key, row_count, exact)
+
+    def on_row_count_error(self, key, message):
+        if key == self.row_count_key:
+            self.status_bar.showMessage(f"Error counting rows: {message}")
+
     def save_query(self):
-        current_item = self.ui.tables_list_widget.currentItem()
-        if current_item:
-            table_info = current_item.data(Qt.UserRole)
+        current_index = self.ui.tables_list_widget.currentIndex()
+        if current_index.isValid():
+            table_info = current_index.data(Qt.UserRole)
             logging.info(f"Current item data: {table_info}")
             if table_info:
-                server_name, table_name = table_info
-                query_html = self.ui.sql_input.toHtml()  # Get the HTML representation of the text
-                
-                # Remove newline characters from the HTML content
-                query_html_cleaned = query_html.replace('\n', '')
-                
-                db_name = 'SQL_Pro_data.db'
-                conn = sqlite3.connect(db_name)
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    INSERT INTO queries (dbName, tableName, query) VALUES (?, ?, ?)
-                    ON CONFLICT(dbName, tableName) DO UPDATE SET query = excluded.query
-                ''', (server_name, table_name, query_html_cleaned))
-                
-                conn.commit()
-                conn.close()
-                logging.info(f"Saved query for table: [{server_name}].[{table_name}]")
+                self.store_query(table_info)
                 self.status_bar.showMessage("Query saved successfully.")
             else:
                 QMessageBox.warning(self, "Save Error", "No table information available.")
@@ -171,6 +257,38 @@ class SQLManagementStudioPro(QMainWindow):
             QMessageBox.warning(self, "Save Error", "No table selected.")
             logging.error("Save query failed: No table selected.")
 
+    def store_query(self, table_info):
+        # Only the SQL and where the caret was are stored; colors come back from the highlighter
+        schema_name, table_name = table_info
+        self.local_store.save_query(schema_name, table_name, self.ui.sql_input.toPlainText(), self.editor_state())
+        self.ui.sql_input.document().setModified(False)
+        logging.info(f"Saved query for table: [{schema_name}].[{table_name}]")
+
+    def editor_state(self):
+        cursor = self.ui.sql_input.textCursor()
+        return EditorState(cursor.position(), cursor.anchor(), self.ui.sql_input.verticalScrollBar().value())
+
+    def restore_editor_state(self, editor_state):
+        if editor_state is None:
+            return
+        last_position = self.ui.sql_input.document().characterCount() - 1
+        cursor = self.ui.sql_input.textCursor()
+        cursor.setPosition(min(editor_state.anchor, last_position))
+        cursor.setPosition(min(editor_state.position, last_position), QTextCursor.KeepAnchor)
+        self.ui.sql_input.setTextCursor(cursor)
+        # The scroll range is only known once the document has been laid out
+        scroll_bar = self.ui.sql_input.verticalScrollBar()
+        QTimer.singleShot(0, lambda: scroll_bar.setValue(editor_state.scroll))
+
+    def autosave_query(self):
+        # Cheap with the shared local store connection, so it runs on every navigation
+        if not self.current_table:
+            return
+        if self.ui.sql_input.document().isModified():
+            self.store_query(self.current_table)
+        else:
+            self.local_store.save_editor_state(*self.current_table, self.editor_state())
+
     def initial_connect(self):
         db_name = 'master'
         server_name = self.ui.server_input.currentText()
@@ -179,20 +297,14 @@ class SQLManagementStudioPro(QMainWindow):
             QMessageBox.warning(None, "Input Error", "Please enter the server name.")
             return None, None
 
-        self.engine = switch_database(self.ui.server_input, db_name, self.status_bar, self.ui.tables_list_widget, self)
+        self.engine = switch_database(self.engine_registry, self.ui.server_input, db_name, self.status_bar, self.ui.tables_list_widget, self)
         if self.engine:
             populate_database_list(self.engine, self.ui.database_list_widget, self.status_bar, self)
+            self.ui.object_explorer.set_server(self.current_server)
             logging.info("Initial connection established.")
 
             # Save the server name to the serverList table
-            db_name = 'SQL_Pro_data.db'
-            conn = sqlite3.connect(db_name)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR IGNORE INTO serverList (serverName) VALUES (?)
-            ''', (server_name,))
-            conn.commit()
-            conn.close()
+            self.local_store.add_server(server_name)
             logging.info(f"Server name '{server_name}' saved to serverList.")
              # Add the server name to the QComboBox if it's not already there
             if server_name not in [self.ui.server_input.itemText(i) for i in range(self.ui.server_input.count())]:
@@ -202,17 +314,38 @@ class SQLManagementStudioPro(QMainWindow):
 
     def switch_database(self, db_name):
         if db_name:
-            self.engine = switch_database(self.ui.server_input, db_name, self.status_bar, self.ui.tables_list_widget, self.engine)
+            self.autosave_query()
+            self.ui.table_selection.clear()
+            self.cancel_row_counts()
+            self.current_table = None
+            self.engine = switch_database(self.engine_registry, self.ui.server_input, db_name, self.status_bar, self.ui.tables_list_widget, self)
             if self.engine:
+                self.refresh_cache_indicators()
                 logging.info(f"Switched to database: {db_name}")
             else:
                 logging.error(f"Failed to switch to database: {db_name}")
     
-    def execute_sql(self):
+    def open_explorer_object(self, database_name, schema_name, object_name):
+        if database_name != self.current_database:
+            self.switch_database(database_name)
+        if self.engine and self.current_database == database_name:
+            self.ui.table_selection.select((schema_name, object_name))
+
+    def refresh_query(self):
+        self.execute_sql(use_cache=False)
+
+    def execute_sql(self, use_cache=True):
         if not self.engine:
             QMessageBox.warning(self, "Connection Error", "Please connect to the database first.")
             logging.error("Execute SQL failed: No database connection.")
             return
+
+        if self.query_worker:
+            if self.query_fetching:
+                QMessageBox.warning(self, "Query Running", "Wait for the running query to finish or cancel it.")
+                return
+            # The previous result still has unfetched rows; close its cursor before starting over
+            self.release_query_worker()
         
         cursor = self.ui.sql_input.textCursor()
         if cursor.hasSelection():
@@ -220,16 +353,528 @@ class SQLManagementStudioPro(QMainWindow):
         else:
             query = self.ui.sql_input.toPlainText().strip()
         
-        execute_sql(self.engine, query, self.ui.output_table, self.status_bar)
+        if not query:
+            return
+
+        # Extra result set and message tabs belong to the previous script
+        self.close_script_tabs()
+
+        cache_key = result_key(self.current_server, self.current_database, query)
+        if self.current_table:
+            tab_key = self.current_table
+            table_name = f"[{tab_key[0]}].[{tab_key[1]}]"
+            view = self.open_result_tab(tab_key, table_name, table_name)
+        else:
+            tab_key = 'query'
+            view = self.open_result_tab(tab_key, "Query")
+
+        cached = self.result_cache.get(cache_key)
+        if use_cache and cached and cached.complete:
+            with instrumentation.operation('cached result', query) as operation:
+                with operation.phase('render'):
+                    self.show_cached_result(view, tab_key, cache_key, cached)
+                operation.rows = cached.row_count
+            return
+
+        worker = create_query_worker(self.engine, query)
+        if not worker:
+            return
+
+        worker.signals.progress.connect(self.on_query_progress)
+        worker.signals.batch_ready.connect(self.on_batch_ready)
+        worker.signals.limit_reached.connect(self.on_limit_reached)
+        worker.signals.batch_done.connect(self.on_batch_done)
+        worker.signals.command_done.connect(self.on_command_done)
+        worker.signals.error.connect(self.on_query_error)
+        worker.signals.cancelled.connect(self.on_query_cancelled)
+        worker.signals.finished.connect(self.on_query_finished)
+
+        self.query_worker = worker
+        self.query_view = view
+        self.query_cache_key = cache_key
+        self.query_table = self.current_table
+        self.query_target = (self.current_server, self.current_database)
+        self.tab_result_keys[tab_key] = cache_key
+        self.query_result_views = {}
+        self.query_rows_fetched = 0
+        self.set_query_fetching(True)
+        self.thread_pool.start(worker)
+
+    def set_query_fetching(self, fetching):
+        self.query_fetching = fetching
+        self.ui.execute_button.setEnabled(not fetching)
+        self.update_cancel_button()
+        self.ui.load_more_button.setEnabled(self.query_worker is not None and not fetching)
+        if fetching:
+            self.query_timer.start()
+        else:
+            self.query_timer.stop()
+
+    def is_current_query(self):
+        # Signals from a worker that was already released are still queued; ignore them
+        return self.query_worker is not None and self.sender() is self.query_worker.signals
+
+    def release_query_worker(self):
+        worker = self.query_worker
+        if worker:
+            worker.signals.blockSignals(True)
+            worker.cancel()
+            instrumentation.finish(worker.operation, rows=worker.rows_fetched)
+            # A result left paused at "Load more" ran fine; only a running query counts as cancelled
+            self.record_history(worker, 'cancelled' if self.query_fetching else 'ok')
+        self.query_worker = None
+        if self.query_view:
+            self.query_view.model().set_has_more(False)
+        self.set_query_fetching(False)
+
+    def cancel_query(self):
+        if self.query_worker:
+            self.status_bar.showMessage("Cancelling query...")
+            self.query_worker.cancel()
+        if self.export_worker:
+            self.status_bar.showMessage("Cancelling export...")
+            self.export_worker.cancel()
+        if self.transfer_worker:
+            self.status_bar.showMessage("Cancelling clone...")
+            self.transfer_worker.cancel()
+        if self.fan_out_worker:
+            self.status_bar.showMessage("Cancelling queries...")
+            self.fan_out_worker.cancel()
+
+    def update_cancel_button(self):
+        self.ui.cancel_button.setEnabled(any(worker is not None for worker in (self.query_worker, self.export_worker, self.transfer_worker,
+                                                                            self.fan_out_worker)))
+
+    def export_results(self):
+        if not self.engine:
+            QMessageBox.warning(self, "Connection Error", "Please connect to the database first.")
+            return
+        if self.export_worker:
+            QMessageBox.warning(self, "Export Running", "Wait for the running export to finish or cancel it.")
+            return
+
+        cursor = self.ui.sql_input.textCursor()
+        query = cursor.selectedText().strip() if cursor.hasSelection() else self.ui.sql_input.toPlainText().strip()
+        if not query:
+            return
+
+        path, selected_filter = QFileDialog.getSaveFileName(self, "Export Results", "", ";;".join(EXPORT_FORMATS.values()))
+        if not path:
+            return
+        if '.' not in path.rsplit('/', 1)[-1]:
+            path += '.' + next(extension for extension, file_filter in EXPORT_FORMATS.items() if file_filter == selected_filter)
+
+        worker = ExportWorker(self.engine, query, path)
+        worker.signals.progress.connect(self.on_export_progress)
+        worker.signals.finished.connect(self.on_export_finished)
+        worker.signals.error.connect(self.on_export_error)
+        worker.signals.cancelled.connect(self.on_export_cancelled)
+        self.export_worker = worker
+        self.ui.export_button.setEnabled(False)
+        self.ui.cancel_button.setEnabled(True)
+        self.status_bar.showMessage(f"Exporting to {path}...")
+        self.thread_pool.start(worker)
+
+    def on_export_progress(self, rows_written, elapsed):
+        self.status_bar.showMessage(f"Exporting... {rows_written:,} rows written in {elapsed:.1f}s ({rows_written / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    def on_export_finished(self, rows_written, elapsed):
+        self.end_export()
+        self.status_bar.showMessage(f"Export finished | {rows_written:,} rows in {elapsed:.2f}s ({rows_written / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    def on_export_error(self, message):
+        self.end_export()
+        QMessageBox.critical(self, "Export Error", message)
+        self.status_bar.showMessage(f"Error exporting results: {message}")
+
+    def on_export_cancelled(self):
+        self.end_export()
+        self.status_bar.showMessage("Export cancelled.")
+
+    def end_export(self):
+        self.export_worker = None
+        self.ui.export_button.setEnabled(True)
+        self.update_cancel_button()
+
+    def clone_table(self):
+        if not self.engine:
+            QMessageBox.warning(self, "Connection Error", "Please connect to the database first.")
+            return
+        if self.transfer_worker:
+            QMessageBox.warning(self, "Clone Running", "Wait for the running clone to finish or cancel it.")
+            return
+        table_info = self.ui.tables_list_widget.currentIndex().data(Qt.UserRole)
+        if not table_info:
+            QMessageBox.warning(self, "Selection Error", "Please select a table first.")
+            return
+
+        schema_name, table_name = table_info
+        default_target = f"[{self.current_database}].[{schema_name}].[{table_name}_copy]"
+        target_text, accepted = QInputDialog.getText(self, "Clone Table", f"Copy [{schema_name}].[{table_name}] to new table:", text=default_target)
+        if not accepted or not target_text.strip():
+            return
+        try:
+            target_database, target_schema, target_table = parse_table_name(target_text, self.current_database, schema_name)
+            target_engine = self.engine_registry.get_engine(self.current_server, target_database)
+        except Exception as e:
+            QMessageBox.critical(self, "Clone Error", str(e))
+            return
+
+        worker = CloneTableWorker(self.engine, target_engine, schema_name, table_name, target_schema, target_table)
+        worker.signals.progress.connect(self.on_clone_progress)
+        worker.signals.finished.connect(self.on_clone_finished)
+        worker.signals.error.connect(self.on_clone_error)
+        worker.signals.cancelled.connect(self.on_clone_cancelled)
+        self.transfer_worker = worker
+        self.transfer_target_database = target_database
+        self.update_cancel_button()
+        self.status_bar.showMessage(f"Cloning [{schema_name}].[{table_name}] to [{target_database}].[{target_schema}].[{target_table}]...")
+        self.thread_pool.start(worker)
+
+    def on_clone_progress(self, rows_written, elapsed):
+        self.status_bar.showMessage(f"Cloning... {rows_written:,} rows copied in {elapsed:.1f}s ({rows_written / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    def on_clone_finished(self, rows_written, elapsed):
+        target_database = self.transfer_target_database
+        self.end_clone()
+        self.status_bar.showMessage(f"Clone finished | {rows_written:,} rows in {elapsed:.2f}s ({rows_written / max(elapsed, 1e-9):,.0f} rows/s)")
+        # The new table shows up in the list once the catalog is read again
+        self.metadata_cache.invalidate(self.current_server, target_database)
+        if target_database == self.current_database:
+            self.start_metadata_refresh(self.current_database)
+
+    def on_clone_error(self, message):
+        self.end_clone()
+        QMessageBox.critical(self, "Clone Error", message)
+        self.status_bar.showMessage(f"Error cloning table: {message}")
+
+    def on_clone_cancelled(self):
+        self.end_clone()
+        self.status_bar.showMessage("Clone cancelled.")
+
+    def end_clone(self):
+        self.transfer_worker = None
+        self.update_cancel_button()
+
+    def fan_out_query(self):
+        if not self.engine:
+            QMessageBox.warning(self, "Connection Error", "Please connect to the database first.")
+            return
+        if self.fan_out_worker:
+            QMessageBox.warning(self, "Query Running", "Wait for the running queries to finish or cancel them.")
+            return
+        cursor = self.ui.sql_input.textCursor()
+        query = cursor.selectedText().strip() if cursor.hasSelection() else self.ui.sql_input.toPlainText().strip()
+        if not query:
+            return
+
+        databases = [self.ui.database_list_widget.item(row).data(Qt.UserRole) for row in range(self.ui.database_list_widget.count())]
+        dialog = FanOutDialog(self.current_server, self.current_database, databases, self.local_store.get_servers(),
+                              self.fan_out_selection, self.fan_out_workers, self)
+        if dialog.exec() != FanOutDialog.Accepted:
+            return
+        self.fan_out_selection = dialog.checked
+        self.fan_out_workers = dialog.workers()
+        targets = dialog.targets()
+
+        worker = FanOutWorker(targets, query, self.fan_out_registry.get_engine, source_column=dialog.source_column(),
+                              max_workers=self.fan_out_workers)
+        worker.signals.target_started.connect(self.on_fan_out_target_started)
+        worker.signals.target_progress.connect(self.on_fan_out_target_progress)
+        worker.signals.target_done.connect(self.on_fan_out_target_done)
+        worker.signals.target_failed.connect(self.on_fan_out_target_failed)
+        worker.signals.limit_reached.connect(self.on_fan_out_limit_reached)
+        worker.signals.finished.connect(self.on_fan_out_finished)
+        self.fan_out_worker = worker
+        self.fan_out_view = self.open_result_tab('fan-out', "Fan-out")
+        self.fan_out_view.model().clear()
+        self.fan_out_pending = []
+        self.tab_result_keys.pop('fan-out', None)
+        self.ui.fan_out_panel.set_targets(targets)
+        self.ui.fan_out_panel.show()
+        self.ui.fan_out_button.setEnabled(False)
+        self.update_cancel_button()
+        self.status_bar.showMessage(f"Running on {len(targets)} targets with {worker.max_workers} workers...")
+        self.thread_pool.start(worker)
+
+    def is_current_fan_out(self):
+        return self.fan_out_worker is not None and self.sender() is self.fan_out_worker.signals
+
+    def on_fan_out_target_started(self, target_number):
+        if self.is_current_fan_out():
+            self.ui.fan_out_panel.update_target(target_number, 'running')
+
+    def on_fan_out_target_progress(self, target_number, rows_fetched, elapsed):
+        if self.is_current_fan_out():
+            self.ui.fan_out_panel.update_target(target_number, 'running', rows_fetched, elapsed)
+
+    def on_fan_out_target_done(self, target_number, result, seconds, note):
+        if not self.is_current_fan_out():
+            return
+        self.ui.fan_out_panel.update_target(target_number, 'ok', 0 if result is None else len(result), seconds, note)
+        if result is not None:
+            self.fan_out_pending.append(result)
+            if not self.fan_out_merge_timer.isActive():
+                self.fan_out_merge_timer.start()
+
+    def flush_fan_out_results(self):
+        frames = self.fan_out_pending
+        self.fan_out_pending = []
+        # A closed tab stops collecting; the panel still shows how each target went
+        if not frames or self.result_tabs.get('fan-out') is not self.fan_out_view:
+            return
+        with instrumentation.operation('fan-out merge', f"{len(frames)} targets") as operation, operation.phase('render'):
+            result = frames[0]
+            for frame in frames[1:]:
+                result = result.concat(frame)
+            merge_fan_out_result(self.fan_out_view, result)
+            operation.rows = len(result)
+
+    def on_fan_out_target_failed(self, target_number, status, message):
+        if self.is_current_fan_out():
+            self.ui.fan_out_panel.update_target(target_number, status, message=message)
+
+    def on_fan_out_limit_reached(self, message):
+        if self.is_current_fan_out():
+            QMessageBox.information(self, "Result Limit", f"{message} Narrow the query or pick fewer targets.")
+
+    def on_fan_out_finished(self, succeeded, elapsed):
+        if not self.is_current_fan_out():
+            return
+        self.fan_out_merge_timer.stop()
+        self.flush_fan_out_results()
+        target_count = len(self.fan_out_worker.targets)
+        total_rows = self.fan_out_worker.total_rows
+        self.fan_out_worker = None
+        self.ui.fan_out_button.setEnabled(True)
+        self.update_cancel_button()
+        self.status_bar.showMessage(f"Ran on {succeeded} of {target_count} targets | {total_rows:,} rows in {elapsed:.2f}s")
+
+    def load_more_rows(self):
+        if self.query_worker and not self.query_fetching:
+            self.set_query_fetching(True)
+            self.query_worker.request_more()
+
+    def update_query_progress(self):
+        if self.query_worker:
+            self.status_bar.showMessage(f"Running... {self.query_worker.elapsed():.1f}s | {self.query_rows_fetched:,} rows fetched")
+
+    def on_query_progress(self, rows_fetched, elapsed):
+        if not self.is_current_query():
+            return
+        self.query_rows_fetched = rows_fetched
+        self.update_query_progress()
+
+    def on_batch_ready(self, result_number, page, elapsed, has_more):
+        if not self.is_current_query():
+            return
+        with self.query_worker.operation.phase('render'):
+            view = self.query_result_views.get(result_number)
+            if view is None:
+                view = self.result_set_view(result_number)
+                display_result(page, view, has_more)
+            else:
+                append_result(page, view, has_more)
+
+        if result_number == 0:
+            # The cache shares the model's columns; partial results are kept but not served for Run
+            headers, columns = view.model().snapshot()
+            self.result_cache.put(self.query_cache_key, CachedResult(headers, columns, not has_more, self.query_table))
+            self.refresh_cache_indicators()
+
+        rows_shown = view.model().rowCount()
+        if has_more:
+            self.set_query_fetching(False)
+            self.status_bar.showMessage(f"{rows_shown:,} rows fetched in {elapsed:.2f}s | scroll down or click Load more for the next rows")
+        else:
+            self.status_bar.showMessage(f"SQL command executed successfully | {rows_shown:,} rows in {elapsed:.2f}s "
+                                        f"| {view.model().nbytes() / (1024 * 1024):,.1f} MB")
+
+    def result_set_view(self, result_number):
+        if result_number == 0:
+            view = self.query_view
+        else:
+            if result_number == 1:
+                # A script's result sets are only cached together, and only the first one is kept
+                self.result_cache.discard(self.query_cache_key)
+                self.tab_result_keys = {tab_key: key for tab_key, key in self.tab_result_keys.items()
+                                        if key != self.query_cache_key}
+                self.refresh_cache_indicators()
+            tab_key = ('result', result_number)
+            view = self.open_result_tab(tab_key, f"Result {result_number + 1}")
+            self.script_tabs.append(tab_key)
+        self.query_result_views[result_number] = view
+        return view
+
+    def on_batch_done(self, batch_number, batch_count, seconds, affected_rows):
+        if not self.is_current_query():
+            return
+        logging.info(f"Batch {batch_number} of {batch_count} finished in {seconds:.3f}s.")
+        if batch_count == 1:
+            return
+        affected = f", {affected_rows:,} rows affected" if affected_rows >= 0 else ""
+        self.append_message(f"Batch {batch_number} of {batch_count}: {seconds * 1000:,.1f} ms{affected}")
+        if batch_number == batch_count:
+            self.status_bar.showMessage(f"Script finished | {batch_count} batches in {self.query_worker.elapsed():.2f}s | timings in the Messages tab")
+        else:
+            self.status_bar.showMessage(f"Running batch {batch_number + 1} of {batch_count}...")
+
+    def append_message(self, message):
+        if self.messages_view is None:
+            self.messages_view = QPlainTextEdit()
+            self.messages_view.setReadOnly(True)
+            self.result_tabs['messages'] = self.messages_view
+            self.script_tabs.append('messages')
+            self.ui.output_tabs.addTab(self.messages_view, "Messages")
+        self.messages_view.appendPlainText(message)
+
+    def close_script_tabs(self):
+        for tab_key in self.script_tabs:
+            view = self.result_tabs.get(tab_key)
+            if view is not None:
+                self.close_result_tab(self.ui.output_tabs.indexOf(view))
+        self.script_tabs = []
+
+    def on_limit_reached(self, message):
+        if not self.is_current_query():
+            return
+        QMessageBox.information(self, "Result Limit", f"{message} Narrow the query to see the remaining rows.")
+
+    def on_command_done(self, affected_rows, elapsed):
+        if not self.is_current_query():
+            return
+        if self.query_worker.batch_count == 1:
+            self.status_bar.showMessage(f"SQL command executed successfully | {affected_rows:,} rows affected in {elapsed:.2f}s")
+
+    def invalidate_after_command(self, command):
+        self.row_count_provider.invalidate(self.current_server, self.current_database)
+        self.result_cache.invalidate_database(self.current_server, self.current_database)
+        self.refresh_cache_indicators()
+        if is_ddl_statement(command):
+            self.metadata_cache.invalidate(self.current_server, self.current_database)
+            self.start_metadata_refresh(self.current_database)
+
+    def on_query_error(self, message):
+        if not self.is_current_query():
+            return
+        QMessageBox.critical(self, "Error", message)
+        self.status_bar.showMessage(f"Error executing query: {message}")
+
+    def on_query_cancelled(self):
+        if not self.is_current_query():
+            return
+        self.status_bar.showMessage("Query cancelled.")
+
+    def on_query_finished(self):
+        if not self.is_current_query():
+            return
+        # Batches before a failing one are already committed, so this also runs after errors
+        if self.query_worker.modified:
+            self.invalidate_after_command(self.query_worker.command)
+        instrumentation.finish(self.query_worker.operation, rows=self.query_worker.rows_fetched)
+        self.record_history(self.query_worker, self.query_worker.status)
+        self.query_worker = None
+        if self.query_view:
+            self.query_view.model().set_has_more(False)
+        self.set_query_fetching(False)
     
+    def record_history(self, worker, status):
+        row_count = worker.rows_fetched if worker.result_count else worker.affected_rows
+        server_name, database_name = self.query_target
+        self.query_history.record(server_name, database_name, worker.command,
+                                  worker.operation.total or worker.elapsed(), row_count, status, worker.error_message)
+
+    def load_history_query(self, query):
+        self.ui.sql_input.setPlainText(query)
+        self.status_bar.showMessage("Query loaded from history.")
+
+    def open_result_tab(self, tab_key, title, table_name=None):
+        view = self.result_tabs.get(tab_key)
+        if view is None:
+            view = create_result_view()
+            view.model().fetch_more_handler = self.load_more_rows
+            if table_name:
+                # Used as the target of "Copy as INSERT statements"
+                view.setProperty("tableName", table_name)
+            self.result_tabs[tab_key] = view
+            self.ui.output_tabs.addTab(view, title)
+        self.ui.output_tabs.setCurrentWidget(view)
+        return view
+
+    def show_cached_result(self, view, tab_key, cache_key, cached):
+        view.model().set_columns(cached.headers, cached.columns)
+        resize_columns_to_sample(view)
+        self.tab_result_keys[tab_key] = cache_key
+        cached_time = time.strftime('%H:%M:%S', time.localtime(cached.cached_at))
+        self.status_bar.showMessage(f"Cached result from {cached_time} | {cached.row_count:,} rows | click Refresh to re-run")
+
+    def on_output_tab_changed(self, index):
+        view = self.ui.output_tabs.widget(index)
+        if isinstance(view, QTableView):
+            self.ui.output_table = view
+            self.ui.filter_bar.bind(view)
+
+    def close_result_tab(self, index):
+        view = self.ui.output_tabs.widget(index)
+        if view is self.query_view:
+            self.release_query_worker()
+            self.query_view = None
+        if view is self.messages_view:
+            self.messages_view = None
+        self.query_result_views = {number: result_view for number, result_view in self.query_result_views.items()
+                                   if result_view is not view}
+        for tab_key in [tab_key for tab_key, tab_view in self.result_tabs.items() if tab_view is view]:
+            del self.result_tabs[tab_key]
+            self.tab_result_keys.pop(tab_key, None)
+        self.ui.output_tabs.removeTab(index)
+        view.deleteLater()
+        if self.ui.output_tabs.count() == 0:
+            self.open_result_tab(None, "Results")
+
+    def on_result_evicted(self, key):
+        # Drop the evicted arrays from idle tabs too, otherwise the cache limit means nothing
+        for tab_key, tab_result_key in list(self.tab_result_keys.items()):
+            view = self.result_tabs.get(tab_key)
+            if tab_result_key == key and view is not None and view is not self.query_view:
+                view.model().clear()
+                del self.tab_result_keys[tab_key]
+
+    def refresh_cache_indicators(self):
+        cached_tables = self.result_cache.cached_tables(self.current_server, self.current_database)
+        self.ui.tables_model.set_cached_tables(cached_tables)
+
+    def load_favorite_tables(self):
+        favorite_tables = self.local_store.get_favorite_tables(self.current_server, self.current_database)
+        self.ui.tables_model.set_favorite_tables(favorite_tables)
+
+    def toggle_favorite_table(self):
+        table_info = self.ui.tables_list_widget.currentIndex().data(Qt.UserRole)
+        if not table_info:
+            return
+        favorite_tables = set(self.ui.tables_model.favorite_tables)
+        favorite = table_info not in favorite_tables
+        self.local_store.set_favorite_table(self.current_server, self.current_database, *table_info, favorite)
+        if favorite:
+            favorite_tables.add(table_info)
+        else:
+            favorite_tables.discard(table_info)
+        self.ui.tables_model.set_favorite_tables(favorite_tables)
+        self.select_table(table_info)
+
     def filter_tables(self):
-        filter_text = self.ui.table_filter_input.text().lower()
-        for i in range(self.ui.tables_list_widget.count()):
-            item = self.ui.tables_list_widget.item(i)
-            if filter_text in item.text().lower():
-                item.setHidden(False)
-            else:
-                item.setHidden(True)
+        started = time.perf_counter()
+        table_info = self.ui.tables_list_widget.currentIndex().data(Qt.UserRole)
+        self.ui.tables_proxy.set_filter(self.ui.table_filter_input.text(), self.ui.favorites_button.isChecked())
+        if table_info:
+            self.select_table(table_info)
+        logging.info(f"Tables filtered to {self.ui.tables_proxy.rowCount():,} of {len(self.ui.tables_model.tables):,} "
+                     f"in {(time.perf_counter() - started) * 1000:.1f} ms.")
+
+    def select_table(self, table_info):
+        # Filtering resets the list; keep the open table selected if it is still shown
+        index = self.ui.tables_proxy.row_of(table_info)
+        if index.isValid():
+            self.ui.tables_list_widget.setCurrentIndex(index)
     
     def capitalize_sql_commands(self):
         cursor = self.ui.sql_input.textCursor()
@@ -241,52 +886,52 @@ class SQLManagementStudioPro(QMainWindow):
         self.ui.sql_input.setTextCursor(cursor)
 
     def show_table_schema(self):
-        current_item = self.ui.tables_list_widget.currentItem()
-        if current_item:
-            table_info = current_item.data(Qt.UserRole)
+        current_index = self.ui.tables_list_widget.currentIndex()
+        if current_index.isValid():
+            table_info = current_index.data(Qt.UserRole)
             if not table_info:
                 QMessageBox.warning(self, "Selection Error", "Please select a table first.")
                 return
             
             schema_name, table_name = table_info
-            
-            # SQL query to get table schema
-            query = f"""
-            SELECT 
-                COLUMN_NAME, 
-                DATA_TYPE, 
-                CHARACTER_MAXIMUM_LENGTH, 
-                IS_NULLABLE
-            FROM 
-                INFORMATION_SCHEMA.COLUMNS
-            WHERE 
-                TABLE_SCHEMA = '{schema_name}' 
-                AND TABLE_NAME = '{table_name}';
-            """
+        else:
+            QMessageBox.warning(self, "Selection Error", "Please select a table first.")
+            return
         
         try:
-            with self.engine.connect() as connection:
-                result = connection.execute(text(query))
-                schema_details = result.fetchall()
-                
-                # Display schema details in the output table
-                self.ui.output_table.clear()
-                self.ui.output_table.setRowCount(len(schema_details))
-                self.ui.output_table.setColumnCount(4)
-                self.ui.output_table.setHorizontalHeaderLabels(['Column Name', 'Data Type', 'Max Length', 'Is Nullable'])
-                
-                for row_idx, row in enumerate(schema_details):
-                    for col_idx, col_data in enumerate(row):
-                        self.ui.output_table.setItem(row_idx, col_idx, QTableWidgetItem(str(col_data)))
-                
-                self.ui.output_table.resizeColumnsToContents()
-                self.status_bar.showMessage("Schema details loaded successfully")
+            # Columns come from the catalog cache; stale entries are dropped when the table's modify_date changes
+            schema_details = self.metadata_cache.get_columns(self.current_server, self.current_database, schema_name, table_name)
+            if not schema_details:
+                schema_details = fetch_columns(self.engine, schema_name, table_name)
+                self.metadata_cache.store_columns(self.current_server, self.current_database, schema_name, table_name, schema_details)
+            
+            # Display schema details in the table's schema tab
+            view = self.open_result_tab(('schema', schema_name, table_name), f"Schema [{schema_name}].[{table_name}]")
+            view.model().set_records(['Column Name', 'Data Type', 'Max Length', 'Is Nullable'], schema_details)
+            resize_columns_to_sample(view)
+            self.status_bar.showMessage("Schema details loaded successfully")
         except Exception as e:
             logging.error(f"Error executing SQL command: {e}")
             QMessageBox.critical(self, "Error", str(e))
             self.status_bar.showMessage(f"Error executing query: {e}")
 
+def merge_fan_out_result(view, result):
+    # Results with the same columns are appended; a target returning other columns rebuilds the grid
+    # with the union of both, leaving the missing cells NULL
+    model = view.model()
+    headers, columns = model.snapshot()
+    if not headers:
+        display_result(result, view)
+    elif headers == result.headers:
+        model.append_result(result)
+    else:
+        display_result(ResultColumns(headers, columns).concat(result), view)
+
 if __name__ == "__main__":
+    # "app batch ..." runs saved queries headless, without creating the QApplication
+    if sys.argv[1:2] == ['batch']:
+        from batch_runner import main
+        sys.exit(main(sys.argv[2:]))
     app = QApplication(sys.argv)
     window = SQLManagementStudioPro()
     window.showMaximized()
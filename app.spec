@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    hiddenimports=['sqlalchemy.dialects.mssql.pyodbc', 'pyodbc'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,288 @@
+import argparse
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import NamedTuple, Optional
+from engine_registry import EngineRegistry, MAX_ENGINES, mssql_url
+from instrumentation import instrumentation
+from local_store import LocalStore, LOCAL_DB_NAME
+from query_engine import QueryRun, QueryCancelled
+
+# Runs saved queries without the GUI: every query against every server/database, in parallel,
+# each result streamed page by page into its own file. Nothing here imports Qt.
+#
+#   python batch_runner.py -S sql01 -S sql02 -d Sales -o out sales.orders dbo.customers
+#   app.exe batch --all -S sql01 -d Sales -f parquet -o out
+
+DEFAULT_WORKERS = 4
+OUTPUT_FORMATS = ('csv', 'parquet')
+# Characters kept in output file and folder names; anything else (e.g. "\" in "host\instance") becomes "_"
+UNSAFE_PATH_CHARACTERS = re.compile(r'[^\w.-]+')
+
+class BatchJob(NamedTuple):
+    server_name: str
+    database_name: str
+    schema_name: str
+    table_name: str
+    command: str
+    # Output path without the extension; further result sets of the script get "_2", "_3", ...
+    output_base: str
+
+class BatchResult(NamedTuple):
+    job: BatchJob
+    status: str
+    rows: int
+    seconds: float
+    paths: list
+    error: Optional[str]
+
+class CsvResultWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.header_written = False
+
+    def write_page(self, df):
+        df.to_csv(self.file, header=not self.header_written, index=False)
+        self.header_written = True
+
+    def close(self):
+        self.file.close()
+
+class ParquetResultWriter:
+    # One row group per page; the schema is fixed by the first page
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output requires the pyarrow package.")
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self.writer = None
+        self.schema = None
+
+    def write_page(self, df):
+        table = self.pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            # Columns that are entirely NULL in the first page have no type yet; store them as text
+            self.schema = self.pa.schema([self.pa.field(field.name, self.pa.string() if field.type == self.pa.null() else field.type)
+                                          for field in table.schema])
+            self.writer = self.pq.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(table.cast(self.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+RESULT_WRITERS = {
+    'csv': CsvResultWriter,
+    'parquet': ParquetResultWriter,
+}
+
+class ResultFileRun(QueryRun):
+    # Reads every result to the end without a row or memory limit; only one page is held at a time
+    def __init__(self, engine, command, output_base, output_format):
+        super().__init__(engine, command, max_rows=None, max_bytes=None, paged=False, operation_kind='batch')
+        self.output_base = output_base
+        self.output_format = output_format
+        self.paths = []
+        self._writers = {}
+
+    def path_for(self, result_number):
+        suffix = f"_{result_number + 1}" if result_number else ""
+        return f"{self.output_base}{suffix}.{self.output_format}"
+
+    def on_page(self, result_number, df, elapsed, has_more):
+        writer = self._writers.get(result_number)
+        if writer is None:
+            path = self.path_for(result_number)
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            writer = self._writers[result_number] = RESULT_WRITERS[self.output_format](path)
+            self.paths.append(path)
+        with self.operation.phase('write'):
+            writer.write_page(df)
+
+    def write_files(self):
+        # Runs the script; files of a failed or cancelled run are removed so they can't pass for complete ones
+        try:
+            self.execute()
+            self._close_writers()
+        except BaseException:
+            self._close_writers()
+            for path in self.paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            self.paths = []
+            raise
+        finally:
+            instrumentation.finish(self.operation, rows=self.rows_fetched)
+
+    def _close_writers(self):
+        writers = list(self._writers.values())
+        self._writers = {}
+        for writer in writers:
+            writer.close()
+
+def safe_path_part(name):
+    return UNSAFE_PATH_CHARACTERS.sub('_', name).strip('._') or '_'
+
+def parse_query_name(name):
+    # "schema.table" or "[schema].[table]"; a bare table name is taken from dbo like SQL Server does
+    schema_name, dot, table_name = name.replace('[', '').replace(']', '').strip().partition('.')
+    return (schema_name, table_name) if dot else ('dbo', schema_name)
+
+def saved_queries(local_store, names=None):
+    # (schema, table, SQL) per name, in the order given; tables without a saved query get the
+    # SELECT * the GUI would show. Without names, every saved query.
+    if not names:
+        return [(query.schema_name, query.table_name, query.query) for query in local_store.get_saved_queries()]
+    queries = []
+    for name in names:
+        schema_name, table_name = parse_query_name(name)
+        saved_query = local_store.get_saved_query(schema_name, table_name)
+        if saved_query:
+            queries.append((schema_name, table_name, saved_query.query))
+        else:
+            logging.warning(f"No saved query for [{schema_name}].[{table_name}]; running SELECT * instead.")
+            queries.append((schema_name, table_name, f'SELECT * FROM [{schema_name}].[{table_name}]'))
+    return queries
+
+def plan_jobs(servers, databases, queries, output_dir):
+    return [BatchJob(server_name, database_name, schema_name, table_name, command,
+                     os.path.join(output_dir, safe_path_part(server_name), safe_path_part(database_name),
+                                  f"{safe_path_part(schema_name)}.{safe_path_part(table_name)}"))
+            for server_name in servers
+            for database_name in databases
+            for schema_name, table_name, command in queries]
+
+def run_job(job, engine_registry, output_format, stop_event, runs):
+    if stop_event.is_set():
+        return BatchResult(job, 'cancelled', 0, 0.0, [], None)
+    started_at = time.perf_counter()
+    run = None
+    try:
+        engine = engine_registry.get_engine(job.server_name, job.database_name)
+        run = ResultFileRun(engine, job.command.strip(), job.output_base, output_format)
+        runs.add(run)
+        # A stop requested while the engine was being created
+        if stop_event.is_set():
+            run.cancel()
+        run.write_files()
+        return BatchResult(job, 'ok', run.rows_fetched, time.perf_counter() - started_at, run.paths, None)
+    except QueryCancelled:
+        return BatchResult(job, 'cancelled', 0, time.perf_counter() - started_at, [], None)
+    except Exception as e:
+        error = run.error_message if run is not None and run.error_message else str(e)
+        return BatchResult(job, 'error', 0, time.perf_counter() - started_at, [], error)
+    finally:
+        runs.discard(run)
+
+def run_batch(jobs, engine_registry, output_format='csv', max_workers=DEFAULT_WORKERS, result_callback=None):
+    # Runs the jobs on a thread pool and returns their results in job order. The drivers release the GIL
+    # while they wait on the server, so queries against different servers and databases overlap.
+    # Ctrl+C cancels the running statements and skips the jobs that haven't started.
+    stop_event = threading.Event()
+    runs = set()
+    results = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch')
+    futures = {executor.submit(run_job, job, engine_registry, output_format, stop_event, runs): job_number
+               for job_number, job in enumerate(jobs)}
+    try:
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if result_callback:
+                result_callback(result)
+    except KeyboardInterrupt:
+        logging.warning("Interrupted; cancelling running queries.")
+        stop_event.set()
+        for run in list(runs):
+            run.cancel()
+        raise
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return [results[job_number] for job_number in range(len(jobs))]
+
+def print_result(result):
+    job = result.job
+    target = f"[{job.server_name}].[{job.database_name}] [{job.schema_name}].[{job.table_name}]"
+    if result.status == 'ok':
+        print(f"ok        {target}: {result.rows:,} rows in {result.seconds:.2f}s -> {', '.join(result.paths) or 'no result set'}",
+              flush=True)
+    elif result.status == 'error':
+        print(f"error     {target}: {result.error}", flush=True)
+    else:
+        print(f"cancelled {target}", flush=True)
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(prog='batch', description="Run saved queries against one or more servers and "
+                                                               "databases and write each result to a file.")
+    parser.add_argument('queries', nargs='*', metavar='SCHEMA.TABLE', help="saved queries to run")
+    parser.add_argument('--all', action='store_true', help="run every saved query")
+    parser.add_argument('--list', action='store_true', help="list the saved queries and exit")
+    parser.add_argument('-S', '--server', action='append', dest='servers', metavar='SERVER', help="repeat for several servers")
+    parser.add_argument('-d', '--database', action='append', dest='databases', metavar='DATABASE',
+                        help="repeat for several databases")
+    parser.add_argument('-o', '--output-dir', default='.', help="results go to OUTPUT_DIR/server/database/schema.table.FORMAT")
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='csv')
+    parser.add_argument('-j', '--workers', type=int, default=DEFAULT_WORKERS, help="queries running at once")
+    parser.add_argument('--store', default=LOCAL_DB_NAME, help="local store holding the saved queries")
+    parser.add_argument('--url-template', help="SQLAlchemy URL with {server} and {database} placeholders "
+                                               "(default: SQL Server over ODBC Driver 17)")
+    parser.add_argument('--timings', metavar='PATH', help="write the per-query timings as JSON")
+    arguments = parser.parse_args(argv)
+    if not arguments.list:
+        if not arguments.queries and not arguments.all:
+            parser.error("name the saved queries to run or pass --all")
+        if not arguments.servers or not arguments.databases:
+            parser.error("at least one --server and one --database are required")
+        if arguments.workers < 1:
+            parser.error("--workers must be at least 1")
+    return parser, arguments
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(threadName)s - %(message)s')
+    parser, arguments = parse_arguments(sys.argv[1:] if argv is None else argv)
+    # LocalStore creates a missing file; a mistyped path should fail instead
+    if not os.path.exists(arguments.store):
+        parser.error(f"local store not found: {arguments.store}")
+    local_store = LocalStore(arguments.store)
+    try:
+        if arguments.list:
+            for query in local_store.get_saved_queries():
+                print(f"{query.schema_name}.{query.table_name}")
+            return 0
+        queries = saved_queries(local_store, None if arguments.all else arguments.queries)
+    finally:
+        local_store.close()
+
+    jobs = plan_jobs(arguments.servers, arguments.databases, queries, arguments.output_dir)
+    url_factory = mssql_url
+    if arguments.url_template:
+        url_factory = lambda server, database: arguments.url_template.format(server=server, database=database)
+    # One engine per target stays alive for the whole run
+    targets = len(arguments.servers) * len(arguments.databases)
+    engine_registry = EngineRegistry(url_factory, max_engines=max(MAX_ENGINES, targets))
+    logging.info(f"Running {len(jobs)} queries on {targets} databases with {arguments.workers} workers.")
+    started_at = time.perf_counter()
+    try:
+        results = run_batch(jobs, engine_registry, arguments.format, arguments.workers, print_result)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        engine_registry.dispose_all()
+        if arguments.timings:
+            instrumentation.export_json(arguments.timings)
+    elapsed = time.perf_counter() - started_at
+    failed = sum(result.status != 'ok' for result in results)
+    rows = sum(result.rows for result in results)
+    print(f"{len(results) - failed} of {len(results)} queries succeeded, {rows:,} rows in {elapsed:.2f}s.", flush=True)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
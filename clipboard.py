@@ -0,0 +1,94 @@
+import logging
+import time
+import numpy as np
+from PySide6.QtGui import QGuiApplication
+
+COPY_FORMATS = {
+    'tsv': "Copy",
+    'csv': "Copy as CSV",
+    'markdown': "Copy as Markdown",
+    'insert': "Copy as INSERT statements",
+}
+DEFAULT_INSERT_TABLE = "[dbo].[TableName]"
+
+def selected_rows_and_columns(table_view):
+    # Built from selection ranges rather than per-cell indexes; the bounding rows x columns block is copied
+    ranges = table_view.selectionModel().selection()
+    if ranges.isEmpty():
+        return np.array([], dtype=np.int64), []
+    view_rows = np.unique(np.concatenate([np.arange(selection_range.top(), selection_range.bottom() + 1)
+                                          for selection_range in ranges]))
+    columns = sorted({column for selection_range in ranges
+                      for column in range(selection_range.left(), selection_range.right() + 1)})
+    return view_rows, columns
+
+def column_text(column, rows, null_text=''):
+    import pandas as pd
+    return pd.Series(column.format(rows, null_text), dtype=object)
+
+def sql_literals(column, rows):
+    import pandas as pd
+    texts = pd.Series(column.format(rows, None), dtype=object)
+    if column.type_name == 'bool':
+        literals = texts.map({'True': '1', 'False': '0'})
+    elif column.numeric:
+        literals = texts
+    else:
+        literals = "'" + texts.str.replace("'", "''", regex=False) + "'"
+    nulls = texts.isna().to_numpy()
+    if nulls.any():
+        literals = literals.astype(object)
+        literals[nulls] = 'NULL'
+    return literals.astype(str)
+
+def join_columns(texts, separator):
+    if len(texts) == 1:
+        return texts[0]
+    return texts[0].str.cat(texts[1:], sep=separator)
+
+def format_cells(headers, columns, rows, copy_format='tsv', table_name=None):
+    # rows are positions in the fetched columns; every column is formatted in one vectorized pass
+    if copy_format == 'csv':
+        import pandas as pd
+        frame = pd.DataFrame({f"c{col_idx}": column_text(column, rows) for col_idx, column in enumerate(columns)})
+        frame.columns = headers
+        return frame.to_csv(index=False, lineterminator='\n')
+
+    if copy_format == 'markdown':
+        texts = [column_text(column, rows).str.replace('|', '\\|', regex=False) for column in columns]
+        lines = ['| ' + ' | '.join(headers) + ' |', '|' + '|'.join(' --- ' for _ in headers) + '|']
+        body = '| ' + join_columns(texts, ' | ') + ' |'
+        return '\n'.join(lines + body.tolist()) + '\n'
+
+    if copy_format == 'insert':
+        quoted_columns = ', '.join(f"[{header.replace(']', ']]')}]" for header in headers)
+        prefix = f"INSERT INTO {table_name or DEFAULT_INSERT_TABLE} ({quoted_columns}) VALUES ("
+        body = prefix + join_columns([sql_literals(column, rows) for column in columns], ', ') + ');'
+        return '\n'.join(body.tolist()) + '\n'
+
+    texts = [column_text(column, rows).str.replace('\t', ' ', regex=False).str.replace('\n', ' ', regex=False)
+             for column in columns]
+    return '\n'.join(['\t'.join(headers)] + join_columns(texts, '\t').tolist()) + '\n'
+
+def copy_to_clipboard(table_view, copy_format='tsv', whole_result=False):
+    model = table_view.model()
+    headers, columns = model.snapshot()
+    if not headers:
+        return 0
+
+    started_at = time.perf_counter()
+    source_rows = model.source_rows()
+    if whole_result:
+        rows, selected_columns = source_rows, list(range(len(headers)))
+    else:
+        view_rows, selected_columns = selected_rows_and_columns(table_view)
+        if not selected_columns:
+            return 0
+        rows = source_rows[view_rows]
+
+    text = format_cells([headers[col_idx] for col_idx in selected_columns],
+                        [columns[col_idx] for col_idx in selected_columns],
+                        rows, copy_format, table_view.property("tableName"))
+    QGuiApplication.clipboard().setText(text)
+    logging.info(f"Copied {len(rows):,} rows x {len(selected_columns)} columns as {copy_format} in {time.perf_counter() - started_at:.2f}s.")
+    return len(rows)
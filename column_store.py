@@ -0,0 +1,561 @@
+import datetime
+import decimal
+import operator
+import re
+import sys
+import numpy as np
+
+# Fetched results are kept as one compact column per result column instead of object-dtype arrays:
+# numbers and datetimes in typed arrays, repeated strings dictionary-encoded, other strings packed into
+# one UTF-8 buffer, NULLs in a bitmap. Cells are formatted per type, a block of rows at a time.
+# Nothing here imports Qt; pandas is only imported to sort, filter or build from a DataFrame.
+
+NULL_TEXT = 'NULL'
+# Strings are dictionary-encoded while at most this share of the non-NULL ones is distinct; beyond that
+# the dictionary would hold nearly every string and they are packed into a UTF-8 buffer instead
+MAX_DICTIONARY_RATIO = 0.5
+# Decimals are kept exactly as int64 units of 10**-scale; wider scales or larger values are kept as text
+MAX_DECIMAL_SCALE = 18
+# Values measured per column when estimating what the same column takes as Python objects
+SIZE_SAMPLE_VALUES = 100
+OBJECT_POINTER_BYTES = 8
+
+# Numeric filters such as ">= 10"; anything else is a case-insensitive substring match
+FILTER_OPERATOR_PATTERN = re.compile(r'^\s*(>=|<=|!=|<>|=|>|<)\s*(.+?)\s*$')
+FILTER_OPERATORS = {
+    '>=': operator.ge, '<=': operator.le, '!=': operator.ne, '<>': operator.ne,
+    '=': operator.eq, '>': operator.gt, '<': operator.lt,
+}
+
+# Name given to unnamed columns when results with different columns are merged
+UNNAMED_COLUMN = 'col'
+
+MEMORY_REPORT_HEADERS = ['Column', 'Type', 'Storage', 'Rows', 'NULLs', 'Distinct', 'Bytes', 'As objects (est.)']
+
+def sort_indices(keys, ascending=True):
+    import pandas as pd
+    series = pd.Series(keys)
+    try:
+        ordered = series.sort_values(ascending=ascending, kind='stable', na_position='last')
+    except TypeError:
+        # Mixed types in an object column are ordered by their text
+        ordered = series.astype(str).sort_values(ascending=ascending, kind='stable')
+    return ordered.index.to_numpy()
+
+def text_contains(texts, filter_text):
+    # None (NULL) never matches
+    import pandas as pd
+    return pd.Series(texts, dtype=object).str.contains(filter_text, case=False, regex=False, na=False).to_numpy(dtype=bool)
+
+def text_numbers(texts):
+    import pandas as pd
+    return pd.to_numeric(pd.Series(texts, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+
+def filter_mask(column, filter_text):
+    match = FILTER_OPERATOR_PATTERN.match(filter_text)
+    if match:
+        try:
+            value = float(match.group(2))
+        except ValueError:
+            value = None
+        if value is not None:
+            numbers = column.numbers()
+            if not np.isnan(numbers).all():
+                return FILTER_OPERATORS[match.group(1)](numbers, value)
+    return column.contains(filter_text)
+
+def pack_nulls(mask):
+    # None when the column has no NULLs, which is the common case
+    return np.packbits(mask) if mask.any() else None
+
+def unpack_nulls(nulls, length):
+    if nulls is None:
+        return np.zeros(length, dtype=bool)
+    return np.unpackbits(nulls, count=length).astype(bool)
+
+def nulls_at(nulls, rows):
+    if nulls is None:
+        return np.zeros(len(rows), dtype=bool)
+    return (nulls[rows >> 3] >> (7 - (rows & 7)) & 1).astype(bool)
+
+def concat_nulls(first, first_length, second, second_length):
+    if first is None and second is None:
+        return None
+    return pack_nulls(np.concatenate((unpack_nulls(first, first_length), unpack_nulls(second, second_length))))
+
+def with_nulls(texts, nulls, null_text):
+    texts = texts.astype(object)
+    if nulls.any():
+        texts[nulls] = null_text
+    return texts
+
+def sample_positions(length):
+    return np.unique(np.linspace(0, length - 1, min(length, SIZE_SAMPLE_VALUES), dtype=np.int64))
+
+class Column:
+    type_name = 'text'
+    storage = 'plain'
+    # Right-aligned in the grid and written unquoted in INSERT statements
+    numeric = False
+
+    def __len__(self):
+        return self.length
+
+    def all_rows(self, rows):
+        return np.arange(self.length) if rows is None else np.asarray(rows, dtype=np.int64)
+
+    def null_mask(self, rows=None):
+        if rows is None:
+            return unpack_nulls(self.nulls, self.length)
+        return nulls_at(self.nulls, self.all_rows(rows))
+
+    def null_count(self):
+        return int(self.null_mask().sum())
+
+    def distinct_count(self):
+        return None
+
+    def numbers(self):
+        # float64 per row, NaN where the value is NULL or not a number
+        return text_numbers(self.values())
+
+    def contains(self, filter_text):
+        # NULL cells are left out rather than matched as the text 'NULL'
+        return text_contains(self.format(null_text=None), filter_text)
+
+    def sort_indices(self, ascending=True):
+        return sort_indices(self.values(), ascending)
+
+    def object_bytes(self):
+        # Size of the same column as an object array of Python values, from a sample of rows
+        if self.length == 0:
+            return 0
+        sample = self.values(sample_positions(self.length))
+        non_null = [value for value in sample.tolist() if value is not None]
+        average_size = sum(sys.getsizeof(value) for value in non_null) / len(sample)
+        return OBJECT_POINTER_BYTES * self.length + int(average_size * self.length)
+
+class TypedColumn(Column):
+    # int64, float64, bool, datetime64[us] or datetime64[D] values; NULL slots hold 0, NaN or NaT
+    def __init__(self, values, nulls, type_name):
+        self.data = values
+        self.nulls = nulls
+        self.type_name = type_name
+        self.numeric = type_name in ('int', 'float')
+        self.storage = str(values.dtype)
+        self.length = len(values)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + (0 if self.nulls is None else self.nulls.nbytes)
+
+    def format(self, rows=None, null_text=NULL_TEXT):
+        values = self.data if rows is None else self.data[rows]
+        if self.type_name == 'bool':
+            texts = np.where(values, 'True', 'False')
+        elif self.type_name == 'datetime':
+            texts = np.datetime_as_string(values, unit='us')
+            # Whole seconds without the fraction, otherwise the fraction without trailing zeros
+            whole_seconds = values.astype(np.int64) % 1000000 == 0
+            texts = np.where(whole_seconds, texts.astype('U19'), np.char.rstrip(texts, '0'))
+            texts = np.char.replace(texts, 'T', ' ')
+        elif self.type_name == 'date':
+            texts = np.datetime_as_string(values, unit='D')
+        else:
+            texts = values.astype(str)
+        return with_nulls(texts, self.null_mask(rows), null_text)
+
+    def values(self, rows=None):
+        values = self.data if rows is None else self.data[rows]
+        nulls = self.null_mask(rows)
+        if not nulls.any() or self.type_name in ('float', 'datetime', 'date'):
+            return values
+        if self.type_name == 'int':
+            values = values.astype(np.float64)
+            values[nulls] = np.nan
+            return values
+        values = values.astype(object)
+        values[nulls] = None
+        return values
+
+    def numbers(self):
+        if not self.numeric:
+            return np.full(self.length, np.nan)
+        return self.values().astype(np.float64)
+
+    def object_bytes(self):
+        # pandas keeps these types in typed arrays too; only dates become objects
+        if self.type_name == 'date':
+            return super().object_bytes()
+        return self.data.nbytes
+
+    def null_column(self, length):
+        if self.type_name in ('datetime', 'date'):
+            values = np.full(length, np.datetime64('NaT'), dtype=self.data.dtype)
+        elif self.type_name == 'float':
+            values = np.full(length, np.nan)
+        else:
+            values = np.zeros(length, dtype=self.data.dtype)
+        return TypedColumn(values, pack_nulls(np.ones(length, dtype=bool)), self.type_name)
+
+    def concat(self, other):
+        if not isinstance(other, TypedColumn):
+            return None
+        type_names = {self.type_name, other.type_name}
+        if len(type_names) == 1:
+            values = np.concatenate((self.data, other.data))
+        elif type_names == {'int', 'float'}:
+            values = np.concatenate((self.values(), other.values())).astype(np.float64)
+        else:
+            return None
+        nulls = concat_nulls(self.nulls, self.length, other.nulls, other.length)
+        return TypedColumn(values, nulls, 'float' if 'float' in type_names else self.type_name)
+
+class DecimalColumn(Column):
+    # Exact decimals as int64 multiples of 10**-scale, e.g. 12.50 with scale 2 is stored as 1250
+    type_name = 'decimal'
+    numeric = True
+
+    def __init__(self, units, scale, nulls):
+        self.units = units
+        self.scale = scale
+        self.nulls = nulls
+        self.storage = f'int64 / 10^{scale}'
+        self.length = len(units)
+
+    @property
+    def nbytes(self):
+        return self.units.nbytes + (0 if self.nulls is None else self.nulls.nbytes)
+
+    def format(self, rows=None, null_text=NULL_TEXT):
+        units = self.units if rows is None else self.units[rows]
+        magnitudes = np.abs(units)
+        if self.scale:
+            whole, fraction = np.divmod(magnitudes, 10 ** self.scale)
+            texts = np.char.add(np.char.add(whole.astype(str), '.'), np.char.zfill(fraction.astype(str), self.scale))
+        else:
+            texts = magnitudes.astype(str)
+        texts = np.where(units < 0, np.char.add('-', texts), texts)
+        return with_nulls(texts, self.null_mask(rows), null_text)
+
+    def values(self, rows=None):
+        units = self.units if rows is None else self.units[rows]
+        nulls = self.null_mask(rows)
+        return np.array([None if null else decimal.Decimal(unit).scaleb(-self.scale)
+                         for unit, null in zip(units.tolist(), nulls.tolist())], dtype=object)
+
+    def numbers(self):
+        numbers = self.units / 10 ** self.scale
+        numbers[self.null_mask()] = np.nan
+        return numbers
+
+    def sort_indices(self, ascending=True):
+        return sort_indices(self.numbers(), ascending)
+
+    def null_column(self, length):
+        return DecimalColumn(np.zeros(length, dtype=np.int64), self.scale, pack_nulls(np.ones(length, dtype=bool)))
+
+    def concat(self, other):
+        if not isinstance(other, DecimalColumn):
+            return None
+        scale = max(self.scale, other.scale)
+        try:
+            units = np.concatenate((self.rescaled(scale), other.rescaled(scale)))
+        except OverflowError:
+            return None
+        return DecimalColumn(units, scale, concat_nulls(self.nulls, self.length, other.nulls, other.length))
+
+    def rescaled(self, scale):
+        if scale == self.scale:
+            return self.units
+        factor = 10 ** (scale - self.scale)
+        if np.abs(self.units).max(initial=0) > np.iinfo(np.int64).max // factor:
+            raise OverflowError("decimal out of range")
+        return self.units * factor
+
+class DictionaryColumn(Column):
+    # Strings as int32 codes into a dictionary of the distinct values; NULL is code -1
+    storage = 'dictionary'
+
+    def __init__(self, codes, dictionary, dictionary_bytes=None):
+        self.codes = codes
+        self.dictionary = dictionary
+        self.dictionary_bytes = (sum(sys.getsizeof(value) for value in dictionary.tolist())
+                                 if dictionary_bytes is None else dictionary_bytes)
+        self.length = len(codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.dictionary.nbytes + self.dictionary_bytes
+
+    def null_mask(self, rows=None):
+        return (self.codes if rows is None else self.codes[rows]) < 0
+
+    def distinct_count(self):
+        return len(self.dictionary)
+
+    def format(self, rows=None, null_text=NULL_TEXT):
+        # Code -1 picks the entry appended for NULL
+        lookup = np.append(self.dictionary, np.array([null_text], dtype=object))
+        return lookup[self.codes if rows is None else self.codes[rows]]
+
+    def values(self, rows=None):
+        return self.format(rows, None)
+
+    def numbers(self):
+        return np.append(text_numbers(self.dictionary), np.nan)[self.codes]
+
+    def contains(self, filter_text):
+        matches = text_contains(self.dictionary, filter_text)
+        return np.append(matches, False)[self.codes]
+
+    def sort_indices(self, ascending=True):
+        # The dictionary is sorted once; rows are then ordered by the rank of their value
+        ranks = np.empty(len(self.dictionary) + 1)
+        ranks[sort_indices(self.dictionary)] = np.arange(len(self.dictionary))
+        ranks[-1] = np.nan
+        return sort_indices(ranks[self.codes], ascending)
+
+    def null_column(self, length):
+        return DictionaryColumn(np.full(length, -1, dtype=np.int32), np.array([], dtype=object), 0)
+
+    def concat(self, other):
+        if isinstance(other, PackedTextColumn):
+            return self.packed().concat(other)
+        if not isinstance(other, DictionaryColumn):
+            return None
+        index = {value: code for code, value in enumerate(self.dictionary.tolist())}
+        added = [value for value in other.dictionary.tolist() if value not in index]
+        mapping = np.fromiter((index.setdefault(value, len(index)) for value in other.dictionary.tolist()),
+                              dtype=np.int32, count=len(other.dictionary))
+        codes = np.concatenate((self.codes, np.append(mapping, np.int32(-1))[other.codes]))
+        dictionary = np.empty(len(index), dtype=object)
+        dictionary[:] = list(index)
+        column = DictionaryColumn(codes, dictionary, self.dictionary_bytes + sum(sys.getsizeof(value) for value in added))
+        if len(dictionary) > MAX_DICTIONARY_RATIO * np.count_nonzero(codes >= 0):
+            return column.packed()
+        return column
+
+    def packed(self):
+        encoded = [value.encode('utf-8') for value in self.dictionary.tolist()] + [b'']
+        codes = np.where(self.codes < 0, len(self.dictionary), self.codes)
+        lengths = np.array([len(value) for value in encoded], dtype=np.int64)[codes]
+        offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        data = b''.join([encoded[code] for code in codes.tolist()])
+        return PackedTextColumn(offsets, data, pack_nulls(self.codes < 0))
+
+class PackedTextColumn(Column):
+    # Mostly distinct strings, UTF-8 encoded back to back; row i is data[offsets[i]:offsets[i + 1]]
+    storage = 'utf-8'
+
+    def __init__(self, offsets, data, nulls):
+        self.offsets = offsets
+        self.data = data
+        self.nulls = nulls
+        self.length = len(offsets) - 1
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [b'' if value is None else value.encode('utf-8') for value in strings]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        return cls(offsets, b''.join(encoded), pack_nulls(np.fromiter((value is None for value in strings), dtype=bool,
+                                                                      count=len(strings))))
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + len(self.data) + (0 if self.nulls is None else self.nulls.nbytes)
+
+    def format(self, rows=None, null_text=NULL_TEXT):
+        rows = self.all_rows(rows)
+        data = self.data
+        texts = np.empty(len(rows), dtype=object)
+        texts[:] = [data[start:end].decode('utf-8')
+                    for start, end in zip(self.offsets[rows].tolist(), self.offsets[rows + 1].tolist())]
+        return with_nulls(texts, self.null_mask(rows), null_text)
+
+    def values(self, rows=None):
+        return self.format(rows, None)
+
+    def null_column(self, length):
+        return PackedTextColumn(np.zeros(length + 1, dtype=np.int64), b'', pack_nulls(np.ones(length, dtype=bool)))
+
+    def concat(self, other):
+        if isinstance(other, DictionaryColumn):
+            other = other.packed()
+        if not isinstance(other, PackedTextColumn):
+            return None
+        offsets = np.concatenate((self.offsets, other.offsets[1:] + self.offsets[-1]))
+        return PackedTextColumn(offsets, self.data + other.data,
+                                concat_nulls(self.nulls, self.length, other.nulls, other.length))
+
+def value_text(value):
+    # varbinary is shown the way SQL Server writes it
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return '0x' + bytes(value).hex().upper()
+    return str(value)
+
+def text_column(strings):
+    # strings: str or None per row
+    index = {}
+    codes = np.fromiter((-1 if value is None else index.setdefault(value, len(index)) for value in strings),
+                        dtype=np.int32, count=len(strings))
+    if len(index) > MAX_DICTIONARY_RATIO * np.count_nonzero(codes >= 0):
+        return PackedTextColumn.from_strings(strings)
+    dictionary = np.empty(len(index), dtype=object)
+    dictionary[:] = list(index)
+    return DictionaryColumn(codes, dictionary)
+
+def typed_column(values, dtype, type_name, fill=None):
+    data = np.array([fill if value is None else value for value in values] if fill is not None else values, dtype=dtype)
+    return TypedColumn(data, pack_nulls(np.fromiter((value is None for value in values), dtype=bool, count=len(values))),
+                       type_name)
+
+def datetime_column(values):
+    # pandas converts datetime objects an order of magnitude faster than numpy; dates outside its
+    # nanosecond range go through numpy
+    import pandas as pd
+    try:
+        data = pd.to_datetime(pd.Series(values, dtype=object)).to_numpy().astype('datetime64[us]')
+    except (pd.errors.OutOfBoundsDatetime, OverflowError):
+        data = np.array(values, dtype='datetime64[us]')
+    return TypedColumn(data, pack_nulls(np.isnat(data)), 'datetime')
+
+def decimal_column(values):
+    exponents = {value.as_tuple().exponent for value in values if value is not None}
+    # NaN and Infinity have string exponents
+    if not all(isinstance(exponent, int) for exponent in exponents):
+        return None
+    scale = max(0, -min(exponents))
+    if scale > MAX_DECIMAL_SCALE:
+        return None
+    units = np.array([0 if value is None else int(value.scaleb(scale)) for value in values], dtype=np.int64)
+    nulls = pack_nulls(np.fromiter((value is None for value in values), dtype=bool, count=len(values)))
+    return DecimalColumn(units, scale, nulls)
+
+def column_from_values(values):
+    # values: Python values of one column as the driver returned them, None for NULL
+    sample = next((value for value in values if value is not None), None)
+    if sample is None:
+        return DictionaryColumn(np.full(len(values), -1, dtype=np.int32), np.array([], dtype=object), 0)
+    kind = type(sample)
+    column = None
+    if all(value is None or type(value) is kind for value in values):
+        try:
+            if kind is str:
+                return text_column(values)
+            if kind is bool:
+                column = typed_column(values, bool, 'bool', False)
+            elif kind is int:
+                column = typed_column(values, np.int64, 'int', 0)
+            elif kind is float:
+                data = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+                column = TypedColumn(data, pack_nulls(np.isnan(data)), 'float')
+            elif kind is datetime.datetime:
+                if not any(value is not None and value.tzinfo is not None for value in values):
+                    column = datetime_column(values)
+            elif kind is datetime.date:
+                column = typed_column(values, 'datetime64[D]', 'date')
+            elif kind is decimal.Decimal:
+                column = decimal_column(values)
+        except (OverflowError, ValueError, TypeError):
+            column = None
+    if column is not None:
+        return column
+    # Mixed types, datetimeoffset, time, uniqueidentifier, binary, ...
+    return text_column([None if value is None else value_text(value) for value in values])
+
+def column_from_array(array):
+    if array.dtype.kind in 'iu':
+        return TypedColumn(array.astype(np.int64), None, 'int')
+    if array.dtype.kind == 'f':
+        array = array.astype(np.float64)
+        return TypedColumn(array, pack_nulls(np.isnan(array)), 'float')
+    if array.dtype.kind == 'b':
+        return TypedColumn(array, None, 'bool')
+    if array.dtype.kind == 'M':
+        array = array.astype('datetime64[us]')
+        return TypedColumn(array, pack_nulls(np.isnat(array)), 'datetime')
+    import pandas as pd
+    nulls = pd.isna(array).tolist()
+    return column_from_values([None if null else value for value, null in zip(array.tolist(), nulls)])
+
+def concat_columns(first, second):
+    # A column that is all NULL so far (or empty) takes the type of the other one
+    if first.null_count() == len(first):
+        first = second.null_column(len(first))
+    elif second.null_count() == len(second):
+        second = first.null_column(len(second))
+    column = first.concat(second)
+    if column is None:
+        # Different types in different pages or targets end up as text
+        column = text_column(first.format(null_text=None).tolist() + second.format(null_text=None).tolist())
+    return column
+
+def unique_headers(headers):
+    # Unnamed expressions (SELECT 1, 2) and repeated names get distinct names: col, col_2, ...
+    names = []
+    seen = set()
+    for header in headers:
+        base = header or UNNAMED_COLUMN
+        name = base
+        suffix = 2
+        while name in seen:
+            name = f"{base}_{suffix}"
+            suffix += 1
+        seen.add(name)
+        names.append(name)
+    return names
+
+class ResultColumns:
+    # A page or a whole result: the column names and one compact column per name
+    def __init__(self, headers, columns):
+        self.headers = [str(header) for header in headers]
+        self.columns = list(columns)
+
+    @classmethod
+    def from_rows(cls, headers, rows):
+        values = list(zip(*rows)) if rows else [() for _ in headers]
+        return cls(headers, [column_from_values(column) for column in values])
+
+    @classmethod
+    def from_dataframe(cls, df):
+        return cls(df.columns, [column_from_array(df.iloc[:, col_idx].to_numpy()) for col_idx in range(len(df.columns))])
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns)
+
+    def concat(self, other):
+        # Same headers are merged by position; otherwise columns are matched by their de-duplicated
+        # names and a column missing on one side is NULL there
+        if self.headers == other.headers:
+            return ResultColumns(self.headers, [concat_columns(first, second)
+                                                for first, second in zip(self.columns, other.columns)])
+        first_headers, second_headers = unique_headers(self.headers), unique_headers(other.headers)
+        headers = first_headers + [header for header in second_headers if header not in first_headers]
+        first = dict(zip(first_headers, self.columns))
+        second = dict(zip(second_headers, other.columns))
+        columns = []
+        for header in headers:
+            first_column, second_column = first.get(header), second.get(header)
+            if first_column is None:
+                first_column = second_column.null_column(len(self))
+            if second_column is None:
+                second_column = first_column.null_column(len(other))
+            columns.append(concat_columns(first_column, second_column))
+        return ResultColumns(headers, columns)
+
+def memory_report(headers, columns):
+    # One row per column and a total: how each is stored and what it takes compared with Python objects
+    records = []
+    for header, column in zip(headers, columns):
+        records.append((header, column.type_name, column.storage, len(column), column.null_count(),
+                        column.distinct_count(), column.nbytes, column.object_bytes()))
+    row_count = len(columns[0]) if columns else 0
+    records.append(('(total)', '', '', row_count, sum(record[4] for record in records), None,
+                    sum(record[6] for record in records), sum(record[7] for record in records)))
+    return MEMORY_REPORT_HEADERS, records
@@ -0,0 +1,273 @@
+import logging
+import queue
+import re
+import threading
+import time
+from PySide6.QtCore import QObject, QRunnable, Signal
+from instrumentation import instrumentation
+from query_engine import cancel_statement
+
+# Rows read from the source and inserted into the target per batch
+TRANSFER_BATCH_SIZE = 10000
+# Batches read ahead of the writer; memory stays bounded by this many batches in flight
+TRANSFER_QUEUE_SIZE = 4
+# How often blocked queue operations check for cancellation
+QUEUE_POLL_INTERVAL = 0.1
+# How long a stopped transfer waits for the reader after interrupting its statement
+READER_JOIN_TIMEOUT = 5.0
+
+# "[db].[schema].[table]", "schema.table" or "table"; brackets allow dots and spaces inside a name
+TABLE_NAME_PART_PATTERN = re.compile(r'\[((?:[^\]]|\]\])*)\]|([^.\[\]]+)')
+
+class TransferCancelled(Exception):
+    pass
+
+def parse_table_name(text, default_database, default_schema):
+    # Returns (database, schema, table); missing leading parts come from the defaults
+    parts = [(bracketed.replace(']]', ']') if bracketed else plain.strip())
+             for bracketed, plain in TABLE_NAME_PART_PATTERN.findall(text.strip())]
+    parts = [part for part in parts if part]
+    if not 1 <= len(parts) <= 3:
+        raise ValueError(f"Expected [database].[schema].[table], got: {text}")
+    return tuple([default_database, default_schema][:3 - len(parts)] + parts)
+
+def script_table(source_connection, schema_name, table_name, target_dialect_name, target_schema, target_table):
+    # Columns, types, nullability and primary key come from the source's metadata. Types are mapped to
+    # their generic SQLAlchemy type when the target is another kind of server.
+    from sqlalchemy import Column, MetaData, Table, String
+    source = Table(table_name, MetaData(), schema=schema_name, autoload_with=source_connection)
+    same_dialect = source_connection.dialect.name == target_dialect_name
+    columns = []
+    for column in source.columns:
+        column_type = column.type
+        if not same_dialect:
+            try:
+                column_type = column_type.as_generic()
+            except NotImplementedError:
+                logging.warning(f"No generic type for {column.name} ({column.type}); cloning it as text.")
+                column_type = String()
+        # Values are copied as they are, so the target never generates identity values itself
+        columns.append(Column(column.name, column_type, nullable=column.nullable, primary_key=column.primary_key,
+                              autoincrement=False))
+    return source, Table(target_table, MetaData(), *columns, schema=target_schema)
+
+def select_statement(dialect, table):
+    preparer = dialect.identifier_preparer
+    column_names = ', '.join(preparer.quote(column.name) for column in table.columns)
+    return f"SELECT {column_names} FROM {preparer.format_table(table)}"
+
+def insert_statement(dialect, table):
+    # Plain DBAPI SQL for cursor.executemany(); the column order matches select_statement()
+    preparer = dialect.identifier_preparer
+    column_count = len(table.columns)
+    if dialect.paramstyle == 'qmark':
+        placeholders = ['?'] * column_count
+    elif dialect.paramstyle in ('format', 'pyformat'):
+        placeholders = ['%s'] * column_count
+    elif dialect.paramstyle == 'numeric':
+        placeholders = [f":{position}" for position in range(1, column_count + 1)]
+    else:
+        raise ValueError(f"Unsupported parameter style for bulk insert: {dialect.paramstyle}")
+    column_names = ', '.join(preparer.quote(column.name) for column in table.columns)
+    return f"INSERT INTO {preparer.format_table(table)} ({column_names}) VALUES ({', '.join(placeholders)})"
+
+def put_batch(batches, item, stop_event):
+    while not stop_event.is_set():
+        try:
+            batches.put(item, timeout=QUEUE_POLL_INTERVAL)
+            return
+        except queue.Full:
+            continue
+
+class BatchReader:
+    # Producer: streams the source query into the queue, then None; an error is handed over in its place.
+    # The running statement can be interrupted from the writer's thread.
+    def __init__(self, source_engine, query, batch_size, batches, stop_event, operation):
+        self.source_engine = source_engine
+        self.query = query
+        self.batch_size = batch_size
+        self.batches = batches
+        self.stop_event = stop_event
+        self.operation = operation
+        self._lock = threading.Lock()
+        self._dbapi_connection = None
+        self._cursor = None
+
+    def run(self):
+        try:
+            with self.operation.phase('connect'):
+                connection = self.source_engine.connect()
+            with connection:
+                try:
+                    self._read(connection.connection.dbapi_connection)
+                except BaseException:
+                    if self.stop_event.is_set():
+                        # The statement may have been interrupted; the connection is not handed back to the pool
+                        connection.invalidate()
+                    raise
+            put_batch(self.batches, None, self.stop_event)
+        except BaseException as e:
+            put_batch(self.batches, e, self.stop_event)
+
+    def _read(self, dbapi_connection):
+        cursor = dbapi_connection.cursor()
+        with self._lock:
+            self._dbapi_connection = dbapi_connection
+            self._cursor = cursor
+        try:
+            with self.operation.phase('execute'):
+                cursor.execute(self.query)
+            while not self.stop_event.is_set():
+                with self.operation.phase('fetch'):
+                    rows = [tuple(row) for row in cursor.fetchmany(self.batch_size)]
+                if not rows:
+                    break
+                put_batch(self.batches, rows, self.stop_event)
+        finally:
+            with self._lock:
+                self._dbapi_connection = None
+                self._cursor = None
+            cursor.close()
+
+    def cancel(self):
+        # Stops a statement blocked in execute() or fetchmany() on the server
+        with self._lock:
+            if self._dbapi_connection is not None:
+                cancel_statement(self._dbapi_connection, self._cursor)
+
+def transfer_rows(source_engine, query, target_engine, insert_sql, batch_size=TRANSFER_BATCH_SIZE,
+                  progress_callback=None, cancel_event=None, operation=None):
+    # Reads on a separate thread while this one inserts, so the two servers work at the same time.
+    # Every batch is committed on its own; returns the number of rows written.
+    own_operation = operation is None
+    if own_operation:
+        operation = instrumentation.begin('transfer', query)
+    batches = queue.Queue(maxsize=TRANSFER_QUEUE_SIZE)
+    stop_event = threading.Event()
+    batch_reader = BatchReader(source_engine, query, batch_size, batches, stop_event, operation)
+    reader = threading.Thread(target=batch_reader.run, name="transfer-reader", daemon=True)
+    started_at = time.perf_counter()
+    rows_written = 0
+    reader.start()
+    try:
+        with operation.phase('connect'):
+            connection = target_engine.connect()
+        with connection:
+            dbapi_connection = connection.connection.dbapi_connection
+            cursor = dbapi_connection.cursor()
+            # pyodbc sends the whole batch as one parameter array instead of a round trip per row
+            if hasattr(cursor, 'fast_executemany'):
+                cursor.fast_executemany = True
+            try:
+                while True:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise TransferCancelled()
+                    try:
+                        batch = batches.get(timeout=QUEUE_POLL_INTERVAL)
+                    except queue.Empty:
+                        continue
+                    if batch is None:
+                        break
+                    if isinstance(batch, BaseException):
+                        raise batch
+                    with operation.phase('write'):
+                        cursor.executemany(insert_sql, batch)
+                        dbapi_connection.commit()
+                    rows_written += len(batch)
+                    if progress_callback:
+                        progress_callback(rows_written, time.perf_counter() - started_at)
+            except BaseException:
+                dbapi_connection.rollback()
+                raise
+            finally:
+                cursor.close()
+    except BaseException as e:
+        if own_operation:
+            instrumentation.finish(operation, rows=rows_written,
+                                   error="cancelled" if isinstance(e, TransferCancelled) else str(e))
+        raise
+    finally:
+        stop_event.set()
+        if reader.is_alive():
+            batch_reader.cancel()
+        reader.join(READER_JOIN_TIMEOUT)
+        if reader.is_alive():
+            logging.warning("Transfer reader is still waiting on the source server; leaving it to finish on its own.")
+        operation.rows = rows_written
+    if own_operation:
+        instrumentation.finish(operation, rows=rows_written)
+    return rows_written
+
+def clone_table(source_engine, target_engine, schema_name, table_name, target_schema=None, target_table=None,
+                batch_size=TRANSFER_BATCH_SIZE, progress_callback=None, cancel_event=None):
+    # Creates the target table from the source's metadata and copies every row; returns (rows, seconds).
+    # The target must not exist yet; a failed or cancelled clone drops the table it created.
+    target_schema = target_schema if target_schema is not None else schema_name
+    target_table = target_table or table_name
+    started_at = time.perf_counter()
+    operation = instrumentation.begin('transfer', f"[{schema_name}].[{table_name}] -> [{target_schema}].[{target_table}]")
+    created = None
+    try:
+        with operation.phase('connect'):
+            source_connection = source_engine.connect()
+        with source_connection, operation.phase('execute'):
+            source, target = script_table(source_connection, schema_name, table_name, target_engine.dialect.name,
+                                          target_schema, target_table)
+        with target_engine.begin() as target_connection, operation.phase('write'):
+            target.create(target_connection)
+        created = target
+        rows_written = transfer_rows(source_engine, select_statement(source_engine.dialect, source), target_engine,
+                                     insert_statement(target_engine.dialect, target), batch_size,
+                                     progress_callback, cancel_event, operation)
+    except BaseException as e:
+        instrumentation.finish(operation, error="cancelled" if isinstance(e, TransferCancelled) else str(e))
+        if created is not None:
+            try:
+                with target_engine.begin() as target_connection:
+                    created.drop(target_connection, checkfirst=True)
+            except Exception as drop_error:
+                logging.error(f"Could not drop partially cloned table [{target_schema}].[{target_table}]: {drop_error}")
+        raise
+    instrumentation.finish(operation, rows=rows_written)
+    elapsed = time.perf_counter() - started_at
+    logging.info(f"Cloned [{schema_name}].[{table_name}] to [{target_schema}].[{target_table}]: {rows_written:,} rows "
+                 f"in {elapsed:.2f}s ({rows_written / max(elapsed, 1e-9):,.0f} rows/s).")
+    return rows_written, elapsed
+
+class TransferSignals(QObject):
+    progress = Signal(int, float)   # rows written, elapsed seconds
+    finished = Signal(int, float)   # rows written, elapsed seconds
+    error = Signal(str)
+    cancelled = Signal()
+
+class CloneTableWorker(QRunnable):
+    def __init__(self, source_engine, target_engine, schema_name, table_name, target_schema, target_table,
+                 batch_size=TRANSFER_BATCH_SIZE):
+        super().__init__()
+        self.source_engine = source_engine
+        self.target_engine = target_engine
+        self.schema_name = schema_name
+        self.table_name = table_name
+        self.target_schema = target_schema
+        self.target_table = target_table
+        self.batch_size = batch_size
+        self.signals = TransferSignals()
+        self._cancel_requested = threading.Event()
+
+    def cancel(self):
+        self._cancel_requested.set()
+
+    def run(self):
+        try:
+            with instrumentation.profiled():
+                rows_written, elapsed = clone_table(self.source_engine, self.target_engine, self.schema_name, self.table_name,
+                                                    self.target_schema, self.target_table, self.batch_size,
+                                                    progress_callback=self.signals.progress.emit,
+                                                    cancel_event=self._cancel_requested)
+            self.signals.finished.emit(rows_written, elapsed)
+        except TransferCancelled:
+            logging.info(f"Clone of [{self.schema_name}].[{self.table_name}] cancelled.")
+            self.signals.cancelled.emit()
+        except Exception as e:
+            logging.error(f"Error cloning table: {e}")
+            self.signals.error.emit(str(e))
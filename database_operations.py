@@ -1,47 +1,43 @@
-from sqlalchemy import create_engine
 from PySide6.QtWidgets import QListWidgetItem
 from PySide6.QtCore import Qt
-from sqlalchemy import text
 import logging
 
 def populate_database_list(engine, list_widget, status_bar, main_window):
-    try:
-        query = text("SELECT name FROM sys.databases")
-        with engine.connect() as connection:
-            result = connection.execute(query)
-            databases = result.fetchall()
-        
-        # Clear existing items
-        list_widget.clear()
-        
-        for db in databases:
-            item = QListWidgetItem(db.name)
-            item.setData(Qt.UserRole, db.name)
-            list_widget.addItem(item)
-            item.setFlags(item.flags() | Qt.ItemIsSelectable | Qt.ItemIsEnabled)
-            item.setSelected(False)
-        
-        # Connect itemClicked signal only once
-        if not hasattr(list_widget, 'itemClickedConnected'):
-            list_widget.itemClicked.connect(lambda item: main_window.switch_database(item.data(Qt.UserRole)))
-            list_widget.itemClickedConnected = True
-        
-        status_bar.showMessage("Databases loaded successfully.")
-        logging.info("Databases loaded successfully.")
-    except Exception as e:
-        status_bar.showMessage(f"Error loading databases: {e}")
-        logging.error(f"Error loading databases: {e}")
+    # Show the cached catalog right away; the background refresh replaces it if the server has changed
+    databases = main_window.metadata_cache.get_databases(main_window.current_server)
+    fill_database_list(list_widget, databases, main_window)
+    if databases:
+        status_bar.showMessage("Databases loaded from cache.")
+    else:
+        status_bar.showMessage("Loading databases...")
+    main_window.start_metadata_refresh()
 
-def switch_database(server_input, db_name, status_bar, tables_list_widget, main_window, old_engine=None):
+def fill_database_list(list_widget, databases, main_window):
+    # Clear existing items
+    list_widget.clear()
+    
+    for db_name in databases:
+        item = QListWidgetItem(db_name)
+        item.setData(Qt.UserRole, db_name)
+        list_widget.addItem(item)
+        item.setFlags(item.flags() | Qt.ItemIsSelectable | Qt.ItemIsEnabled)
+        item.setSelected(False)
+    
+    # Connect itemClicked signal only once
+    if not hasattr(list_widget, 'itemClickedConnected'):
+        list_widget.itemClicked.connect(lambda item: main_window.switch_database(item.data(Qt.UserRole)))
+        list_widget.itemClickedConnected = True
+    
+    logging.info(f"Database list populated with {len(databases)} databases.")
+
+def switch_database(engine_registry, server_input, db_name, status_bar, tables_list_widget, main_window):
     try:
-        # Dispose of the old engine if it exists
-        if old_engine:
-            old_engine.dispose()
-        
-        # Create a new SQLAlchemy engine for the selected database
+        # Reuse the pooled engine for this server/database, creating it on first use
         server = server_input.currentText().strip()
-        conn_str = f'mssql+pyodbc://{server}/{db_name}?driver=ODBC+Driver+17+for+SQL+Server&authentication=ActiveDirectoryIntegrated'
-        new_engine = create_engine(conn_str)
+        new_engine = engine_registry.get_engine(server, db_name)
+        main_window.engine = new_engine
+        main_window.current_server = server
+        main_window.current_database = db_name
         status_bar.showMessage(f"Switched to database: {db_name}")
         
         # Populate tables as list items
@@ -53,37 +49,19 @@ def switch_database(server_input, db_name, status_bar, tables_list_widget, main_
         return None
 
 def populate_tables_list(engine, tables_list_widget, status_bar, main_window):
-    try:
-        query = text("""
-        SELECT 
-            s.name AS schema_name,
-            t.name AS table_name
-        FROM 
-            sys.tables t
-        INNER JOIN 
-            sys.schemas s ON t.schema_id = s.schema_id
-        WHERE 
-            t.is_external = 0
-        ORDER BY 
-            s.name, t.name;
-        """)
-        with engine.connect() as connection:
-            result = connection.execute(query)
-            tables = result.fetchall()
-        
-        # Clear existing items
-        tables_list_widget.clear()
-        
-        for table in tables:
-            item = QListWidgetItem(f"[{table.schema_name}].[{table.table_name}]")
-            item.setData(Qt.UserRole, (table.schema_name, table.table_name))
-            tables_list_widget.addItem(item)
-        
-        # Connect item click event to load_query method
-        tables_list_widget.itemClicked.connect(lambda item: main_window.load_query(item.data(Qt.UserRole)))
-        
-        status_bar.showMessage("Tables loaded successfully.")
-        logging.info("Tables loaded successfully.")
-    except Exception as e:
-        status_bar.showMessage(f"Failed to load tables: {e}")
-        logging.error(f"Failed to load tables: {e}")
+    # Cached tables are shown instantly; the refresh only re-reads sys.tables when its modify dates moved
+    tables = main_window.metadata_cache.get_tables(main_window.current_server, main_window.current_database)
+    fill_tables_list(tables_list_widget, tables)
+    main_window.load_favorite_tables()
+    
+    if tables:
+        status_bar.showMessage("Tables loaded from cache.")
+    else:
+        status_bar.showMessage("Loading tables...")
+    main_window.start_metadata_refresh(main_window.current_database)
+
+def fill_tables_list(tables_list_widget, tables):
+    # Replaces the model's rows; the search proxy rebuilds its index and reapplies the current filter
+    tables_list_widget.model().sourceModel().set_tables(tables)
+    
+    logging.info(f"Tables list populated with {len(tables)} tables.")
@@ -0,0 +1,99 @@
+import logging
+import threading
+from collections import OrderedDict
+
+# Pool tuning shared by every engine in the registry
+POOL_SIZE = 5
+MAX_OVERFLOW = 5
+POOL_TIMEOUT = 30
+POOL_RECYCLE = 1800
+# Engines kept alive at once; the least recently used idle engine is disposed beyond this
+MAX_ENGINES = 8
+
+def mssql_url(server, database):
+    return f'mssql+pyodbc://{server}/{database}?driver=ODBC+Driver+17+for+SQL+Server&authentication=ActiveDirectoryIntegrated'
+
+def use_database_listener(database):
+    statement = f"USE [{database.replace(']', ']]')}]"
+
+    def use_database(connection):
+        connection.exec_driver_sql(statement)
+        # End the autobegun transaction so callers can still begin() their own
+        connection.commit()
+
+    return use_database
+
+class EngineRegistry:
+    def __init__(self, url_factory=mssql_url, max_engines=MAX_ENGINES, use_database_switch=False,
+                 default_database='master'):
+        # With use_database_switch, one pool per server is shared by all its databases
+        # and every checkout runs USE [db] instead of authenticating a new connection
+        self.url_factory = url_factory
+        self.max_engines = max_engines
+        self.use_database_switch = use_database_switch
+        self.default_database = default_database
+        self._engines = OrderedDict()
+        self._database_engines = {}
+        self._lock = threading.Lock()
+
+    def get_engine(self, server, database):
+        with self._lock:
+            if self.use_database_switch:
+                return self._get_switching_engine(server, database)
+            return self._get_pooled_engine((server, database), server, database)
+
+    def _get_pooled_engine(self, key, server, database):
+        engine = self._engines.get(key)
+        if engine is not None:
+            self._engines.move_to_end(key)
+            logging.info(f"Reusing pooled engine for [{server}].[{database}].")
+            return engine
+
+        # SQLAlchemy is imported with the first engine, not at startup
+        from sqlalchemy import create_engine
+        from sqlalchemy.pool import QueuePool
+        engine = create_engine(
+            self.url_factory(server, database),
+            poolclass=QueuePool,
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT,
+            pool_recycle=POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+        self._engines[key] = engine
+        logging.info(f"Created pooled engine for [{server}].[{database}].")
+        self._evict_idle_engines()
+        return engine
+
+    def _get_switching_engine(self, server, database):
+        server_engine = self._get_pooled_engine((server, None), server, self.default_database)
+        key = (server, database)
+        engine = self._database_engines.get(key)
+        if engine is None or engine.pool is not server_engine.pool:
+            from sqlalchemy import event
+            # Shares the server pool; the listener is local to this copy of the engine
+            engine = server_engine.execution_options()
+            event.listen(engine, "engine_connect", use_database_listener(database))
+            self._database_engines[key] = engine
+        return engine
+
+    def _evict_idle_engines(self):
+        for key in list(self._engines):
+            if len(self._engines) <= self.max_engines:
+                break
+            engine = self._engines[key]
+            if engine.pool.checkedout() > 0:
+                continue
+            del self._engines[key]
+            self._database_engines = {db_key: db_engine for db_key, db_engine in self._database_engines.items()
+                                      if db_engine.pool is not engine.pool}
+            engine.dispose()
+            logging.info(f"Disposed idle engine for {key}.")
+
+    def dispose_all(self):
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+            self._database_engines.clear()
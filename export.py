@@ -0,0 +1,223 @@
+import csv
+import logging
+import os
+import threading
+import time
+from PySide6.QtCore import QObject, QRunnable, Signal
+from instrumentation import instrumentation
+from query_engine import cancel_statement
+
+# Rows pulled from the server cursor and written per batch; memory stays bounded by this
+EXPORT_BATCH_SIZE = 10000
+# Excel's hard row limit per sheet, header included
+XLSX_MAX_ROWS = 1048576
+
+EXPORT_FORMATS = {
+    'csv': "CSV (*.csv)",
+    'parquet': "Parquet (*.parquet)",
+    'xlsx': "Excel (*.xlsx)",
+}
+
+class ExportCancelled(Exception):
+    pass
+
+class CsvExportWriter:
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write_batch(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+class ParquetExportWriter:
+    # One row group per batch; the schema is fixed by the first batch
+    def __init__(self, path, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires the pyarrow package.")
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self.columns = columns
+        self.writer = None
+        self.schema = None
+
+    def write_batch(self, rows):
+        arrays = [self.pa.array([row[col_idx] for row in rows]) for col_idx in range(len(self.columns))]
+        if self.writer is None:
+            # Columns that are entirely NULL in the first batch have no type yet; store them as text
+            fields = [self.pa.field(name, self.pa.string() if array.type == self.pa.null() else array.type)
+                      for name, array in zip(self.columns, arrays)]
+            self.schema = self.pa.schema(fields)
+            self.writer = self.pq.ParquetWriter(self.path, self.schema)
+        table = self.pa.Table.from_arrays(arrays, names=self.columns).cast(self.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, self.pa.schema([(name, self.pa.string()) for name in self.columns]))
+        self.writer.close()
+
+class XlsxExportWriter:
+    # openpyxl's write-only mode streams rows to disk instead of keeping the sheet in memory
+    def __init__(self, path, columns):
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise RuntimeError("Excel export requires the openpyxl package.")
+        self.path = path
+        self.columns = columns
+        self.workbook = Workbook(write_only=True)
+        self.sheet = None
+        self.sheet_rows = 0
+        self.sheet_count = 0
+        self._add_sheet()
+
+    def _add_sheet(self):
+        self.sheet_count += 1
+        self.sheet = self.workbook.create_sheet(f"Sheet{self.sheet_count}")
+        self.sheet.append(self.columns)
+        self.sheet_rows = 1
+
+    def write_batch(self, rows):
+        for row in rows:
+            if self.sheet_rows >= XLSX_MAX_ROWS:
+                self._add_sheet()
+            self.sheet.append([value if isinstance(value, (int, float, str, type(None))) else str(value) for value in row])
+            self.sheet_rows += 1
+
+    def close(self):
+        self.workbook.save(self.path)
+
+EXPORT_WRITERS = {
+    'csv': CsvExportWriter,
+    'parquet': ParquetExportWriter,
+    'xlsx': XlsxExportWriter,
+}
+
+def export_format_for_path(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension not in EXPORT_WRITERS:
+        raise ValueError(f"Unsupported export format: .{extension}")
+    return extension
+
+def export_query(engine, command, path, export_format=None, batch_size=EXPORT_BATCH_SIZE,
+                 progress_callback=None, cancel_event=None, statement_callback=None):
+    # Streams the query from the server's cursor straight into the file; returns (rows, seconds).
+    # statement_callback(dbapi_connection, cursor) is told which statement is running, (None, None) once it is done,
+    # so another thread can interrupt it with cancel_statement().
+    export_format = export_format or export_format_for_path(path)
+    started_at = time.perf_counter()
+    rows_written = 0
+    writer = None
+    # Only a file this export started writing is removed on failure; one the user already had stays as it was
+    created = False
+    operation = instrumentation.begin('export', f"{export_format}: {command}")
+    try:
+        with operation.phase('connect'):
+            connection = engine.connect()
+        with connection:
+            try:
+                dbapi_connection = connection.connection.dbapi_connection
+                cursor = dbapi_connection.cursor()
+                if statement_callback:
+                    statement_callback(dbapi_connection, cursor)
+                try:
+                    with operation.phase('execute'):
+                        cursor.execute(command)
+                    if cursor.description is None:
+                        raise ValueError("The command did not return any rows to export.")
+                    writer = EXPORT_WRITERS[export_format](path, [column[0] for column in cursor.description])
+                    created = True
+                    while True:
+                        if cancel_event is not None and cancel_event.is_set():
+                            raise ExportCancelled()
+                        with operation.phase('fetch'):
+                            rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        with operation.phase('write'):
+                            writer.write_batch(rows)
+                        rows_written += len(rows)
+                        if progress_callback:
+                            progress_callback(rows_written, time.perf_counter() - started_at)
+                finally:
+                    if statement_callback:
+                        statement_callback(None, None)
+                    cursor.close()
+            except ExportCancelled:
+                raise
+            except BaseException:
+                if cancel_event is not None and cancel_event.is_set():
+                    # The statement was interrupted; don't hand a connection in an unknown state back to the pool
+                    connection.invalidate()
+                    raise ExportCancelled()
+                raise
+        with operation.phase('write'):
+            writer.close()
+        writer = None
+    except BaseException as e:
+        instrumentation.finish(operation, rows=rows_written, error="cancelled" if isinstance(e, ExportCancelled) else str(e))
+        if writer is not None:
+            try:
+                writer.close()
+            except Exception:
+                pass
+        # Don't leave a truncated file behind that looks like a finished export
+        if created and os.path.exists(path):
+            os.remove(path)
+        raise
+    instrumentation.finish(operation, rows=rows_written)
+    elapsed = time.perf_counter() - started_at
+    logging.info(f"Exported {rows_written:,} rows to {path} in {elapsed:.2f}s ({rows_written / max(elapsed, 1e-9):,.0f} rows/s).")
+    return rows_written, elapsed
+
+class ExportSignals(QObject):
+    progress = Signal(int, float)   # rows written, elapsed seconds
+    finished = Signal(int, float)   # rows written, elapsed seconds
+    error = Signal(str)
+    cancelled = Signal()
+
+class ExportWorker(QRunnable):
+    def __init__(self, engine, command, path, batch_size=EXPORT_BATCH_SIZE):
+        super().__init__()
+        self.engine = engine
+        self.command = command
+        self.path = path
+        self.batch_size = batch_size
+        self.signals = ExportSignals()
+        self._cancel_requested = threading.Event()
+        self._lock = threading.Lock()
+        self._statement = None
+
+    def set_statement(self, dbapi_connection, cursor):
+        with self._lock:
+            self._statement = (dbapi_connection, cursor) if dbapi_connection is not None else None
+
+    def cancel(self):
+        # Also stops a statement still executing on the server, not just the fetch loop between batches
+        self._cancel_requested.set()
+        with self._lock:
+            if self._statement is not None:
+                cancel_statement(*self._statement)
+
+    def run(self):
+        try:
+            with instrumentation.profiled():
+                rows_written, elapsed = export_query(self.engine, self.command, self.path, batch_size=self.batch_size,
+                                                     progress_callback=self.signals.progress.emit,
+                                                     cancel_event=self._cancel_requested,
+                                                     statement_callback=self.set_statement)
+            self.signals.finished.emit(rows_written, elapsed)
+        except ExportCancelled:
+            logging.info(f"Export to {self.path} cancelled.")
+            self.signals.cancelled.emit()
+        except Exception as e:
+            logging.error(f"Error exporting query: {e}")
+            self.signals.error.emit(str(e))
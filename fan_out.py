@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from engine_registry import POOL_SIZE, MAX_OVERFLOW
+from instrumentation import instrumentation
+from query_engine import QueryRun, QueryCancelled, MAX_RESULT_ROWS
+
+# Targets queried at once. Databases of one server share that server's pool, so more workers than
+# its connections would only wait for a free one.
+DEFAULT_FAN_OUT_WORKERS = 8
+MAX_FAN_OUT_WORKERS = POOL_SIZE + MAX_OVERFLOW
+
+class FanOutTarget(NamedTuple):
+    server_name: str
+    database_name: str
+    # Value of the source column in the merged result
+    label: str
+
+class TargetRun(QueryRun):
+    # Reads the first result set of one target to the end; later result sets are counted but not kept
+    def __init__(self, engine, command, max_rows, on_progress=None):
+        super().__init__(engine, command, max_rows=max_rows, paged=False, operation_kind='fan-out')
+        self.frames = []
+        self.notes = []
+        self._progress_callback = on_progress
+
+    def on_progress(self, rows_fetched, elapsed):
+        if self._progress_callback:
+            self._progress_callback(rows_fetched, elapsed)
+
+    def on_page(self, result_number, df, elapsed, has_more):
+        if result_number == 0:
+            self.frames.append(df)
+
+    def on_limit_reached(self, message):
+        self.notes.append(message)
+
+class FanOut:
+    # Runs one command against many server/database targets on a bounded thread pool and hands over each
+    # target's result with a leading source column. Like QueryRun it reports through on_* hooks; the GUI's
+    # FanOutWorker turns them into signals. A target starts with what is left of max_rows and stops fetching
+    # there; once the budget is used up the remaining targets are skipped, so hundreds of databases can't
+    # fill memory.
+    def __init__(self, targets, command, engine_for, source_column='Database',
+                 max_workers=DEFAULT_FAN_OUT_WORKERS, max_rows=MAX_RESULT_ROWS):
+        self.targets = list(targets)
+        self.command = command
+        # engine_for(server_name, database_name) returns a pooled engine
+        self.engine_for = engine_for
+        self.source_column = source_column
+        self.max_workers = max(1, min(max_workers, MAX_FAN_OUT_WORKERS))
+        self.max_rows = max_rows
+        self.total_rows = 0
+        self.started_at = None
+        self._stop_requested = threading.Event()
+        self._lock = threading.Lock()
+        self._runs = set()
+
+    # Called on the worker threads; the defaults ignore the events
+    def on_target_started(self, target_number):
+        pass
+
+    def on_target_progress(self, target_number, rows_fetched, elapsed):
+        pass
+
+    def on_target_done(self, target_number, df, seconds, note):
+        pass
+
+    def on_target_failed(self, target_number, status, message):
+        pass
+
+    def on_limit_reached(self, message):
+        pass
+
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return time.perf_counter() - self.started_at
+
+    def cancel(self):
+        self._stop_requested.set()
+        with self._lock:
+            runs = list(self._runs)
+        for run in runs:
+            run.cancel()
+
+    def execute(self):
+        # Blocks until every target is done, failed or skipped; returns the number of targets that succeeded
+        self.started_at = time.perf_counter()
+        logging.info(f"Running SQL command on {len(self.targets)} targets with {self.max_workers} workers: {self.command}")
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fan-out') as executor:
+            succeeded = sum(executor.map(self.run_target, range(len(self.targets))))
+        logging.info(f"SQL command finished on {succeeded} of {len(self.targets)} targets in {self.elapsed():.2f}s "
+                     f"({self.total_rows:,} rows).")
+        return succeeded
+
+    def run_target(self, target_number):
+        target = self.targets[target_number]
+        # Each target may only fetch what is left of the shared budget when it starts
+        with self._lock:
+            remaining_rows = self.max_rows - self.total_rows
+        if self._stop_requested.is_set() or remaining_rows <= 0:
+            self.on_target_failed(target_number, 'skipped', "")
+            return False
+        self.on_target_started(target_number)
+        started_at = time.perf_counter()
+        run = None
+        try:
+            engine = self.engine_for(target.server_name, target.database_name)
+            run = TargetRun(engine, self.command, remaining_rows,
+                            lambda rows_fetched, elapsed: self.on_target_progress(target_number, rows_fetched, elapsed))
+            with self._lock:
+                self._runs.add(run)
+            # A cancel that came in while the engine was being created
+            if self._stop_requested.is_set():
+                run.cancel()
+            run.execute()
+        except QueryCancelled:
+            self.on_target_failed(target_number, 'cancelled', "")
+            return False
+        except Exception as e:
+            self.on_target_failed(target_number, 'error', run.error_message if run is not None and run.error_message else str(e))
+            return False
+        finally:
+            if run is not None:
+                run.operation.detail = f"[{target.server_name}].[{target.database_name}] {run.operation.detail}"[:200]
+                instrumentation.finish(run.operation, rows=run.rows_fetched)
+                with self._lock:
+                    self._runs.discard(run)
+
+        df = merge_pages(run.frames)
+        if df is not None:
+            df.insert(0, self.source_column, target.label, allow_duplicates=True)
+        notes = list(run.notes)
+        if run.result_count > 1:
+            notes.append(f"{run.result_count} result sets; only the first is shown")
+        with self._lock:
+            self.total_rows += 0 if df is None else len(df)
+            over_budget = self.total_rows >= self.max_rows and not self._stop_requested.is_set()
+        self.on_target_done(target_number, df, time.perf_counter() - started_at, "; ".join(notes))
+        if over_budget:
+            message = f"Stopped at the row limit ({self.max_rows:,} rows); the remaining targets were skipped."
+            logging.warning(message)
+            self.on_limit_reached(message)
+            self.cancel()
+        return True
+
+def merge_pages(frames):
+    if not frames:
+        return None
+    if len(frames) == 1:
+        return frames[0]
+    import pandas as pd
+    return pd.concat(frames, ignore_index=True)
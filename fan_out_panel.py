@@ -0,0 +1,212 @@
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtWidgets import (QDialog, QDialogButtonBox, QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QFormLayout,
+                               QComboBox, QLineEdit, QListWidget, QListWidgetItem, QPushButton, QSpinBox, QLabel,
+                               QTableView, QHeaderView, QAbstractItemView)
+from fan_out import FanOutTarget, DEFAULT_FAN_OUT_WORKERS, MAX_FAN_OUT_WORKERS
+
+# Results arriving within this window are merged into the grid together; one insert per target
+# would relayout the view hundreds of times
+FAN_OUT_MERGE_INTERVAL_MS = 250
+FAN_OUT_HEADERS = ["Target", "Status", "Rows", "Seconds", "Message"]
+DATABASES_MODE = 'databases'
+SERVERS_MODE = 'servers'
+
+class FanOutDialog(QDialog):
+    # Picks the databases of the current server, or the saved servers, that a query runs on
+    def __init__(self, server_name, database_name, databases, servers, checked=None, workers=DEFAULT_FAN_OUT_WORKERS, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Run on Several Targets")
+        self.server_name = server_name
+        self.names = {DATABASES_MODE: list(databases), SERVERS_MODE: list(servers)}
+        # Mode -> names checked the last time, so a repeated run starts from the same selection
+        self.checked = {mode: set(names) for mode, names in (checked or {}).items()}
+
+        self.mode_input = QComboBox()
+        self.mode_input.addItem(f"Databases on {server_name}", DATABASES_MODE)
+        self.mode_input.addItem("Servers", SERVERS_MODE)
+        self.database_input = QLineEdit(database_name or 'master')
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filter...")
+        self.filter_input.setClearButtonEnabled(True)
+        self.target_list = QListWidget()
+        self.workers_input = QSpinBox()
+        self.workers_input.setRange(1, MAX_FAN_OUT_WORKERS)
+        self.workers_input.setValue(min(workers, MAX_FAN_OUT_WORKERS))
+        self.workers_input.setToolTip("Targets queried at once; each one holds a single connection while it runs")
+
+        select_all_button = QPushButton("All")
+        select_all_button.clicked.connect(lambda: self.set_visible_checked(True))
+        select_none_button = QPushButton("None")
+        select_none_button.clicked.connect(lambda: self.set_visible_checked(False))
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(self.filter_input)
+        filter_layout.addWidget(select_all_button)
+        filter_layout.addWidget(select_none_button)
+
+        form_layout = QFormLayout()
+        form_layout.addRow("Run on", self.mode_input)
+        form_layout.addRow("Database", self.database_input)
+        form_layout.addRow("Workers", self.workers_input)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.button(QDialogButtonBox.Ok).setText("Run")
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout()
+        layout.addLayout(form_layout)
+        layout.addLayout(filter_layout)
+        layout.addWidget(self.target_list)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+        self.resize(420, 520)
+
+        self.mode_input.currentIndexChanged.connect(self.fill_targets)
+        self.filter_input.textChanged.connect(self.filter_targets)
+        self.fill_targets()
+
+    def mode(self):
+        return self.mode_input.currentData()
+
+    def fill_targets(self):
+        mode = self.mode()
+        # The database is only asked for when running on servers
+        self.database_input.setEnabled(mode == SERVERS_MODE)
+        checked = self.checked.get(mode)
+        self.target_list.clear()
+        for name in self.names[mode]:
+            item = QListWidgetItem(name)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if checked is None or name in checked else Qt.Unchecked)
+            self.target_list.addItem(item)
+        self.filter_targets()
+
+    def filter_targets(self):
+        text = self.filter_input.text().strip().lower()
+        for row in range(self.target_list.count()):
+            item = self.target_list.item(row)
+            item.setHidden(bool(text) and text not in item.text().lower())
+
+    def set_visible_checked(self, checked):
+        for row in range(self.target_list.count()):
+            item = self.target_list.item(row)
+            if not item.isHidden():
+                item.setCheckState(Qt.Checked if checked else Qt.Unchecked)
+
+    def checked_names(self):
+        return [self.target_list.item(row).text() for row in range(self.target_list.count())
+                if self.target_list.item(row).checkState() == Qt.Checked]
+
+    def targets(self):
+        if self.mode() == DATABASES_MODE:
+            return [FanOutTarget(self.server_name, name, name) for name in self.checked_names()]
+        database_name = self.database_input.text().strip() or 'master'
+        return [FanOutTarget(name, database_name, name) for name in self.checked_names()]
+
+    def source_column(self):
+        return 'Database' if self.mode() == DATABASES_MODE else 'Server'
+
+    def workers(self):
+        return self.workers_input.value()
+
+    def accept(self):
+        if not self.checked_names():
+            return
+        self.checked[self.mode()] = set(self.checked_names())
+        super().accept()
+
+class FanOutTargetModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # [target label, status, rows, seconds, message] per target
+        self._rows = []
+
+    def set_targets(self, targets):
+        self.beginResetModel()
+        self._rows = [[f"[{target.server_name}].[{target.database_name}]", 'queued', None, None, ""] for target in targets]
+        self.endResetModel()
+
+    def update_target(self, target_number, status, rows=None, seconds=None, message=None):
+        row = self._rows[target_number]
+        row[1] = status
+        if rows is not None:
+            row[2] = rows
+        if seconds is not None:
+            row[3] = seconds
+        if message is not None:
+            row[4] = message
+        self.dataChanged.emit(self.index(target_number, 1), self.index(target_number, len(FAN_OUT_HEADERS) - 1))
+
+    def status_counts(self):
+        counts = {}
+        for row in self._rows:
+            counts[row[1]] = counts.get(row[1], 0) + 1
+        return counts
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(FAN_OUT_HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = index.column()
+        if role == Qt.ToolTipRole and column == 4 and row[4]:
+            return row[4]
+        if role == Qt.TextAlignmentRole and column in (2, 3):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role != Qt.DisplayRole:
+            return None
+        if column == 2:
+            return "" if row[2] is None else f"{row[2]:,}"
+        if column == 3:
+            return "" if row[3] is None else f"{row[3]:.2f}"
+        return row[column]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return FAN_OUT_HEADERS[section]
+        return None
+
+class FanOutPanel(QDockWidget):
+    # Status of every target of the running (or last) fan-out query
+    def __init__(self, parent=None):
+        super().__init__("Targets", parent)
+        self.setObjectName("fanOutPanel")
+        self.summary_label = QLabel()
+        self.model = FanOutTargetModel(self)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.model)
+        self.table_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table_view.verticalHeader().setVisible(False)
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table_view.verticalHeader().setDefaultSectionSize(self.table_view.fontMetrics().height() + 6)
+        self.table_view.horizontalHeader().setStretchLastSection(True)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(self.table_view)
+        widget = QWidget()
+        widget.setLayout(layout)
+        self.setWidget(widget)
+
+    def set_targets(self, targets):
+        self.model.set_targets(targets)
+        self.table_view.resizeColumnToContents(0)
+        self.update_summary()
+
+    def update_target(self, target_number, status, rows=None, seconds=None, message=None):
+        self.model.update_target(target_number, status, rows, seconds, message)
+        self.update_summary()
+
+    def update_summary(self):
+        counts = self.model.status_counts()
+        finished = sum(count for status, count in counts.items() if status not in ('queued', 'running'))
+        parts = [f"{finished} of {self.model.rowCount()} targets done"]
+        parts += [f"{counts[status]} {status}" for status in ('running', 'error', 'cancelled', 'skipped') if counts.get(status)]
+        self.summary_label.setText(" | ".join(parts))
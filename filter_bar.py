@@ -0,0 +1,95 @@
+from PySide6.QtWidgets import QWidget, QLineEdit
+from PySide6.QtCore import Qt, QObject, QTimer
+
+# Typing pause before a filter is applied to the result
+FILTER_DELAY_MS = 200
+
+class ColumnFilterBar(QWidget):
+    # One line edit per column, kept aligned with the header sections of the bound view
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.view = None
+        self.editors = []
+        self.headers = []
+        self._connections = []
+        self._pending = {}
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(FILTER_DELAY_MS)
+        self._timer.timeout.connect(self.apply_pending_filters)
+        self.setFixedHeight(QLineEdit().sizeHint().height())
+
+    def bind(self, view):
+        for connection in self._connections:
+            QObject.disconnect(connection)
+        self.apply_pending_filters()
+        self.view = view
+        header = view.horizontalHeader()
+        model = view.model()
+        self._connections = [
+            header.sectionResized.connect(self.update_positions),
+            header.sectionMoved.connect(self.update_positions),
+            header.geometriesChanged.connect(self.update_positions),
+            view.horizontalScrollBar().valueChanged.connect(self.update_positions),
+            model.modelReset.connect(self.on_model_reset),
+        ]
+        self.rebuild_editors()
+
+    def on_model_reset(self):
+        model = self.view.model()
+        headers = [model.headerData(col_idx, Qt.Horizontal) for col_idx in range(model.columnCount())]
+        if headers != self.headers:
+            self.rebuild_editors()
+            return
+        # The model clears its filters when a new result is loaded with the same headers;
+        # edits still waiting on the timer are left alone
+        for col_idx, editor in enumerate(self.editors):
+            filter_text = model.filter_text(col_idx)
+            if col_idx not in self._pending and editor.text().strip() != filter_text:
+                editor.blockSignals(True)
+                editor.setText(filter_text)
+                editor.blockSignals(False)
+        self.update_positions()
+
+    def rebuild_editors(self):
+        for editor in self.editors:
+            editor.deleteLater()
+        model = self.view.model()
+        self.headers = [model.headerData(col_idx, Qt.Horizontal) for col_idx in range(model.columnCount())]
+        self.editors = []
+        for col_idx, header in enumerate(self.headers):
+            editor = QLineEdit(self)
+            editor.setPlaceholderText(f"Filter {header}")
+            editor.setText(model.filter_text(col_idx))
+            editor.setStyleSheet("border: none; border-bottom: 1px solid lightgray;")
+            editor.textEdited.connect(lambda filter_text, col_idx=col_idx: self.on_filter_edited(col_idx, filter_text))
+            editor.show()
+            self.editors.append(editor)
+        self.update_positions()
+
+    def on_filter_edited(self, col_idx, filter_text):
+        self._pending[col_idx] = filter_text
+        self._timer.start()
+
+    def apply_pending_filters(self):
+        self._timer.stop()
+        if self._pending and self.view is not None:
+            pending, self._pending = self._pending, {}
+            self.view.model().set_filters(pending)
+
+    def update_positions(self, *args):
+        if self.view is None:
+            return
+        header = self.view.horizontalHeader()
+        offset = self.view.verticalHeader().width() + self.view.frameWidth()
+        for col_idx, editor in enumerate(self.editors):
+            if header.isSectionHidden(col_idx):
+                editor.hide()
+                continue
+            editor.setGeometry(offset + header.sectionViewportPosition(col_idx), 0,
+                               header.sectionSize(col_idx), self.height())
+            editor.show()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_positions()
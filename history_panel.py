@@ -0,0 +1,135 @@
+import time
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, Signal
+from PySide6.QtWidgets import QDockWidget, QWidget, QVBoxLayout, QLineEdit, QTableView, QHeaderView, QAbstractItemView
+from query_history import HISTORY_PAGE_SIZE
+
+# Idle time after typing in the search box before the history is searched
+SEARCH_DELAY_MS = 200
+# How often the panel checks for newly written entries while it is visible
+REFRESH_INTERVAL_MS = 1000
+
+HISTORY_HEADERS = ["Executed", "Server", "Database", "Query", "Duration ms", "Rows", "Status"]
+
+class HistoryTableModel(QAbstractTableModel):
+    # Holds only the pages scrolled to so far; the view asks for the next one at the bottom
+    def __init__(self, history, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.search_text = ''
+        self._rows = []
+        self._has_more = False
+
+    def reload(self, search_text=None):
+        if search_text is not None:
+            self.search_text = search_text
+        self.beginResetModel()
+        self._rows = self.history.page(self.search_text)
+        self._has_more = len(self._rows) == HISTORY_PAGE_SIZE
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        rows = self.history.page(self.search_text, before_id=self._rows[-1].id)
+        self._has_more = len(rows) == HISTORY_PAGE_SIZE
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HISTORY_HEADERS)
+
+    def query(self, row):
+        return self._rows[row].query
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self._rows[index.row()]
+        column = index.column()
+        if role == Qt.ToolTipRole:
+            return f"{entry.query}\n\n{entry.message}" if entry.message else entry.query
+        if role == Qt.TextAlignmentRole and column in (4, 5):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role != Qt.DisplayRole:
+            return None
+        if column == 0:
+            return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry.executed_at))
+        if column == 3:
+            return ' '.join(entry.query.split())[:300]
+        if column == 4:
+            return f"{entry.duration_ms:,.0f}"
+        if column == 5:
+            return "" if entry.row_count is None else f"{entry.row_count:,}"
+        return (None, entry.server_name, entry.database_name, None, None, None, entry.status)[column]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HISTORY_HEADERS[section]
+        return None
+
+class HistoryPanel(QDockWidget):
+    query_selected = Signal(str)
+
+    def __init__(self, history, parent=None):
+        super().__init__("History", parent)
+        self.setObjectName("historyPanel")
+        self.history = history
+        self._shown_version = -1
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search history...")
+        self.search_input.setClearButtonEnabled(True)
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(SEARCH_DELAY_MS)
+        self._search_timer.timeout.connect(self.search)
+        self.search_input.textChanged.connect(self._search_timer.start)
+
+        self.model = HistoryTableModel(history, self)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.model)
+        self.table_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table_view.verticalHeader().setVisible(False)
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table_view.verticalHeader().setDefaultSectionSize(self.table_view.fontMetrics().height() + 6)
+        self.table_view.horizontalHeader().setStretchLastSection(True)
+        self.table_view.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        self.table_view.doubleClicked.connect(lambda index: self.query_selected.emit(self.model.query(index.row())))
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addWidget(self.search_input)
+        layout.addWidget(self.table_view)
+        widget = QWidget()
+        widget.setLayout(layout)
+        self.setWidget(widget)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(REFRESH_INTERVAL_MS)
+        self._timer.timeout.connect(self.refresh)
+        self.visibilityChanged.connect(self.on_visibility_changed)
+
+    def on_visibility_changed(self, visible):
+        if visible:
+            self.refresh()
+            self._timer.start()
+        else:
+            self._timer.stop()
+
+    def search(self):
+        self._shown_version = self.history.version
+        self.model.reload(self.search_input.text())
+
+    def refresh(self):
+        # New entries only show up while the newest page is in view, so scrolling isn't interrupted
+        if self.history.version == self._shown_version:
+            return
+        if self._shown_version < 0 or self.table_view.verticalScrollBar().value() == 0:
+            self.search()
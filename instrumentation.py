@@ -0,0 +1,173 @@
+import cProfile
+import json
+import logging
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+
+# Recent operations kept per kind, so frequent ones (capitalizing while typing) don't push out queries
+MAX_OPERATIONS_PER_KIND = 200
+PERCENTILES = (50, 90, 99)
+# Phases in the order they happen within an operation
+PHASES = ('connect', 'execute', 'fetch', 'dataframe', 'render', 'highlight', 'format', 'write')
+
+class Operation:
+    def __init__(self, kind, detail=''):
+        self.kind = kind
+        self.detail = ' '.join(detail.split())[:200]
+        self.started_at = time.time()
+        self.phases = {}
+        self.rows = None
+        self.error = None
+        self.total = None
+        # Time spent waiting on the user (e.g. for "Load more") is not part of the operation
+        self.idle = 0.0
+        self._started = time.perf_counter()
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - started)
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'detail': self.detail,
+            'started_at': self.started_at,
+            'total': self.total,
+            'phases': self.phases,
+            'rows': self.rows,
+            'error': self.error,
+        }
+
+class Instrumentation:
+    def __init__(self, max_operations_per_kind=MAX_OPERATIONS_PER_KIND):
+        self.max_operations_per_kind = max_operations_per_kind
+        self._operations = {}
+        self._lock = threading.Lock()
+        # Bumped on every finished operation; the timings panel polls it instead of being signalled from workers
+        self.version = 0
+        self._profiles = []
+        self._gui_profile = None
+
+    def begin(self, kind, detail=''):
+        return Operation(kind, detail)
+
+    def finish(self, operation, rows=None, error=None):
+        # Finishing twice (e.g. a released worker that still reports back) keeps the first record
+        with self._lock:
+            if operation.total is not None:
+                return
+            operation.total = time.perf_counter() - operation._started - operation.idle
+            if rows is not None:
+                operation.rows = rows
+            if error is not None:
+                operation.error = error
+            if operation.kind not in self._operations:
+                self._operations[operation.kind] = deque(maxlen=self.max_operations_per_kind)
+            self._operations[operation.kind].append(operation)
+            self.version += 1
+
+    @contextmanager
+    def operation(self, kind, detail=''):
+        operation = self.begin(kind, detail)
+        try:
+            yield operation
+        except Exception as e:
+            operation.error = str(e)
+            raise
+        finally:
+            self.finish(operation)
+
+    def operations(self):
+        with self._lock:
+            operations = [operation for kind_operations in self._operations.values() for operation in kind_operations]
+        return sorted(operations, key=lambda operation: operation.started_at)
+
+    def clear(self):
+        with self._lock:
+            self._operations = {}
+            self.version += 1
+
+    def summary(self):
+        # (kind, phase) -> count, percentiles and max in seconds; 'total' is listed as a phase too
+        durations = {}
+        for operation in self.operations():
+            durations.setdefault((operation.kind, 'total'), []).append(operation.total)
+            for phase, seconds in operation.phases.items():
+                durations.setdefault((operation.kind, phase), []).append(seconds)
+        summary = {}
+        for key, values in durations.items():
+            values = np.array(values)
+            summary[key] = {
+                'count': len(values),
+                **{f"p{percentile}": float(np.percentile(values, percentile)) for percentile in PERCENTILES},
+                'max': float(values.max()),
+            }
+        return summary
+
+    def export_json(self, path):
+        data = {
+            'exported_at': time.time(),
+            'operations': [operation.to_dict() for operation in self.operations()],
+            'summary': [{'kind': kind, 'phase': phase, **values} for (kind, phase), values in self.summary().items()],
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        logging.info(f"Exported {len(data['operations'])} timed operations to {path}.")
+
+    def is_profiling(self):
+        return self._gui_profile is not None
+
+    def start_profiling(self):
+        # Profiles the calling (GUI) thread; workers add their own profiles through profiled()
+        self._profiles = []
+        self._gui_profile = cProfile.Profile()
+        self._gui_profile.enable()
+        logging.info("Profiling started.")
+
+    def stop_profiling(self, path=None):
+        if self._gui_profile is None:
+            return
+        self._gui_profile.disable()
+        with self._lock:
+            profiles = [self._gui_profile] + self._profiles
+            self._gui_profile = None
+            self._profiles = []
+        if path:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(path)
+            logging.info(f"Profile with {len(profiles)} thread captures saved to {path}.")
+
+    @contextmanager
+    def profiled(self):
+        if self._gui_profile is None:
+            yield
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler per process; it already sees this thread
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+# Shared by the GUI and the workers, like the logging module
+instrumentation = Instrumentation()
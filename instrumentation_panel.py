@@ -0,0 +1,124 @@
+import time
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import (QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QSplitter,
+                               QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog, QLabel)
+from instrumentation import instrumentation, PHASES, PERCENTILES
+
+# How often the panel looks for newly finished operations while it is visible
+REFRESH_INTERVAL_MS = 500
+
+def milliseconds(seconds):
+    return "" if seconds is None else f"{seconds * 1000:,.1f}"
+
+class InstrumentationPanel(QDockWidget):
+    def __init__(self, parent=None):
+        super().__init__("Timings", parent)
+        self.setObjectName("instrumentationPanel")
+        self._shown_version = -1
+
+        self.profile_button = QPushButton("Start profiling")
+        self.profile_button.setCheckable(True)
+        self.profile_button.toggled.connect(self.toggle_profiling)
+        export_button = QPushButton("Export JSON")
+        export_button.clicked.connect(self.export_json)
+        clear_button = QPushButton("Clear")
+        clear_button.clicked.connect(instrumentation.clear)
+        self.status_label = QLabel()
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self.profile_button)
+        button_layout.addWidget(export_button)
+        button_layout.addWidget(clear_button)
+        button_layout.addWidget(self.status_label)
+        button_layout.addStretch()
+
+        # Percentiles per operation kind and phase, in milliseconds
+        self.summary_table = QTableWidget(0, 4 + len(PERCENTILES))
+        self.summary_table.setHorizontalHeaderLabels(["Operation", "Phase", "Count"]
+                                                     + [f"p{percentile} ms" for percentile in PERCENTILES] + ["Max ms"])
+        # Most recent operations first, one column per phase
+        self.recent_table = QTableWidget(0, 4 + len(PHASES) + 1)
+        self.recent_table.setHorizontalHeaderLabels(["Time", "Operation", "Total ms"]
+                                                    + [f"{phase} ms" for phase in PHASES] + ["Rows", "Detail"])
+        for table in (self.summary_table, self.recent_table):
+            table.setEditTriggers(QTableWidget.NoEditTriggers)
+            table.verticalHeader().setVisible(False)
+            table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+            table.horizontalHeader().setStretchLastSection(True)
+
+        splitter = QSplitter(Qt.Horizontal)
+        splitter.addWidget(self.summary_table)
+        splitter.addWidget(self.recent_table)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addLayout(button_layout)
+        layout.addWidget(splitter)
+        widget = QWidget()
+        widget.setLayout(layout)
+        self.setWidget(widget)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(REFRESH_INTERVAL_MS)
+        self._timer.timeout.connect(self.refresh)
+        self.visibilityChanged.connect(self.on_visibility_changed)
+
+    def on_visibility_changed(self, visible):
+        if visible:
+            self.refresh()
+            self._timer.start()
+        else:
+            self._timer.stop()
+
+    def refresh(self):
+        if instrumentation.version == self._shown_version:
+            return
+        self._shown_version = instrumentation.version
+        self.fill_summary()
+        self.fill_recent()
+
+    def fill_summary(self):
+        summary = instrumentation.summary()
+        phase_order = {phase: position for position, phase in enumerate(('total',) + PHASES)}
+        keys = sorted(summary, key=lambda key: (key[0], phase_order.get(key[1], len(phase_order)), key[1]))
+        self.summary_table.setRowCount(len(keys))
+        for row, key in enumerate(keys):
+            values = summary[key]
+            cells = [key[0], key[1], str(values['count'])]
+            cells += [milliseconds(values[f"p{percentile}"]) for percentile in PERCENTILES]
+            cells.append(milliseconds(values['max']))
+            for column, cell in enumerate(cells):
+                item = QTableWidgetItem(cell)
+                if column >= 2:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.summary_table.setItem(row, column, item)
+
+    def fill_recent(self):
+        operations = instrumentation.operations()[::-1]
+        self.recent_table.setRowCount(len(operations))
+        for row, operation in enumerate(operations):
+            cells = [time.strftime('%H:%M:%S', time.localtime(operation.started_at)), operation.kind,
+                     milliseconds(operation.total)]
+            cells += [milliseconds(operation.phases.get(phase)) for phase in PHASES]
+            cells.append("" if operation.rows is None else f"{operation.rows:,}")
+            cells.append(f"{operation.error} | {operation.detail}" if operation.error else operation.detail)
+            for column, cell in enumerate(cells):
+                item = QTableWidgetItem(cell)
+                if 2 <= column < len(cells) - 1:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.recent_table.setItem(row, column, item)
+
+    def export_json(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Timings", "timings.json", "JSON (*.json)")
+        if path:
+            instrumentation.export_json(path)
+            self.status_label.setText(f"Exported to {path}")
+
+    def toggle_profiling(self, enabled):
+        if enabled:
+            instrumentation.start_profiling()
+            self.profile_button.setText("Stop profiling")
+            self.status_label.setText("Profiling...")
+            return
+        self.profile_button.setText("Start profiling")
+        path, _ = QFileDialog.getSaveFileName(self, "Save Profile", "profile.prof", "cProfile stats (*.prof)")
+        instrumentation.stop_profiling(path)
+        self.status_label.setText(f"Profile saved to {path}" if path else "Profile discarded")
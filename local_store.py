@@ -0,0 +1,291 @@
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from typing import NamedTuple, Optional
+
+LOCAL_DB_NAME = 'SQL_Pro_data.db'
+# Statements are compiled once per connection and reused from sqlite3's statement cache
+STATEMENT_CACHE_SIZE = 256
+
+class SavedQuery(NamedTuple):
+    schema_name: str
+    table_name: str
+    query: str
+    editor_state: Optional[str]
+
+class CatalogColumn(NamedTuple):
+    column_name: str
+    data_type: str
+    max_length: Optional[int]
+    is_nullable: str
+
+class EditorState(NamedTuple):
+    position: int
+    anchor: int
+    scroll: int
+
+def format_editor_state(state):
+    # Stored next to the SQL as "position:anchor:scroll"
+    return f"{state.position}:{state.anchor}:{state.scroll}"
+
+def parse_editor_state(text):
+    try:
+        return EditorState._make(int(value) for value in text.split(':'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+class QtHtmlTextParser(HTMLParser):
+    # Recovers the plain text of QTextEdit.toHtml() output: one line per <p>, <br /> inside a paragraph is a line break
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self._empty_paragraph = False
+        self._skip_data = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'p':
+            self.lines.append([])
+            self._empty_paragraph = '-qt-paragraph-type:empty' in (dict(attrs).get('style') or '')
+        elif tag == 'br' and self.lines and not self._empty_paragraph:
+            self.lines[-1].append('\n')
+        elif tag in ('head', 'style', 'title'):
+            self._skip_data = True
+
+    def handle_endtag(self, tag):
+        if tag in ('head', 'style', 'title'):
+            self._skip_data = False
+
+    def handle_data(self, data):
+        if self.lines and not self._skip_data:
+            self.lines[-1].append(data)
+
+def is_qt_html(text):
+    return text.lstrip()[:20].lower().startswith(('<!doctype html', '<html'))
+
+def html_to_plain_text(html):
+    parser = QtHtmlTextParser()
+    parser.feed(html)
+    parser.close()
+    return '\n'.join(''.join(parts) for parts in parser.lines)
+
+def create_base_tables(connection):
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS queries (
+            dbName TEXT(100),
+            tableName TEXT(100),
+            query TEXT,
+            UNIQUE(dbName, tableName)
+        )
+    ''')
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS serverList (
+            serverName TEXT PRIMARY KEY
+        )
+    ''')
+
+def create_catalog_tables(connection):
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS catalogDatabases (
+            serverName TEXT,
+            databaseName TEXT,
+            PRIMARY KEY(serverName, databaseName)
+        )
+    ''')
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS catalogTables (
+            serverName TEXT,
+            databaseName TEXT,
+            schemaName TEXT,
+            tableName TEXT,
+            modifyDate TEXT,
+            PRIMARY KEY(serverName, databaseName, schemaName, tableName)
+        )
+    ''')
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS catalogColumns (
+            serverName TEXT,
+            databaseName TEXT,
+            schemaName TEXT,
+            tableName TEXT,
+            ordinal INTEGER,
+            columnName TEXT,
+            dataType TEXT,
+            maxLength INTEGER,
+            isNullable TEXT,
+            PRIMARY KEY(serverName, databaseName, schemaName, tableName, ordinal)
+        )
+    ''')
+    # Table count and latest modify_date seen at the last refresh of each database
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS catalogRefresh (
+            serverName TEXT,
+            databaseName TEXT,
+            tableCount INTEGER,
+            lastModified TEXT,
+            PRIMARY KEY(serverName, databaseName)
+        )
+    ''')
+
+def create_history_tables(connection):
+    # Append-only: entries are never updated, so the FTS index only needs an insert trigger
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS queryHistory (
+            id INTEGER PRIMARY KEY,
+            executedAt REAL,
+            serverName TEXT,
+            databaseName TEXT,
+            query TEXT,
+            durationMs REAL,
+            rowCount INTEGER,
+            status TEXT,
+            message TEXT
+        )
+    ''')
+    try:
+        connection.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS queryHistorySearch
+            USING fts5(query, serverName, databaseName, content='queryHistory', content_rowid='id')
+        ''')
+        connection.execute('''
+            CREATE TRIGGER IF NOT EXISTS queryHistorySearchInsert AFTER INSERT ON queryHistory BEGIN
+                INSERT INTO queryHistorySearch (rowid, query, serverName, databaseName)
+                VALUES (new.id, new.query, new.serverName, new.databaseName);
+            END
+        ''')
+    except sqlite3.OperationalError as e:
+        # SQLite builds without FTS5 fall back to LIKE searches
+        logging.warning(f"Full-text search unavailable for query history: {e}")
+
+def convert_saved_queries_to_text(connection):
+    # Saved queries used to be stored as the editor's HTML; keep the SQL and let the highlighter redo the colors
+    connection.execute('ALTER TABLE queries ADD COLUMN editorState TEXT')
+    rows = connection.execute('SELECT rowid, query FROM queries').fetchall()
+    converted = [(html_to_plain_text(query), rowid) for rowid, query in rows if query and is_qt_html(query)]
+    connection.executemany('UPDATE queries SET query = ? WHERE rowid = ?', converted)
+    logging.info(f"Converted {len(converted)} saved queries from HTML to plain text.")
+
+def create_favorite_tables(connection):
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS favoriteTables (
+            serverName TEXT,
+            databaseName TEXT,
+            schemaName TEXT,
+            tableName TEXT,
+            PRIMARY KEY(serverName, databaseName, schemaName, tableName)
+        )
+    ''')
+
+# Applied in order; PRAGMA user_version holds the number of migrations already applied.
+# The first ones use IF NOT EXISTS because files created before versioning already have these tables.
+MIGRATIONS = [
+    create_base_tables,
+    create_catalog_tables,
+    create_history_tables,
+    convert_saved_queries_to_text,
+    create_favorite_tables,
+]
+
+class LocalStore:
+    def __init__(self, db_name=LOCAL_DB_NAME):
+        self.db_name = db_name
+        # One connection for the whole app, shared by the GUI thread and the background workers;
+        # autocommit mode, with explicit transactions where several statements belong together
+        self.connection = sqlite3.connect(db_name, check_same_thread=False, isolation_level=None,
+                                          cached_statements=STATEMENT_CACHE_SIZE)
+        self._lock = threading.RLock()
+        # WAL lets reads continue while a write is being committed
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.migrate()
+
+    def migrate(self):
+        version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+        for target_version, migration in enumerate(MIGRATIONS, 1):
+            if target_version <= version:
+                continue
+            with self.transaction():
+                migration(self.connection)
+                self.connection.execute(f'PRAGMA user_version = {target_version}')
+            logging.info(f"Local store '{self.db_name}' migrated to version {target_version}.")
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute('ROLLBACK')
+                raise
+            self.connection.execute('COMMIT')
+
+    def fetch_all(self, sql, parameters=(), row_type=None):
+        with self._lock:
+            rows = self.connection.execute(sql, parameters).fetchall()
+        if row_type is not None:
+            return [row_type._make(row) for row in rows]
+        return rows
+
+    def fetch_one(self, sql, parameters=(), row_type=None):
+        with self._lock:
+            row = self.connection.execute(sql, parameters).fetchone()
+        if row is not None and row_type is not None:
+            return row_type._make(row)
+        return row
+
+    def execute(self, sql, parameters=()):
+        with self._lock:
+            self.connection.execute(sql, parameters)
+
+    def has_table(self, table_name):
+        return self.fetch_one("SELECT 1 FROM sqlite_master WHERE name = ?", (table_name,)) is not None
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+    def get_servers(self):
+        return [row[0] for row in self.fetch_all('SELECT serverName FROM serverList') if row[0]]
+
+    def add_server(self, server_name):
+        self.execute('INSERT OR IGNORE INTO serverList (serverName) VALUES (?)', (server_name,))
+
+    def get_saved_query(self, schema_name, table_name):
+        return self.fetch_one('''
+            SELECT dbName, tableName, query, editorState FROM queries WHERE dbName = ? AND tableName = ?
+        ''', (schema_name, table_name), SavedQuery)
+
+    def get_saved_queries(self):
+        return self.fetch_all('''
+            SELECT dbName, tableName, query, editorState FROM queries ORDER BY dbName, tableName
+        ''', row_type=SavedQuery)
+
+    def save_editor_state(self, schema_name, table_name, editor_state):
+        # Only updates a saved query; tables without one keep using the default SELECT
+        self.execute('''
+            UPDATE queries SET editorState = ? WHERE dbName = ? AND tableName = ?
+        ''', (format_editor_state(editor_state), schema_name, table_name))
+
+    def save_query(self, schema_name, table_name, query, editor_state=None):
+        self.execute('''
+            INSERT INTO queries (dbName, tableName, query, editorState) VALUES (?, ?, ?, ?)
+            ON CONFLICT(dbName, tableName) DO UPDATE SET query = excluded.query, editorState = excluded.editorState
+        ''', (schema_name, table_name, query, editor_state and format_editor_state(editor_state)))
+
+    def get_favorite_tables(self, server_name, database_name):
+        rows = self.fetch_all('''
+            SELECT schemaName, tableName FROM favoriteTables WHERE serverName = ? AND databaseName = ?
+        ''', (server_name, database_name))
+        return {tuple(row) for row in rows}
+
+    def set_favorite_table(self, server_name, database_name, schema_name, table_name, favorite):
+        if favorite:
+            self.execute('''
+                INSERT OR IGNORE INTO favoriteTables (serverName, databaseName, schemaName, tableName) VALUES (?, ?, ?, ?)
+            ''', (server_name, database_name, schema_name, table_name))
+        else:
+            self.execute('''
+                DELETE FROM favoriteTables WHERE serverName = ? AND databaseName = ? AND schemaName = ? AND tableName = ?
+            ''', (server_name, database_name, schema_name, table_name))
@@ -0,0 +1,189 @@
+import logging
+import re
+from PySide6.QtCore import QObject, QRunnable, Signal
+from instrumentation import instrumentation
+from local_store import CatalogColumn
+
+DATABASES_QUERY = "SELECT name FROM sys.databases ORDER BY name"
+
+# sys.tables exposes modify_date from sys.objects; it changes on any DDL against the table
+TABLES_WATERMARK_QUERY = """
+SELECT
+    COUNT(*) AS table_count,
+    MAX(t.modify_date) AS last_modified
+FROM
+    sys.tables t
+WHERE
+    t.is_external = 0;
+"""
+
+TABLES_QUERY = """
+SELECT
+    s.name AS schema_name,
+    t.name AS table_name,
+    t.modify_date
+FROM
+    sys.tables t
+INNER JOIN
+    sys.schemas s ON t.schema_id = s.schema_id
+WHERE
+    t.is_external = 0
+ORDER BY
+    s.name, t.name;
+"""
+
+COLUMNS_QUERY = """
+SELECT
+    COLUMN_NAME,
+    DATA_TYPE,
+    CHARACTER_MAXIMUM_LENGTH,
+    IS_NULLABLE
+FROM
+    INFORMATION_SCHEMA.COLUMNS
+WHERE
+    TABLE_SCHEMA = :schema_name
+    AND TABLE_NAME = :table_name
+ORDER BY
+    ORDINAL_POSITION;
+"""
+
+DDL_PATTERN = re.compile(r'^\s*(create|alter|drop|truncate|exec(ute)?\s+sp_rename)\b', re.IGNORECASE | re.MULTILINE)
+
+def is_ddl_statement(command):
+    return DDL_PATTERN.search(command) is not None
+
+class MetadataCache:
+    def __init__(self, store):
+        # Tables are created by the local store's migrations
+        self.store = store
+
+    def get_databases(self, server_name):
+        rows = self.store.fetch_all('''
+            SELECT databaseName FROM catalogDatabases WHERE serverName = ? ORDER BY databaseName
+        ''', (server_name,))
+        return [row[0] for row in rows]
+
+    def store_databases(self, server_name, databases):
+        with self.store.transaction() as connection:
+            connection.execute('DELETE FROM catalogDatabases WHERE serverName = ?', (server_name,))
+            connection.executemany('''
+                INSERT INTO catalogDatabases (serverName, databaseName) VALUES (?, ?)
+            ''', [(server_name, database) for database in databases])
+
+    def get_tables(self, server_name, database_name):
+        return self.store.fetch_all('''
+            SELECT schemaName, tableName FROM catalogTables
+            WHERE serverName = ? AND databaseName = ?
+            ORDER BY schemaName, tableName
+        ''', (server_name, database_name))
+
+    def get_watermark(self, server_name, database_name):
+        return self.store.fetch_one('''
+            SELECT tableCount, lastModified FROM catalogRefresh WHERE serverName = ? AND databaseName = ?
+        ''', (server_name, database_name))
+
+    def store_tables(self, server_name, database_name, tables, watermark):
+        # tables: (schema_name, table_name, modify_date); cached columns of changed or dropped tables are discarded
+        with self.store.transaction() as connection:
+            cached_rows = connection.execute('''
+                SELECT schemaName, tableName, modifyDate FROM catalogTables WHERE serverName = ? AND databaseName = ?
+            ''', (server_name, database_name)).fetchall()
+            cached = {(schema_name, table_name): modify_date for schema_name, table_name, modify_date in cached_rows}
+            current = {(schema_name, table_name): modify_date for schema_name, table_name, modify_date in tables}
+            stale = [key for key, modify_date in cached.items() if current.get(key) != modify_date]
+
+            connection.executemany('''
+                DELETE FROM catalogColumns WHERE serverName = ? AND databaseName = ? AND schemaName = ? AND tableName = ?
+            ''', [(server_name, database_name, schema_name, table_name) for schema_name, table_name in stale])
+            connection.execute('DELETE FROM catalogTables WHERE serverName = ? AND databaseName = ?', (server_name, database_name))
+            connection.executemany('''
+                INSERT INTO catalogTables (serverName, databaseName, schemaName, tableName, modifyDate) VALUES (?, ?, ?, ?, ?)
+            ''', [(server_name, database_name, schema_name, table_name, modify_date)
+                  for (schema_name, table_name), modify_date in current.items()])
+            connection.execute('''
+                INSERT INTO catalogRefresh (serverName, databaseName, tableCount, lastModified) VALUES (?, ?, ?, ?)
+                ON CONFLICT(serverName, databaseName) DO UPDATE SET tableCount = excluded.tableCount, lastModified = excluded.lastModified
+            ''', (server_name, database_name, watermark[0], watermark[1]))
+        logging.info(f"Catalog cache updated for [{server_name}].[{database_name}]: {len(current)} tables, {len(stale)} changed.")
+
+    def get_columns(self, server_name, database_name, schema_name, table_name):
+        return self.store.fetch_all('''
+            SELECT columnName, dataType, maxLength, isNullable FROM catalogColumns
+            WHERE serverName = ? AND databaseName = ? AND schemaName = ? AND tableName = ?
+            ORDER BY ordinal
+        ''', (server_name, database_name, schema_name, table_name), CatalogColumn)
+
+    def store_columns(self, server_name, database_name, schema_name, table_name, columns):
+        with self.store.transaction() as connection:
+            connection.execute('''
+                DELETE FROM catalogColumns WHERE serverName = ? AND databaseName = ? AND schemaName = ? AND tableName = ?
+            ''', (server_name, database_name, schema_name, table_name))
+            connection.executemany('''
+                INSERT INTO catalogColumns (serverName, databaseName, schemaName, tableName, ordinal, columnName, dataType, maxLength, isNullable)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(server_name, database_name, schema_name, table_name, ordinal) + tuple(column)
+                  for ordinal, column in enumerate(columns)])
+
+    def invalidate(self, server_name, database_name):
+        # Forget the watermark so the next refresh re-reads the table list and compares modify dates
+        self.store.execute('DELETE FROM catalogRefresh WHERE serverName = ? AND databaseName = ?', (server_name, database_name))
+        logging.info(f"Catalog cache invalidated for [{server_name}].[{database_name}].")
+
+def fetch_columns(engine, schema_name, table_name):
+    from sqlalchemy import text
+    with engine.connect() as connection:
+        result = connection.execute(text(COLUMNS_QUERY), {'schema_name': schema_name, 'table_name': table_name})
+        return [CatalogColumn._make(row) for row in result.fetchall()]
+
+class MetadataRefreshSignals(QObject):
+    databases_refreshed = Signal(str, list)    # server name, database names
+    tables_refreshed = Signal(str, str, list)  # server name, database name, (schema, table) pairs
+    error = Signal(str)
+
+class MetadataRefreshWorker(QRunnable):
+    def __init__(self, cache, engine, server_name, database_name=None):
+        # Without a database name the worker refreshes the server's database list
+        super().__init__()
+        self.cache = cache
+        self.engine = engine
+        self.server_name = server_name
+        self.database_name = database_name
+        self.signals = MetadataRefreshSignals()
+
+    def run(self):
+        detail = f"[{self.server_name}]" if self.database_name is None else f"[{self.server_name}].[{self.database_name}]"
+        try:
+            with instrumentation.operation('catalog refresh', detail) as operation:
+                if self.database_name is None:
+                    self.refresh_databases(operation)
+                else:
+                    self.refresh_tables(operation)
+        except Exception as e:
+            logging.error(f"Error refreshing catalog cache: {e}")
+            self.signals.error.emit(str(e))
+
+    def refresh_databases(self, operation):
+        from sqlalchemy import text
+        with operation.phase('connect'):
+            connection = self.engine.connect()
+        with connection, operation.phase('execute'):
+            databases = [row.name for row in connection.execute(text(DATABASES_QUERY)).fetchall()]
+        if databases != self.cache.get_databases(self.server_name):
+            self.cache.store_databases(self.server_name, databases)
+            self.signals.databases_refreshed.emit(self.server_name, databases)
+
+    def refresh_tables(self, operation):
+        from sqlalchemy import text
+        with operation.phase('connect'):
+            connection = self.engine.connect()
+        with connection, operation.phase('execute'):
+            row = connection.execute(text(TABLES_WATERMARK_QUERY)).one()
+            watermark = (row.table_count, str(row.last_modified))
+            if watermark == self.cache.get_watermark(self.server_name, self.database_name):
+                logging.info(f"Catalog cache for [{self.server_name}].[{self.database_name}] is up to date.")
+                return
+            tables = [(row.schema_name, row.table_name, str(row.modify_date))
+                      for row in connection.execute(text(TABLES_QUERY)).fetchall()]
+        self.cache.store_tables(self.server_name, self.database_name, tables, watermark)
+        self.signals.tables_refreshed.emit(self.server_name, self.database_name,
+                                           [(schema_name, table_name) for schema_name, table_name, _ in tables])
@@ -0,0 +1,366 @@
+import logging
+from PySide6.QtCore import Qt, QObject, QRunnable, QThreadPool, QAbstractItemModel, QModelIndex, Signal
+from PySide6.QtWidgets import QDockWidget, QTreeView, QAbstractItemView
+from PySide6.QtGui import QAction
+from instrumentation import instrumentation
+from metadata_cache import DATABASES_QUERY
+from row_counts import quote_name
+
+SCHEMAS_QUERY = """
+SELECT
+    s.name
+FROM
+    sys.schemas s
+WHERE
+    EXISTS (SELECT 1 FROM sys.objects o WHERE o.schema_id = s.schema_id AND o.type IN ('U', 'V', 'P', 'PC') AND o.is_ms_shipped = 0)
+ORDER BY
+    s.name;
+"""
+
+OBJECTS_QUERY = """
+SELECT
+    o.name
+FROM
+    sys.objects o
+WHERE
+    o.schema_id = SCHEMA_ID(:schema_name)
+    AND o.type IN ({object_types})
+    AND o.is_ms_shipped = 0
+ORDER BY
+    o.name;
+"""
+
+OBJECT_COLUMNS_QUERY = """
+SELECT
+    c.name,
+    TYPE_NAME(c.user_type_id) AS data_type,
+    c.max_length,
+    c.is_nullable
+FROM
+    sys.columns c
+WHERE
+    c.object_id = OBJECT_ID(:object_name)
+ORDER BY
+    c.column_id;
+"""
+
+OBJECT_INDEXES_QUERY = """
+SELECT
+    i.name,
+    i.type_desc,
+    i.is_unique,
+    i.is_primary_key
+FROM
+    sys.indexes i
+WHERE
+    i.object_id = OBJECT_ID(:object_name)
+    AND i.type > 0
+ORDER BY
+    i.index_id;
+"""
+
+# Folder label -> kind of the objects in it and their sys.objects type codes
+OBJECT_FOLDERS = {
+    'Tables': ('table', "'U'"),
+    'Views': ('view', "'V'"),
+    'Procedures': ('procedure', "'P', 'PC'"),
+}
+# Kinds whose children are fixed folders rather than rows read from the server
+STATIC_FOLDERS = {
+    'schema': ['Tables', 'Views', 'Procedures'],
+    'table': ['Columns', 'Indexes'],
+    'view': ['Columns', 'Indexes'],
+}
+LEAF_KINDS = ('procedure', 'column', 'index')
+# Column types shown with their length
+SIZED_TYPES = ('char', 'nchar', 'varchar', 'nvarchar', 'binary', 'varbinary')
+
+class ExplorerNode:
+    # Children stay None until the node is first expanded; a loaded level is kept until it is refreshed,
+    # which bumps the node's generation
+    __slots__ = ('kind', 'name', 'parent', 'row', 'children', 'loading', 'error', 'details', 'generation')
+
+    def __init__(self, kind, name, parent=None, row=0, details=None):
+        self.kind = kind
+        self.name = name
+        self.parent = parent
+        self.row = row
+        self.children = [] if kind in LEAF_KINDS else None
+        self.loading = False
+        self.error = None
+        self.details = details
+        self.generation = 0
+
+    def ancestor(self, kind):
+        node = self
+        while node is not None and node.kind != kind:
+            node = node.parent
+        return node
+
+    @property
+    def database_name(self):
+        node = self.ancestor('database')
+        return node.name if node else 'master'
+
+    @property
+    def schema_name(self):
+        node = self.ancestor('schema')
+        return node.name if node else None
+
+    @property
+    def object_name(self):
+        # Quoted for OBJECT_ID(); the closest table or view above the node
+        node = self.ancestor('table') or self.ancestor('view')
+        return f"{quote_name(node.schema_name)}.{quote_name(node.name)}" if node else None
+
+    def generations(self):
+        # A refresh anywhere above the node changes this, so loads started before it can be told apart
+        node, generations = self, []
+        while node is not None:
+            generations.append(node.generation)
+            node = node.parent
+        return tuple(generations)
+
+    def label(self):
+        if self.kind == 'column':
+            data_type, max_length, is_nullable = self.details
+            size = "" if data_type not in SIZED_TYPES else "(max)" if max_length == -1 else f"({max_length})"
+            return f"{self.name} ({data_type}{size}, {'null' if is_nullable else 'not null'})"
+        if self.kind == 'index':
+            type_desc, is_unique, is_primary_key = self.details
+            flags = ", primary key" if is_primary_key else ", unique" if is_unique else ""
+            return f"{self.name} ({type_desc.lower()}{flags})"
+        if self.kind == 'folder' and self.children is not None:
+            return f"{self.name} ({len(self.children):,})"
+        return self.name
+
+def child_query(node):
+    # SQL and parameters that list the children of a node loaded from the server
+    if node.kind == 'server':
+        return DATABASES_QUERY, {}
+    if node.kind == 'database':
+        return SCHEMAS_QUERY, {}
+    if node.name in OBJECT_FOLDERS:
+        return OBJECTS_QUERY.format(object_types=OBJECT_FOLDERS[node.name][1]), {'schema_name': node.schema_name}
+    if node.name == 'Columns':
+        return OBJECT_COLUMNS_QUERY, {'object_name': node.object_name}
+    return OBJECT_INDEXES_QUERY, {'object_name': node.object_name}
+
+def child_kind(node):
+    if node.kind == 'server':
+        return 'database'
+    if node.kind == 'database':
+        return 'schema'
+    if node.name in OBJECT_FOLDERS:
+        return OBJECT_FOLDERS[node.name][0]
+    return 'column' if node.name == 'Columns' else 'index'
+
+class ObjectLoadSignals(QObject):
+    loaded = Signal(object, object, list)  # node, load generation, rows
+    error = Signal(object, object, str)
+
+class ObjectLoadWorker(QRunnable):
+    def __init__(self, engine, node, generation):
+        super().__init__()
+        self.engine = engine
+        self.node = node
+        self.generation = generation
+        self.signals = ObjectLoadSignals()
+
+    def run(self):
+        from sqlalchemy import text
+        sql, parameters = child_query(self.node)
+        try:
+            with instrumentation.operation('explorer load', f"[{self.node.database_name}] {self.node.kind} {self.node.name}") as operation:
+                with operation.phase('connect'):
+                    connection = self.engine.connect()
+                with connection, operation.phase('execute'):
+                    rows = [tuple(row) for row in connection.execute(text(sql), parameters).fetchall()]
+                operation.rows = len(rows)
+            self.signals.loaded.emit(self.node, self.generation, rows)
+        except Exception as e:
+            logging.error(f"Error loading object explorer level: {e}")
+            self.signals.error.emit(self.node, self.generation, str(e))
+
+class ObjectTreeModel(QAbstractItemModel):
+    # Databases -> schemas -> tables/views/procedures -> columns/indexes, each level read in the background on
+    # first expand, so opening a server costs one query and memory follows what has been browsed
+    def __init__(self, engine_for, parent=None):
+        super().__init__(parent)
+        # engine_for(database_name) returns the pooled engine of that database on the current server
+        self.engine_for = engine_for
+        self.root = None
+        # Bumped when the server changes, so levels still loading for the old one are dropped
+        self.generation = 0
+        self._workers = set()
+
+    def set_server(self, server_name):
+        self.beginResetModel()
+        self.generation += 1
+        self.root = ExplorerNode('server', server_name) if server_name else None
+        self.endResetModel()
+
+    def node(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index_of(self, node):
+        if node is None or node is self.root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.node(parent)
+        if node is None or node.children is None or column != 0 or not 0 <= row < len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, 0, node.children[row])
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid():
+            return QModelIndex()
+        return self.index_of(index.internalPointer().parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        node = self.node(parent)
+        return 0 if node is None or node.children is None else len(node.children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent)
+        if node is None:
+            return False
+        # Unloaded levels show an expand arrow; expanding them fetches the children
+        return node.children is None or len(node.children) > 0
+
+    def canFetchMore(self, parent=QModelIndex()):
+        node = self.node(parent)
+        return node is not None and node.children is None and not node.loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        node = self.node(parent)
+        if node.kind in STATIC_FOLDERS:
+            self.set_children(node, [ExplorerNode('folder', name, node, row) for row, name in enumerate(STATIC_FOLDERS[node.kind])])
+            return
+        node.loading = True
+        node.error = None
+        self.emit_node_changed(node)
+        worker = ObjectLoadWorker(self.engine_for(node.database_name), node, self.load_generation(node))
+        worker.signals.loaded.connect(self.on_loaded)
+        worker.signals.error.connect(self.on_error)
+        self._workers.add(worker)
+        QThreadPool.globalInstance().start(worker)
+
+    def load_generation(self, node):
+        return self.generation, node.generations()
+
+    def is_current(self, node, generation):
+        # False once the server changed or the node, or a level above it, was refreshed while it loaded;
+        # a node dropped by a refresh must never get rows inserted under it
+        if generation != self.load_generation(node):
+            return False
+        while node is not self.root:
+            parent = node.parent
+            if parent is None or parent.children is None or node.row >= len(parent.children) or parent.children[node.row] is not node:
+                return False
+            node = parent
+        return True
+
+    def on_loaded(self, node, generation, rows):
+        self._workers = {worker for worker in self._workers if worker.node is not node}
+        if not self.is_current(node, generation):
+            return
+        node.loading = False
+        kind = child_kind(node)
+        self.set_children(node, [ExplorerNode(kind, row[0], node, row_number, row[1:] or None)
+                                 for row_number, row in enumerate(rows)])
+
+    def on_error(self, node, generation, message):
+        self._workers = {worker for worker in self._workers if worker.node is not node}
+        if not self.is_current(node, generation):
+            return
+        node.loading = False
+        node.error = message
+        self.emit_node_changed(node)
+
+    def set_children(self, node, children):
+        if children:
+            self.beginInsertRows(self.index_of(node), 0, len(children) - 1)
+            node.children = children
+            self.endInsertRows()
+        else:
+            node.children = children
+        self.emit_node_changed(node)
+
+    def refresh(self, index):
+        # Forgets a loaded level; it is read again the next time it is expanded
+        node = self.node(index)
+        if node is None or node.children is None or node.kind in LEAF_KINDS or node.loading:
+            return
+        node.generation += 1
+        if node.children:
+            self.beginRemoveRows(index, 0, len(node.children) - 1)
+            node.children = None
+            self.endRemoveRows()
+        else:
+            node.children = None
+        self.emit_node_changed(node)
+
+    def emit_node_changed(self, node):
+        if node is not self.root:
+            index = self.index_of(node)
+            self.dataChanged.emit(index, index)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.DisplayRole:
+            if node.loading:
+                return f"{node.label()} (loading...)"
+            if node.error:
+                return f"{node.label()} (error)"
+            return node.label()
+        if role == Qt.ToolTipRole and node.error:
+            return node.error
+        return None
+
+class ObjectExplorerPanel(QDockWidget):
+    # Double-clicking a table or view opens it like a click in the tables list
+    object_activated = Signal(str, str, str)  # database, schema, table or view
+
+    def __init__(self, engine_for, parent=None):
+        super().__init__("Object Explorer", parent)
+        self.setObjectName("objectExplorerPanel")
+        self.model = ObjectTreeModel(engine_for, self)
+        self.tree_view = QTreeView()
+        self.tree_view.setModel(self.model)
+        self.tree_view.setHeaderHidden(True)
+        self.tree_view.setUniformRowHeights(True)
+        self.tree_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tree_view.setExpandsOnDoubleClick(True)
+        self.tree_view.doubleClicked.connect(self.on_double_clicked)
+
+        self.tree_view.setContextMenuPolicy(Qt.ActionsContextMenu)
+        refresh_action = QAction("Refresh", self.tree_view)
+        refresh_action.setShortcut(Qt.Key_F5)
+        refresh_action.setShortcutContext(Qt.WidgetShortcut)
+        refresh_action.triggered.connect(self.refresh_current)
+        self.tree_view.addAction(refresh_action)
+        self.setWidget(self.tree_view)
+
+    def set_server(self, server_name):
+        self.model.set_server(server_name)
+
+    def refresh_current(self):
+        index = self.tree_view.currentIndex()
+        # The server level is always shown, so it is read again right away
+        was_expanded = self.tree_view.isExpanded(index) or not index.isValid()
+        self.model.refresh(index)
+        if was_expanded and self.model.canFetchMore(index):
+            self.model.fetchMore(index)
+
+    def on_double_clicked(self, index):
+        node = self.model.node(index)
+        if node is not None and node.kind in ('table', 'view'):
+            self.object_activated.emit(node.database_name, node.schema_name, node.name)
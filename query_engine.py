@@ -0,0 +1,276 @@
+import logging
+import threading
+import time
+from script_runner import split_script, split_statements
+from instrumentation import instrumentation
+
+# Rows pulled from the cursor between progress updates and cancel checks
+FETCH_SIZE = 5000
+# Rows shown per page; the next page is only fetched when the user scrolls or clicks "Load more"
+PAGE_SIZE = 50000
+# Fetch budget per result set (rows) and per script (bytes); fetching stops once either limit is reached
+MAX_RESULT_ROWS = 2000000
+MAX_RESULT_BYTES = 1024 * 1024 * 1024
+
+class QueryCancelled(Exception):
+    pass
+
+class QueryRun:
+    # Runs a script on one connection and hands its results over page by page. Nothing here knows about Qt:
+    # the GUI's QueryWorker turns the on_* hooks into signals, the batch runner writes the pages to files.
+    # With paged=False every result is read to the end instead of waiting for request_more().
+    # max_rows / max_bytes of None fetch without a limit.
+    def __init__(self, engine, command, fetch_size=FETCH_SIZE, page_size=PAGE_SIZE,
+                 max_rows=MAX_RESULT_ROWS, max_bytes=MAX_RESULT_BYTES, paged=True, operation_kind='query'):
+        self.engine = engine
+        self.command = command
+        self.fetch_size = fetch_size
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.paged = paged
+        # Timed phases of this run; the GUI adds its render time and finishes it
+        self.operation = instrumentation.begin(operation_kind, command)
+        self.rows_fetched = 0
+        self.result_rows = 0
+        self.bytes_fetched = 0
+        self.result_count = 0
+        self.batch_count = 0
+        self.batch_number = 0
+        self.affected_rows = 0
+        # Set once any batch ran something other than a query, so caches can be invalidated
+        self.modified = False
+        # 'ok', 'error' or 'cancelled' once execute() is done, for the query history
+        self.status = None
+        self.error_message = None
+        self.started_at = None
+        self._waited = 0.0
+        self._cancel_requested = threading.Event()
+        self._more_requested = threading.Event()
+        self._lock = threading.Lock()
+        self._dbapi_connection = None
+        self._cursor = None
+        self._waiting_for_more = False
+
+    # Called on the executing thread; the defaults ignore the events
+    def on_progress(self, rows_fetched, elapsed):
+        pass
+
+    def on_page(self, result_number, df, elapsed, has_more):
+        pass
+
+    def on_limit_reached(self, message):
+        pass
+
+    def on_batch_done(self, batch_number, batch_count, batch_seconds, affected_rows):
+        pass
+
+    def on_command_done(self, affected_rows, elapsed):
+        pass
+
+    def make_page(self, columns, rows):
+        # Returns the page handed to on_page and its size in bytes; a DataFrame unless a subclass keeps
+        # its pages in another form
+        import pandas as pd
+        df = pd.DataFrame.from_records(rows, columns=columns)
+        return df, int(df.memory_usage(index=False, deep=True).sum())
+
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return time.perf_counter() - self.started_at
+
+    def request_more(self):
+        self._more_requested.set()
+
+    def cancel(self):
+        # Safe to call from another thread while execute() is blocked inside the driver
+        self._cancel_requested.set()
+        with self._lock:
+            # Nothing is running on the server while the run waits for "Load more"
+            if self._dbapi_connection is not None and not self._waiting_for_more:
+                logging.info("Cancelling running SQL command.")
+                cancel_statement(self._dbapi_connection, self._cursor)
+        self._more_requested.set()
+
+    def execute(self):
+        # Sets status and error_message, then re-raises QueryCancelled or the error
+        self.started_at = time.perf_counter()
+        logging.info(f"Executing SQL command: {self.command}")
+        try:
+            with instrumentation.profiled():
+                self._run()
+            self.status = 'ok'
+        except QueryCancelled:
+            self.status = 'cancelled'
+            self.operation.error = "cancelled"
+            logging.info(f"SQL command cancelled after {self.elapsed():.2f}s.")
+            raise
+        except Exception as e:
+            logging.error(f"Error executing SQL command: {e}")
+            self.status = 'error'
+            self.error_message = self.operation.error = str(e)
+            if self.batch_count > 1:
+                self.error_message = self.operation.error = f"Batch {self.batch_number} of {self.batch_count}: {e}"
+            raise
+
+    def _run(self):
+        with self.operation.phase('connect'):
+            connection = self.engine.connect()
+        with connection:
+            with self._lock:
+                self._dbapi_connection = connection.connection.dbapi_connection
+            try:
+                self._run_script(connection.connection, connection.dialect.name)
+            except QueryCancelled:
+                raise
+            except Exception:
+                if self._cancel_requested.is_set():
+                    # The statement was interrupted; don't hand a connection in an unknown state back to the pool
+                    self._forget_connection()
+                    connection.invalidate()
+                    raise QueryCancelled()
+                raise
+            finally:
+                self._forget_connection()
+
+    def _forget_connection(self):
+        with self._lock:
+            self._dbapi_connection = None
+            self._cursor = None
+
+    def _check_cancelled(self):
+        if self._cancel_requested.is_set():
+            raise QueryCancelled()
+
+    def _run_script(self, dbapi_connection, dialect_name):
+        # All batches share one connection and cursor; each batch is committed on its own like SSMS does
+        batches = split_script(self.command, per_statement=dialect_name != 'mssql')
+        self.batch_count = len(batches)
+        cursor = dbapi_connection.cursor()
+        with self._lock:
+            self._cursor = cursor
+        try:
+            for batch_number, batch in enumerate(batches, 1):
+                self.batch_number = batch_number
+                self._check_cancelled()
+                batch_started_at = time.perf_counter()
+                self._waited = 0.0
+                # Only a single-statement last batch is paged with "Load more"; everything else is read
+                # to the end so later result sets and the commit aren't held back by an unread page
+                pageable = self.paged and batch_number == len(batches) and len(split_statements(batch)) == 1
+                try:
+                    with self.operation.phase('execute'):
+                        cursor.execute(batch)
+                    affected_rows = self._read_results(cursor, pageable)
+                    dbapi_connection.commit()
+                except Exception:
+                    if not self._cancel_requested.is_set():
+                        dbapi_connection.rollback()
+                    raise
+                batch_seconds = time.perf_counter() - batch_started_at - self._waited
+                self.on_batch_done(batch_number, len(batches), batch_seconds, affected_rows)
+        finally:
+            cursor.close()
+        if self.result_count == 0:
+            self.on_command_done(self.affected_rows, self.elapsed())
+        logging.info(f"SQL script of {len(batches)} batches executed in {self.elapsed():.2f}s")
+
+    def _read_results(self, cursor, pageable):
+        affected_rows = -1
+        while True:
+            if cursor.description is not None:
+                self._fetch_result(cursor, pageable)
+            else:
+                self.modified = True
+                if cursor.rowcount >= 0:
+                    affected_rows = max(affected_rows, 0) + cursor.rowcount
+                    self.affected_rows += cursor.rowcount
+            if not next_result_set(cursor):
+                return affected_rows
+
+    def _fetch_result(self, cursor, pageable):
+        # Rows are streamed from the driver's cursor as the pages are fetched
+        result_number = self.result_count
+        self.result_count += 1
+        self.result_rows = 0
+        columns = [column[0] for column in cursor.description]
+        while True:
+            rows, exhausted = self._fetch_page(cursor)
+            with self.operation.phase('dataframe'):
+                if rows and not isinstance(rows[0], tuple):
+                    rows = [tuple(row) for row in rows]
+                page, page_bytes = self.make_page(columns, rows)
+                self.bytes_fetched += page_bytes
+            limit_message = None if exhausted else self._check_budget()
+            if limit_message and self._at_end(cursor):
+                # The result ended exactly at the limit; nothing was cut off
+                exhausted, limit_message = True, None
+            has_more = not exhausted and limit_message is None
+            self.on_page(result_number, page, self.elapsed(), has_more and pageable)
+            if limit_message:
+                logging.warning(limit_message)
+                self.on_limit_reached(limit_message)
+            if not has_more:
+                break
+            if pageable:
+                self._wait_for_more_request()
+
+    def _fetch_page(self, cursor):
+        rows = []
+        page_size = self.page_size if self.max_rows is None else min(self.page_size, self.max_rows - self.result_rows)
+        while len(rows) < page_size:
+            self._check_cancelled()
+            with self.operation.phase('fetch'):
+                batch = cursor.fetchmany(min(self.fetch_size, page_size - len(rows)))
+            if not batch:
+                return rows, True
+            rows.extend(batch)
+            self.result_rows += len(batch)
+            self.rows_fetched += len(batch)
+            self.on_progress(self.rows_fetched, self.elapsed())
+        self._check_cancelled()
+        return rows, False
+
+    def _at_end(self, cursor):
+        # Reads one row past a limit; it is dropped with the rest of the result
+        with self.operation.phase('fetch'):
+            return cursor.fetchone() is None
+
+    def _check_budget(self):
+        if self.max_rows is not None and self.result_rows >= self.max_rows:
+            return f"Stopped fetching at the row limit ({self.max_rows:,} rows)."
+        if self.max_bytes is not None and self.bytes_fetched >= self.max_bytes:
+            return f"Stopped fetching at the memory limit ({self.bytes_fetched / (1024 * 1024):,.0f} MB)."
+        return None
+
+    def _wait_for_more_request(self):
+        waiting_since = time.perf_counter()
+        with self._lock:
+            self._waiting_for_more = True
+        self._more_requested.wait()
+        with self._lock:
+            self._waiting_for_more = False
+        self._more_requested.clear()
+        self._waited += time.perf_counter() - waiting_since
+        self.operation.idle += time.perf_counter() - waiting_since
+        self._check_cancelled()
+
+def next_result_set(cursor):
+    # pyodbc returns every result set of a batch on one cursor; sqlite3 cursors only ever have one
+    nextset = getattr(cursor, 'nextset', None)
+    if nextset is None:
+        return False
+    return bool(nextset())
+
+def cancel_statement(dbapi_connection, cursor):
+    # pyodbc sends SQLCancel for the running statement; sqlite3 can only interrupt the whole connection
+    try:
+        if cursor is not None and hasattr(cursor, 'cancel'):
+            cursor.cancel()
+        elif hasattr(dbapi_connection, 'interrupt'):
+            dbapi_connection.interrupt()
+        else:
+            logging.warning("Driver does not support cancelling a running statement.")
+    except Exception as e:
+        logging.error(f"Error cancelling SQL command: {e}")
@@ -0,0 +1,97 @@
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+from typing import NamedTuple, Optional
+
+# Entries are written in one transaction per batch, at most this often
+FLUSH_INTERVAL = 1.0
+MAX_BATCH_SIZE = 500
+# Rows read per page by the history panel
+HISTORY_PAGE_SIZE = 200
+
+HISTORY_COLUMNS = "id, executedAt, serverName, databaseName, query, durationMs, rowCount, status, message"
+
+def match_expression(search_text):
+    # Every word must match as a prefix; quoting keeps FTS5 syntax characters literal
+    words = re.findall(r'\w+', search_text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+class HistoryEntry(NamedTuple):
+    id: int
+    executed_at: float
+    server_name: str
+    database_name: str
+    query: str
+    duration_ms: float
+    row_count: Optional[int]
+    status: str
+    message: Optional[str]
+
+class QueryHistory:
+    def __init__(self, store):
+        # Tables are created by the local store's migrations
+        self.store = store
+        self.fts_enabled = store.has_table('queryHistorySearch')
+        # Bumped after every flush so the history panel knows to reload
+        self.version = 0
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="query-history-writer", daemon=True)
+        self._writer.start()
+
+    def record(self, server_name, database_name, query, duration, row_count, status, message=None):
+        # Never blocks the caller; the writer thread stores entries in batches
+        self._queue.put((time.time(), server_name, database_name, query, duration * 1000, row_count, status, message))
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+
+    def _write_loop(self):
+        running = True
+        while running:
+            entry = self._queue.get()
+            if entry is None:
+                break
+            batch = [entry]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < MAX_BATCH_SIZE:
+                try:
+                    entry = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if entry is None:
+                    running = False
+                    break
+                batch.append(entry)
+            try:
+                with self.store.transaction() as connection:
+                    connection.executemany('''
+                        INSERT INTO queryHistory (executedAt, serverName, databaseName, query, durationMs, rowCount, status, message)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', batch)
+                self.version += 1
+            except sqlite3.Error as e:
+                logging.error(f"Error writing query history: {e}")
+
+    def page(self, search_text='', before_id=None, limit=HISTORY_PAGE_SIZE):
+        # Newest first; paging continues below the last id shown, so deep pages cost the same as the first
+        before_id = before_id if before_id is not None else 2 ** 63 - 1
+        expression = match_expression(search_text)
+        if not expression:
+            return self.store.fetch_all(f'''
+                SELECT {HISTORY_COLUMNS} FROM queryHistory WHERE id < ? ORDER BY id DESC LIMIT ?
+            ''', (before_id, limit), HistoryEntry)
+        if self.fts_enabled:
+            return self.store.fetch_all(f'''
+                SELECT {HISTORY_COLUMNS} FROM queryHistory WHERE id IN (
+                    SELECT rowid FROM queryHistorySearch
+                    WHERE queryHistorySearch MATCH ? AND rowid < ?
+                    ORDER BY rowid DESC LIMIT ?
+                ) ORDER BY id DESC
+            ''', (expression, before_id, limit), HistoryEntry)
+        return self.store.fetch_all(f'''
+            SELECT {HISTORY_COLUMNS} FROM queryHistory WHERE query LIKE ? AND id < ? ORDER BY id DESC LIMIT ?
+        ''', (f"%{search_text.strip()}%", before_id, limit), HistoryEntry)
@@ -0,0 +1,86 @@
+import logging
+import re
+import time
+from collections import OrderedDict
+from script_runner import SCRIPT_TOKEN_PATTERN
+
+# Total size of cached results; the least recently viewed result is dropped beyond this
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+# Tokens kept exactly as written: whitespace inside them is part of the query's meaning
+VERBATIM_TOKEN_PREFIXES = ("'", '"', '[', '--', '/*')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def normalize_sql(sql):
+    # Whitespace runs between tokens and trailing semicolons don't change the result; strings,
+    # quoted or bracketed names and comments are kept as written
+    parts = []
+    plain = []
+    for match in SCRIPT_TOKEN_PATTERN.finditer(sql):
+        token = match.group()
+        if token.startswith(VERBATIM_TOKEN_PREFIXES):
+            parts.append(WHITESPACE_PATTERN.sub(' ', ''.join(plain)))
+            parts.append(token)
+            plain = []
+        else:
+            plain.append(token)
+    parts.append(WHITESPACE_PATTERN.sub(' ', ''.join(plain)))
+    return ''.join(parts).strip().rstrip(';').rstrip()
+
+def result_key(server_name, database_name, sql):
+    return (server_name, database_name, normalize_sql(sql))
+
+class CachedResult:
+    # Columns are shared with the grid model, not copied; their sizes are exact
+    def __init__(self, headers, columns, complete, table_info=None):
+        self.headers = headers
+        self.columns = columns
+        self.complete = complete
+        self.table_info = table_info
+        self.row_count = len(columns[0]) if columns else 0
+        self.nbytes = sum(column.nbytes for column in columns)
+        self.cached_at = time.time()
+
+class ResultCache:
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        # Called with the key of every evicted result so open views can let go of it too
+        self.on_evict = None
+
+    def get(self, key):
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        self._remove(key)
+        if result.nbytes > self.max_bytes:
+            logging.info(f"Result of {result.nbytes:,} bytes is larger than the cache; not cached.")
+            return
+        self._entries[key] = result
+        self.total_bytes += result.nbytes
+        while self.total_bytes > self.max_bytes:
+            evicted_key = next(iter(self._entries))
+            self._remove(evicted_key)
+            logging.info(f"Evicted cached result for {evicted_key[:2]}.")
+            if self.on_evict:
+                self.on_evict(evicted_key)
+
+    def discard(self, key):
+        self._remove(key)
+
+    def _remove(self, key):
+        result = self._entries.pop(key, None)
+        if result is not None:
+            self.total_bytes -= result.nbytes
+
+    def invalidate_database(self, server_name, database_name):
+        for key in [key for key in self._entries if key[:2] == (server_name, database_name)]:
+            self._remove(key)
+
+    def cached_tables(self, server_name, database_name):
+        return {result.table_info for key, result in self._entries.items()
+                if key[:2] == (server_name, database_name) and result.table_info}
@@ -0,0 +1,259 @@
+import logging
+import numpy as np
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QLabel, QTableView, QHeaderView
+from column_store import ResultColumns, concat_columns, filter_mask, memory_report
+
+# Number of rows sampled when sizing columns, independent of the result size
+COLUMN_WIDTH_SAMPLE_ROWS = 200
+MAX_COLUMN_WIDTH = 400
+COLUMN_PADDING = 16
+# Cells are formatted a block of view rows at a time and kept until the rows or their order change
+TEXT_BLOCK_ROWS = 256
+MAX_TEXT_BLOCKS = 512
+RIGHT_ALIGNED = int(Qt.AlignRight | Qt.AlignVCenter)
+
+class ResultTableModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._headers = []
+        self._columns = []
+        self._row_count = 0
+        # Called by fetchMore() when the view scrolls to the end of a partially fetched result
+        self.fetch_more_handler = None
+        self._has_more = False
+        self._fetch_pending = False
+        # Sorting and filtering only build a row order over the fetched columns
+        self._order = None
+        # (column, block) -> formatted texts of TEXT_BLOCK_ROWS view rows
+        self._text_blocks = {}
+        self._sort_column = None
+        self._sort_ascending = True
+        self._filters = {}
+
+    def set_result(self, result, has_more=False):
+        # Keep the compact columns; cells are formatted on demand in data()
+        self.beginResetModel()
+        self._headers = list(result.headers)
+        self._columns = list(result.columns)
+        self._row_count = len(result)
+        self._has_more = has_more
+        self._fetch_pending = False
+        self._clear_view_state()
+        self.endResetModel()
+        logging.info(f"Result model loaded {self._row_count} rows x {len(self._headers)} columns "
+                     f"({self.nbytes() / (1024 * 1024):,.1f} MB).")
+
+    def append_result(self, result, has_more=False):
+        self._has_more = has_more
+        self._fetch_pending = False
+        if len(result) == 0:
+            return
+        columns = [concat_columns(column, new_column) for column, new_column in zip(self._columns, result.columns)]
+        if self._order is not None:
+            # New rows can land anywhere in a sorted or filtered view
+            self.beginResetModel()
+            self._columns = columns
+            self._row_count += len(result)
+            self._order = self._build_order()
+            self._text_blocks = {}
+            self.endResetModel()
+            return
+        first_row = self._row_count
+        self.beginInsertRows(QModelIndex(), first_row, first_row + len(result) - 1)
+        self._columns = columns
+        self._row_count += len(result)
+        # The last block may have been formatted before it was full
+        self._text_blocks = {}
+        self.endInsertRows()
+
+    def set_has_more(self, has_more):
+        self._has_more = has_more
+        self._fetch_pending = False
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._has_more and not self._fetch_pending and self.fetch_more_handler is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self._fetch_pending = True
+            self.fetch_more_handler()
+
+    def set_columns(self, headers, columns, has_more=False):
+        self.beginResetModel()
+        self._headers = list(headers)
+        self._columns = list(columns)
+        self._row_count = len(columns[0]) if columns else 0
+        self._has_more = has_more
+        self._fetch_pending = False
+        self._clear_view_state()
+        self.endResetModel()
+
+    def snapshot(self):
+        return self._headers, self._columns
+
+    def nbytes(self):
+        return sum(column.nbytes for column in self._columns)
+
+    def set_records(self, headers, records):
+        self.set_result(ResultColumns.from_rows(headers, records))
+
+    def clear(self):
+        self.beginResetModel()
+        self._headers = []
+        self._columns = []
+        self._row_count = 0
+        self._has_more = False
+        self._clear_view_state()
+        self.endResetModel()
+
+    def _clear_view_state(self):
+        self._text_blocks = {}
+        self._order = None
+        self._sort_column = None
+        self._sort_ascending = True
+        self._filters = {}
+
+    def sort_state(self):
+        return self._sort_column, self._sort_ascending
+
+    def filter_text(self, column):
+        return self._filters.get(column, '')
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # A negative column restores the order rows were fetched in
+        self._sort_column = column if column >= 0 else None
+        self._sort_ascending = order == Qt.AscendingOrder
+        self._refresh_order()
+
+    def set_filters(self, filters):
+        for column, filter_text in filters.items():
+            if filter_text.strip():
+                self._filters[column] = filter_text.strip()
+            else:
+                self._filters.pop(column, None)
+        self._refresh_order()
+
+    def _refresh_order(self):
+        self.beginResetModel()
+        self._order = self._build_order()
+        self._text_blocks = {}
+        self.endResetModel()
+
+    def _build_order(self):
+        order = None
+        if self._sort_column is not None and self._sort_column < len(self._columns):
+            order = self._columns[self._sort_column].sort_indices(self._sort_ascending)
+        if self._filters:
+            mask = np.logical_and.reduce([filter_mask(self._columns[column], filter_text)
+                                          for column, filter_text in self._filters.items()
+                                          if column < len(self._columns)])
+            order = np.flatnonzero(mask) if order is None else order[mask[order]]
+        return order
+
+    def source_rows(self):
+        # Row positions in the fetched columns, in view order
+        if self._order is None:
+            return np.arange(self._row_count)
+        return self._order
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self._order is not None:
+            return len(self._order)
+        return self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        column = index.column()
+        if role == Qt.TextAlignmentRole:
+            return RIGHT_ALIGNED if self._columns[column].numeric else None
+        if role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        block, offset = divmod(index.row(), TEXT_BLOCK_ROWS)
+        texts = self._text_blocks.get((column, block))
+        if texts is None:
+            if len(self._text_blocks) >= MAX_TEXT_BLOCKS:
+                self._text_blocks = {}
+            first_row = block * TEXT_BLOCK_ROWS
+            texts = self._text_blocks[(column, block)] = self.column_texts(
+                column, np.arange(first_row, min(first_row + TEXT_BLOCK_ROWS, self.rowCount())))
+        return texts[offset]
+
+    def column_texts(self, column, view_rows):
+        # One vectorized formatting pass over the given view rows of a column
+        rows = view_rows if self._order is None else self._order[view_rows]
+        return self._columns[column].format(rows).tolist()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            if 0 <= section < len(self._headers):
+                return self._headers[section]
+            return None
+        return str(section + 1)
+
+    def sample_rows(self, sample_size=COLUMN_WIDTH_SAMPLE_ROWS):
+        # Evenly spaced rows across the whole result, always including the first ones
+        row_count = self.rowCount()
+        if row_count <= sample_size:
+            return range(row_count)
+        return np.linspace(0, row_count - 1, sample_size, dtype=np.int64)
+
+def resize_columns_to_sample(table_view, sample_size=COLUMN_WIDTH_SAMPLE_ROWS):
+    model = table_view.model()
+    metrics = table_view.fontMetrics()
+    header_metrics = table_view.horizontalHeader().fontMetrics()
+    rows = np.asarray(model.sample_rows(sample_size), dtype=np.int64)
+
+    for col_idx in range(model.columnCount()):
+        width = header_metrics.horizontalAdvance(model.headerData(col_idx, Qt.Horizontal))
+        for text in model.column_texts(col_idx, rows):
+            width = max(width, metrics.horizontalAdvance(text))
+            if width >= MAX_COLUMN_WIDTH:
+                break
+        table_view.setColumnWidth(col_idx, min(width + COLUMN_PADDING, MAX_COLUMN_WIDTH))
+
+def toggle_sort(table_view, section):
+    # Clicking a header sorts ascending, clicking it again flips the direction
+    model = table_view.model()
+    sort_column, ascending = model.sort_state()
+    order = Qt.DescendingOrder if sort_column == section and ascending else Qt.AscendingOrder
+    model.sort(section, order)
+
+def sync_sort_indicator(table_view):
+    sort_column, ascending = table_view.model().sort_state()
+    order = Qt.AscendingOrder if ascending else Qt.DescendingOrder
+    table_view.horizontalHeader().setSortIndicator(-1 if sort_column is None else sort_column, order)
+
+def show_memory_report(table_view):
+    # How each column of the result is stored and what it takes, next to the same data as Python objects
+    headers, columns = table_view.model().snapshot()
+    report_headers, records = memory_report(headers, columns)
+    total_bytes, object_bytes = records[-1][6], records[-1][7]
+    dialog = QDialog(table_view)
+    dialog.setWindowTitle("Result Memory")
+    summary = QLabel(f"{records[-1][3]:,} rows x {len(headers)} columns: {total_bytes / (1024 * 1024):,.1f} MB "
+                     f"(about {object_bytes / (1024 * 1024):,.1f} MB as Python objects)")
+    report_view = QTableView()
+    report_view.setModel(ResultTableModel(report_view))
+    report_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    report_view.verticalHeader().setDefaultSectionSize(report_view.fontMetrics().height() + 6)
+    report_view.model().set_records(report_headers, records)
+    resize_columns_to_sample(report_view)
+    layout = QVBoxLayout()
+    layout.addWidget(summary)
+    layout.addWidget(report_view)
+    dialog.setLayout(layout)
+    dialog.resize(720, 420)
+    dialog.exec()
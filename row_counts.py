@@ -0,0 +1,123 @@
+import logging
+import threading
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+def quote_name(name):
+    return f"[{name.replace(']', ']]')}]"
+
+def quote_sqlite_name(name):
+    return '"' + name.replace('"', '""') + '"'
+
+class RowCountProvider:
+    # Estimates are cached per (server, database, schema, table); exact counts are never cached
+    def __init__(self):
+        self._estimates = {}
+        self._lock = threading.Lock()
+
+    def cached_estimate(self, key):
+        with self._lock:
+            return self._estimates.get(key)
+
+    def estimate(self, engine, key):
+        cached = self.cached_estimate(key)
+        if cached is not None:
+            return cached
+        _, _, schema_name, table_name = key
+        with engine.connect() as connection:
+            row_count = self.query_estimate(connection, schema_name, table_name)
+        with self._lock:
+            self._estimates[key] = row_count
+        return row_count
+
+    def exact(self, engine, key):
+        _, _, schema_name, table_name = key
+        with engine.connect() as connection:
+            row_count = self.query_exact(connection, schema_name, table_name)
+        # An exact count is the best estimate until the table changes again
+        with self._lock:
+            self._estimates[key] = row_count
+        return row_count
+
+    def invalidate(self, server_name, database_name):
+        with self._lock:
+            self._estimates = {key: row_count for key, row_count in self._estimates.items()
+                               if key[:2] != (server_name, database_name)}
+
+    def query_estimate(self, connection, schema_name, table_name):
+        raise NotImplementedError
+
+    def query_exact(self, connection, schema_name, table_name):
+        raise NotImplementedError
+
+class SqlServerRowCountProvider(RowCountProvider):
+    # Row counts kept by the storage engine for the heap or clustered index; no table scan
+    PARTITION_STATS_QUERY = """
+    SELECT SUM(ps.row_count)
+    FROM sys.dm_db_partition_stats ps
+    WHERE ps.object_id = OBJECT_ID(:object_name) AND ps.index_id IN (0, 1);
+    """
+    # Fallback for logins without VIEW DATABASE STATE
+    PARTITIONS_QUERY = """
+    SELECT SUM(p.rows)
+    FROM sys.partitions p
+    WHERE p.object_id = OBJECT_ID(:object_name) AND p.index_id IN (0, 1);
+    """
+
+    def query_estimate(self, connection, schema_name, table_name):
+        from sqlalchemy import text
+        object_name = f"{quote_name(schema_name)}.{quote_name(table_name)}"
+        try:
+            row_count = connection.execute(text(self.PARTITION_STATS_QUERY), {'object_name': object_name}).scalar()
+        except Exception as e:
+            logging.info(f"Partition stats unavailable, falling back to sys.partitions: {e}")
+            connection.rollback()
+            row_count = connection.execute(text(self.PARTITIONS_QUERY), {'object_name': object_name}).scalar()
+        return int(row_count or 0)
+
+    def query_exact(self, connection, schema_name, table_name):
+        from sqlalchemy import text
+        query = text(f"SELECT COUNT_BIG(*) FROM {quote_name(schema_name)}.{quote_name(table_name)}")
+        return int(connection.execute(query).scalar())
+
+class SqliteRowCountProvider(RowCountProvider):
+    # Local stand-in: the largest rowid is a constant-time upper bound on the row count
+    def query_estimate(self, connection, schema_name, table_name):
+        row_count = connection.exec_driver_sql(f'SELECT MAX(rowid) FROM {quote_sqlite_name(table_name)}').scalar()
+        return int(row_count or 0)
+
+    def query_exact(self, connection, schema_name, table_name):
+        return int(connection.exec_driver_sql(f'SELECT COUNT(*) FROM {quote_sqlite_name(table_name)}').scalar())
+
+class RowCountSignals(QObject):
+    # The count is an object: a Qt int is 32-bit and the largest tables have more rows than that
+    counted = Signal(object, object, bool)  # table key, row count, exact
+    error = Signal(object, str)
+
+class RowCountWorker(QRunnable):
+    def __init__(self, provider, engine, key, exact=False):
+        super().__init__()
+        self.provider = provider
+        self.engine = engine
+        self.key = key
+        self.exact = exact
+        self.signals = RowCountSignals()
+        self._cancel_requested = threading.Event()
+
+    def cancel(self):
+        # A count that already reached the server still finishes there, but its result is dropped
+        self._cancel_requested.set()
+
+    def run(self):
+        if self._cancel_requested.is_set():
+            return
+        try:
+            if self.exact:
+                row_count = self.provider.exact(self.engine, self.key)
+            else:
+                row_count = self.provider.estimate(self.engine, self.key)
+            if not self._cancel_requested.is_set():
+                self.signals.counted.emit(self.key, row_count, self.exact)
+        except Exception as e:
+            logging.error(f"Error counting rows for {self.key}: {e}")
+            if not self._cancel_requested.is_set():
+                self.signals.error.emit(self.key, str(e))
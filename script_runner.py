@@ -0,0 +1,64 @@
+import re
+
+# Strings, comments and bracketed names are single tokens, so separators inside them are never seen
+SCRIPT_TOKEN_PATTERN = re.compile(
+    r"--[^\n]*"
+    r"|/\*.*?(?:\*/|$)"
+    r"|'(?:[^']|'')*(?:'|$)"
+    r'|"[^"]*(?:"|$)'
+    r"|\[[^\]]*(?:\]|$)"
+    r"|;"
+    r"|\n"
+    r"|[^'\"\[/;\n-]+"
+    r"|.",
+    re.DOTALL
+)
+GO_PATTERN = re.compile(r'\s*GO(?:\s+(\d+))?\s*(?:--[^\n]*)?', re.IGNORECASE)
+COMMENT_PATTERN = re.compile(r"--[^\n]*|/\*.*?(?:\*/|$)", re.DOTALL)
+
+def split_batches(script):
+    # GO on a line of its own ends a batch; "GO n" repeats the batch n times
+    batches = []
+    batch_lines = []
+    line_tokens = []
+    for match in SCRIPT_TOKEN_PATTERN.finditer(script + '\n'):
+        token = match.group()
+        if token != '\n':
+            line_tokens.append(token)
+            continue
+        line = ''.join(line_tokens)
+        line_tokens = []
+        go_match = GO_PATTERN.fullmatch(line)
+        if go_match:
+            batch = '\n'.join(batch_lines).strip()
+            if batch:
+                batches.extend([batch] * int(go_match.group(1) or 1))
+            batch_lines = []
+        else:
+            batch_lines.append(line)
+    batch = '\n'.join(batch_lines).strip()
+    if batch:
+        batches.append(batch)
+    return batches
+
+def split_statements(batch):
+    statements = []
+    tokens = []
+    for match in SCRIPT_TOKEN_PATTERN.finditer(batch):
+        token = match.group()
+        if token == ';':
+            statements.append(''.join(tokens))
+            tokens = []
+        else:
+            tokens.append(token)
+    statements.append(''.join(tokens))
+    # Pieces holding nothing but whitespace and comments are not sent to the server
+    return [statement.strip() for statement in statements if COMMENT_PATTERN.sub('', statement).strip()]
+
+def split_script(script, per_statement=False):
+    # SQL Server runs a whole batch per round trip (variables are batch-scoped);
+    # drivers that accept one statement per execute get the batches split further
+    batches = split_batches(script)
+    if not per_statement:
+        return batches
+    return [statement for batch in batches for statement in split_statements(batch)]
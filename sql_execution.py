@@ -1,50 +1,105 @@
-import pandas as pd
 import logging
-from PySide6.QtWidgets import QMessageBox, QTableWidgetItem
-from sqlalchemy import text
-
-def execute_sql(engine, query, output_table, status_bar):
-    if not engine:
-        QMessageBox.warning(None, "Connection Error", "Please connect to the database first.")
-        logging.error("Execute SQL failed: No database connection.")
-        return
-    
-    command = query.strip()
-    logging.info(f"Executing SQL command: {command}")
-    if command:
+from PySide6.QtCore import QObject, QRunnable, Signal
+from result_model import resize_columns_to_sample
+from query_engine import QueryRun, QueryCancelled
+from fan_out import FanOut
+from column_store import ResultColumns
+
+class QueryWorkerSignals(QObject):
+    progress = Signal(int, float)         # rows fetched, elapsed seconds
+    batch_ready = Signal(int, object, float, bool)  # result set number, ResultColumns page, elapsed seconds, more rows available
+    limit_reached = Signal(str)
+    batch_done = Signal(int, int, float, int)  # batch number, batch count, batch seconds, affected rows (-1 if none)
+    command_done = Signal(int, float)     # affected rows, elapsed seconds; only for scripts without result sets
+    error = Signal(str)
+    cancelled = Signal()
+    finished = Signal()
+
+class QueryWorker(QueryRun, QRunnable):
+    # The execution core from query_engine, run on the thread pool and reporting through Qt signals
+    def __init__(self, engine, command, **options):
+        QueryRun.__init__(self, engine, command, **options)
+        QRunnable.__init__(self)
+        self.signals = QueryWorkerSignals()
+
+    def on_progress(self, rows_fetched, elapsed):
+        self.signals.progress.emit(rows_fetched, elapsed)
+
+    def make_page(self, columns, rows):
+        # Pages for the grid are encoded here on the worker thread, straight from the driver's rows
+        page = ResultColumns.from_rows(columns, rows)
+        return page, page.nbytes
+
+    def on_page(self, result_number, page, elapsed, has_more):
+        self.signals.batch_ready.emit(result_number, page, elapsed, has_more)
+
+    def on_limit_reached(self, message):
+        self.signals.limit_reached.emit(message)
+
+    def on_batch_done(self, batch_number, batch_count, batch_seconds, affected_rows):
+        self.signals.batch_done.emit(batch_number, batch_count, batch_seconds, affected_rows)
+
+    def on_command_done(self, affected_rows, elapsed):
+        self.signals.command_done.emit(affected_rows, elapsed)
+
+    def run(self):
         try:
-            if command.lower().startswith(('select', 'show', 'describe', 'explain')):
-                df = pd.read_sql(command, engine)
-                
-                # Clear the table
-                output_table.clear()
-                output_table.setRowCount(len(df))
-                output_table.setColumnCount(len(df.columns))
-                
-                # Insert column names
-                output_table.setHorizontalHeaderLabels(df.columns)
-                
-                # Insert row data
-                for row_idx, row in enumerate(df.itertuples(index=False)):
-                    for col_idx, col_data in enumerate(row):
-                        output_table.setItem(row_idx, col_idx, QTableWidgetItem(str(col_data)))
-                
-                output_table.resizeColumnsToContents()
-                status_bar.showMessage("SQL command executed successfully")
-            else:
-                with engine.connect() as connection:
-                    transaction = connection.begin()
-                    try:
-                        connection.execute(text(command))
-                        transaction.commit()
-                        status_bar.showMessage("SQL command executed successfully")
-                        logging.info("SQL command executed successfully")
-                    except Exception as e:
-                        transaction.rollback()
-                        logging.error(f"Error executing SQL command: {e}")
-                        QMessageBox.critical(None, "Error", str(e))
-                        status_bar.showMessage(f"Error executing query: {e}")
+            self.execute()
+        except QueryCancelled:
+            self.signals.cancelled.emit()
+        except Exception:
+            self.signals.error.emit(self.error_message)
+        finally:
+            self.signals.finished.emit()
+
+class FanOutSignals(QObject):
+    target_started = Signal(int)              # target number
+    target_progress = Signal(int, int, float)  # target number, rows fetched, elapsed seconds
+    target_done = Signal(int, object, float, str)  # target number, ResultColumns or None, seconds, note
+    target_failed = Signal(int, str, str)      # target number, 'error' / 'cancelled' / 'skipped', message
+    limit_reached = Signal(str)
+    finished = Signal(int, float)             # targets that succeeded, elapsed seconds
+
+class FanOutWorker(FanOut, QRunnable):
+    def __init__(self, targets, command, engine_for, **options):
+        FanOut.__init__(self, targets, command, engine_for, **options)
+        QRunnable.__init__(self)
+        self.signals = FanOutSignals()
+
+    def on_target_started(self, target_number):
+        self.signals.target_started.emit(target_number)
+
+    def on_target_progress(self, target_number, rows_fetched, elapsed):
+        self.signals.target_progress.emit(target_number, rows_fetched, elapsed)
+
+    def on_target_done(self, target_number, df, seconds, note):
+        self.signals.target_done.emit(target_number, None if df is None else ResultColumns.from_dataframe(df), seconds, note)
+
+    def on_target_failed(self, target_number, status, message):
+        self.signals.target_failed.emit(target_number, status, message)
+
+    def on_limit_reached(self, message):
+        self.signals.limit_reached.emit(message)
+
+    def run(self):
+        succeeded = 0
+        try:
+            succeeded = self.execute()
         except Exception as e:
-            logging.error(f"Error executing SQL command: {e}")
-            QMessageBox.critical(None, "Error", str(e))
-            status_bar.showMessage(f"Error executing query: {e}")
+            logging.error(f"Error running SQL command on several targets: {e}")
+        finally:
+            self.signals.finished.emit(succeeded, self.elapsed())
+
+def create_query_worker(engine, query):
+    command = query.strip()
+    if not command:
+        return None
+    return QueryWorker(engine, command)
+
+def display_result(result, output_table, has_more=False):
+    # Hand the columns to the model; cells are formatted lazily by the view
+    output_table.model().set_result(result, has_more)
+    resize_columns_to_sample(output_table)
+
+def append_result(result, output_table, has_more=False):
+    output_table.model().append_result(result, has_more)
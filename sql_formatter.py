@@ -1,6 +1,29 @@
 import re
 from PySide6.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor, QFont, QTextCursor
-from PySide6.QtCore import QRegularExpression
+from PySide6.QtCore import QObject, QTimer
+from instrumentation import instrumentation
+
+# Block states carried from one line to the next
+NORMAL_STATE = 0
+IN_COMMENT_STATE = 1
+IN_STRING_STATE = 2
+
+COMMENT_END_PATTERN = re.compile(r'\*/')
+STRING_END_PATTERN = re.compile(r"(?:[^']|'')*'")
+
+# Idle time after the last keystroke before keywords are capitalized, and blocks handled per pass
+CAPITALIZE_DELAY_MS = 150
+CAPITALIZE_BLOCKS_PER_PASS = 500
+
+def continuation_end(text, previous_state):
+    # Where a comment or string left open by the previous block closes; None if it runs past this block
+    if previous_state == IN_COMMENT_STATE:
+        match = COMMENT_END_PATTERN.search(text)
+    elif previous_state == IN_STRING_STATE:
+        match = STRING_END_PATTERN.match(text)
+    else:
+        return 0
+    return match.end() if match else None
 
 class SQLFormatter(QSyntaxHighlighter):
     def __init__(self, parent=None):
@@ -14,44 +37,157 @@ class SQLFormatter(QSyntaxHighlighter):
             "join", "union", "exists", "between", "like", "is null", "distinct", "left join", "inner join", "merge"
         ]
 
-        self.highlighting_rules = []
-        for keyword in self.keywords:
-            pattern = QRegularExpression(r'\b' + re.escape(keyword) + r'\b', QRegularExpression.CaseInsensitiveOption)
-            self.highlighting_rules.append((pattern, self.keyword_format))
-
         # SQL strings
-        string_format = QTextCharFormat()
-        string_format.setForeground(QColor("darkGreen"))
-        self.highlighting_rules.append((QRegularExpression("\".*\""), string_format))
-        self.highlighting_rules.append((QRegularExpression("\'.*\'"), string_format))
+        self.string_format = QTextCharFormat()
+        self.string_format.setForeground(QColor("darkGreen"))
 
         # SQL comments
-        comment_format = QTextCharFormat()
-        comment_format.setForeground(QColor("darkGray"))
-        self.highlighting_rules.append((QRegularExpression("--[^\n]*"), comment_format))
+        self.comment_format = QTextCharFormat()
+        self.comment_format.setForeground(QColor("darkGray"))
+
+        # One alternation for every token type, so each block is scanned once.
+        # Longer keywords come first so "order by" wins over a shorter prefix.
+        keyword_alternation = '|'.join(r'\s+'.join(re.escape(word) for word in keyword.split())
+                                       for keyword in sorted(set(self.keywords), key=len, reverse=True))
+        self.token_pattern = re.compile(
+            r"(?P<comment>--.*)"
+            r"|(?P<block_comment>/\*.*?\*/)"
+            r"|(?P<open_comment>/\*.*)"
+            r"|(?P<string>'(?:[^']|'')*')"
+            r"|(?P<open_string>'.*)"
+            r'|(?P<quoted>"[^"]*")'
+            r"|(?P<bracketed>\[[^\]]*\])"
+            r"|\b(?P<keyword>" + keyword_alternation + r")\b",
+            re.IGNORECASE
+        )
+        self.token_formats = {
+            'comment': self.comment_format,
+            'block_comment': self.comment_format,
+            'open_comment': self.comment_format,
+            'string': self.string_format,
+            'open_string': self.string_format,
+            'quoted': self.string_format,
+            'keyword': self.keyword_format,
+        }
 
     def highlightBlock(self, text):
-        for pattern, format in self.highlighting_rules:
-            match_iterator = pattern.globalMatch(text)
-            while match_iterator.hasNext():
-                match = match_iterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), format)
+        self.setCurrentBlockState(NORMAL_STATE)
+        position = self.continue_previous_block(text)
+
+        for match in self.token_pattern.finditer(text, position):
+            kind = match.lastgroup
+            token_format = self.token_formats.get(kind)
+            if token_format is not None:
+                self.setFormat(match.start(), match.end() - match.start(), token_format)
+            if kind == 'open_comment':
+                self.setCurrentBlockState(IN_COMMENT_STATE)
+            elif kind == 'open_string':
+                self.setCurrentBlockState(IN_STRING_STATE)
+
+    def continue_previous_block(self, text):
+        # Returns where normal scanning starts after closing a comment or string left open by the previous line
+        previous_state = self.previousBlockState()
+        end = continuation_end(text, previous_state)
+        if end == 0:
+            return 0
+        token_format = self.comment_format if previous_state == IN_COMMENT_STATE else self.string_format
+        if end is None:
+            self.setFormat(0, len(text), token_format)
+            self.setCurrentBlockState(previous_state)
+            return len(text)
+        self.setFormat(0, end, token_format)
+        return end
+
+    def keyword_spans(self, text, previous_state):
+        # Keywords outside comments and strings, as (start, end) offsets within the block
+        position = continuation_end(text, previous_state)
+        if position is None:
+            return []
+        return [match.span() for match in self.token_pattern.finditer(text, position) if match.lastgroup == 'keyword']
 
     def capitalize_sql_commands(self, text):
         pattern = r'\b(' + '|'.join(re.escape(keyword) for keyword in self.keywords) + r')\b'
         return re.sub(pattern, lambda match: match.group(0).upper(), text, flags=re.IGNORECASE)
 
-    def format_text(self, text_edit):
-        cursor = text_edit.textCursor()
-        cursor_position = cursor.position()
+class KeywordCapitalizer(QObject):
+    # Capitalizes keywords in the blocks touched since the last pass, through undoable cursor edits
+    def __init__(self, text_edit, formatter, delay_ms=CAPITALIZE_DELAY_MS):
+        super().__init__(text_edit)
+        self.text_edit = text_edit
+        self.formatter = formatter
+        self.document = text_edit.document()
+        self._dirty = None
+        self._applying = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self.capitalize_dirty_blocks)
+        self.document.contentsChange.connect(self.on_contents_change)
+
+    def on_contents_change(self, position, chars_removed, chars_added):
+        # Edits that leave redo steps behind come from undo; re-capitalizing them would fight the user
+        if self._applying or self.document.availableRedoSteps() > 0:
+            return
+        # A cursor's selection moves with later edits, so the dirty range stays valid until the timer fires
+        end = min(position + chars_added, self.document.characterCount() - 1)
+        if self._dirty is None:
+            self._dirty = QTextCursor(self.document)
+            self._dirty.setPosition(position)
+            self._dirty.setPosition(end, QTextCursor.KeepAnchor)
+        else:
+            start = min(self._dirty.selectionStart(), position)
+            end = max(self._dirty.selectionEnd(), end)
+            self._dirty.setPosition(start)
+            self._dirty.setPosition(end, QTextCursor.KeepAnchor)
+        self._timer.start()
+
+    def capitalize_dirty_blocks(self):
+        if self._dirty is None:
+            return
+        block = self.document.findBlock(self._dirty.selectionStart())
+        last_block_number = self.document.findBlock(self._dirty.selectionEnd()).blockNumber()
+        typing_position = self.text_edit.textCursor().position()
+
+        cursor = QTextCursor(self.document)
+        # Capitalizing is not an edit of the user's; a freshly loaded query must not look modified to autosave
+        was_modified = self.document.isModified()
+        operation = instrumentation.begin('capitalize')
+        # Merged into the user's last edit so one undo reverts the typing and its capitalization together
+        cursor.joinPreviousEditBlock()
+        self._applying = True
+        try:
+            blocks_done = 0
+            with operation.phase('format'):
+                while block.isValid() and block.blockNumber() <= last_block_number and blocks_done < CAPITALIZE_BLOCKS_PER_PASS:
+                    self.capitalize_block(cursor, block, typing_position)
+                    block = block.next()
+                    blocks_done += 1
+        finally:
+            self._applying = False
+            cursor.endEditBlock()
+            if not was_modified:
+                self.document.setModified(False)
+        # Re-highlighting the edited blocks happens inside the edits, so it is part of the format phase
+        operation.detail = f"{blocks_done} blocks"
+        instrumentation.finish(operation)
 
-        text = text_edit.toPlainText()
-        formatted_text = self.capitalize_sql_commands(text)
+        if block.isValid() and block.blockNumber() <= last_block_number:
+            # Large pastes are handled a slice at a time so the editor stays responsive
+            end = self._dirty.selectionEnd()
+            self._dirty.setPosition(block.position())
+            self._dirty.setPosition(end, QTextCursor.KeepAnchor)
+            QTimer.singleShot(0, self.capitalize_dirty_blocks)
+        else:
+            self._dirty = None
 
-        # Only update the text if it has changed
-        if text != formatted_text:
-            text_edit.blockSignals(True)
-            text_edit.setPlainText(formatted_text)
-            cursor.setPosition(cursor_position)
-            text_edit.setTextCursor(cursor)
-            text_edit.blockSignals(False)
+    def capitalize_block(self, cursor, block, typing_position):
+        text = block.text()
+        previous_state = block.previous().userState() if block.previous().isValid() else NORMAL_STATE
+        for start, end in self.formatter.keyword_spans(text, previous_state):
+            keyword = text[start:end]
+            # Leave the word under the caret alone; it may still be growing into an identifier
+            if keyword.isupper() or block.position() + end == typing_position:
+                continue
+            cursor.setPosition(block.position() + start)
+            cursor.setPosition(block.position() + end, QTextCursor.KeepAnchor)
+            cursor.insertText(keyword.upper())
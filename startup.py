@@ -0,0 +1,22 @@
+import importlib
+import logging
+import threading
+import time
+
+# Heavy modules the first connect, query or sort needs; they are imported in the background once the
+# window is up, so neither startup nor the first click pays for them
+WARM_UP_MODULES = ('numpy', 'pandas', 'sqlalchemy', 'sqlalchemy.dialects.mssql.pyodbc', 'pyodbc')
+
+def warm_up_imports(modules=WARM_UP_MODULES):
+    started = time.perf_counter()
+    for module_name in modules:
+        try:
+            importlib.import_module(module_name)
+        except ImportError as e:
+            logging.info(f"Skipped background import of {module_name}: {e}")
+    logging.info(f"Background imports finished in {time.perf_counter() - started:.2f}s.")
+
+def start_import_warm_up():
+    thread = threading.Thread(target=warm_up_imports, name="import-warm-up", daemon=True)
+    thread.start()
+    return thread
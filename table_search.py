@@ -0,0 +1,183 @@
+import re
+import numpy as np
+from PySide6.QtCore import Qt, QAbstractListModel, QAbstractProxyModel, QModelIndex
+from PySide6.QtGui import QFont
+
+# Typing pause before the tables list is filtered
+TABLE_FILTER_DELAY_MS = 120
+FAVORITE_MARKER = "★ "
+
+def fuzzy_pattern(text):
+    # The characters in order with anything in between; possessive runs up to the next wanted character never backtrack
+    return re.escape(text[0]) + ''.join(f"[^\\n{re.escape(char)}]*+{re.escape(char)}" for char in text[1:])
+
+def search_patterns(search_text):
+    # Ranked from best to worst match. Plain text ranks table names starting with it, then "schema.table"
+    # containing it, then names containing its characters in order; "sales.ord" (or "[sales].[ord") does the
+    # same for the tables of schemas starting with "sales". Every pattern starts with a literal, so the regex
+    # engine skips straight to candidate positions instead of trying each line in turn.
+    text = search_text.strip().lower().replace('[', '').replace(']', '')
+    schema_text, dot, table_text = text.partition('.')
+    if dot:
+        prefix = '\n' + re.escape(schema_text) + r'[^.\n]*+\.'
+        patterns = [prefix + re.escape(table_text)]
+        if table_text:
+            patterns += [prefix + r'[^\n]*?' + re.escape(table_text), prefix + r'[^\n]*?' + fuzzy_pattern(table_text)]
+    else:
+        patterns = [r'\.' + re.escape(text), re.escape(text)]
+        if len(text) > 1:
+            patterns.append(fuzzy_pattern(text))
+    return [re.compile(pattern) for pattern in patterns]
+
+class TableSearchIndex:
+    # All names lowercased into one string, each line preceded by a newline, and searched with a few regex
+    # passes instead of a Python comparison per table
+    def __init__(self, tables):
+        names = [f"{schema_name}.{table_name}".lower().replace('\n', ' ') for schema_name, table_name in tables]
+        self.text = ''.join(f"\n{name}" for name in names)
+        lengths = np.fromiter((len(name) + 1 for name in names), dtype=np.int64, count=len(names))
+        # Offset of the newline in front of each name
+        self.line_starts = np.cumsum(lengths) - lengths
+        self.size = len(names)
+
+    def search(self, search_text, allowed=None):
+        # Row numbers of the matching tables, best matches first and alphabetical within a rank
+        if not search_text.strip():
+            rows = np.arange(self.size)
+        else:
+            ranked = []
+            for pattern in search_patterns(search_text):
+                starts = np.fromiter((match.start() for match in pattern.finditer(self.text)), dtype=np.int64)
+                ranked.append(np.searchsorted(self.line_starts, starts, side='right') - 1)
+            rows = np.concatenate(ranked)
+            _, first_seen = np.unique(rows, return_index=True)
+            rows = rows[np.sort(first_seen)]
+        if allowed is not None:
+            rows = rows[allowed[rows]]
+        return rows
+
+class TableListModel(QAbstractListModel):
+    # (schema, table) pairs of the current database, with cached results in bold and favorites starred
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tables = []
+        self.cached_tables = set()
+        self.favorite_tables = set()
+        self._bold_font = QFont()
+        self._bold_font.setBold(True)
+
+    def set_tables(self, tables):
+        self.beginResetModel()
+        self.tables = [tuple(table_info) for table_info in tables]
+        self.endResetModel()
+
+    def set_cached_tables(self, cached_tables):
+        if cached_tables != self.cached_tables:
+            self.cached_tables = set(cached_tables)
+            self.emit_all_changed([Qt.FontRole, Qt.ToolTipRole])
+
+    def set_favorite_tables(self, favorite_tables):
+        if favorite_tables != self.favorite_tables:
+            self.favorite_tables = set(favorite_tables)
+            self.emit_all_changed([Qt.DisplayRole])
+
+    def favorite_mask(self):
+        return np.fromiter((table_info in self.favorite_tables for table_info in self.tables), dtype=bool, count=len(self.tables))
+
+    def emit_all_changed(self, roles):
+        if self.tables:
+            self.dataChanged.emit(self.index(0), self.index(len(self.tables) - 1), roles)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.tables)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        table_info = self.tables[index.row()]
+        if role == Qt.DisplayRole:
+            marker = FAVORITE_MARKER if table_info in self.favorite_tables else ""
+            return f"{marker}[{table_info[0]}].[{table_info[1]}]"
+        if role == Qt.UserRole:
+            return table_info
+        if role == Qt.FontRole and table_info in self.cached_tables:
+            return self._bold_font
+        if role == Qt.ToolTipRole and table_info in self.cached_tables:
+            return "Result cached in memory"
+        return None
+
+class TableSearchProxyModel(QAbstractProxyModel):
+    # Shows the rows picked by the search index in ranked order. Unlike QSortFilterProxyModel it never
+    # calls back into Python once per source row, so filtering costs the same for 30 or 30,000 tables
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.search_text = ''
+        self.favorites_only = False
+        self._index = TableSearchIndex([])
+        self._rows = np.empty(0, dtype=np.int64)
+        self._proxy_rows = None
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.modelReset.connect(self.rebuild_index)
+        model.dataChanged.connect(self.on_source_data_changed)
+        self.rebuild_index()
+
+    def rebuild_index(self):
+        self._index = TableSearchIndex(self.sourceModel().tables)
+        self.apply_filter()
+
+    def set_filter(self, search_text, favorites_only=False):
+        self.search_text = search_text
+        self.favorites_only = favorites_only
+        self.apply_filter()
+
+    def apply_filter(self):
+        allowed = self.sourceModel().favorite_mask() if self.favorites_only else None
+        self.beginResetModel()
+        self._rows = self._index.search(self.search_text, allowed)
+        self._proxy_rows = None
+        self.endResetModel()
+
+    def on_source_data_changed(self, top_left, bottom_right, roles=()):
+        if self.favorites_only and Qt.DisplayRole in roles:
+            # Starring or unstarring changes which rows the favorites filter lets through
+            self.apply_filter()
+        elif len(self._rows):
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self._rows) - 1, 0), roles)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or column != 0 or not 0 <= row < len(self._rows):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(int(self._rows[proxy_index.row()]), 0)
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        if self._proxy_rows is None:
+            # Reverse lookup, built on first use after each filter
+            self._proxy_rows = np.full(self._index.size, -1, dtype=np.int64)
+            self._proxy_rows[self._rows] = np.arange(len(self._rows))
+        row = int(self._proxy_rows[source_index.row()])
+        return self.index(row, 0) if row >= 0 else QModelIndex()
+
+    def row_of(self, table_info):
+        try:
+            source_row = self.sourceModel().tables.index(tuple(table_info))
+        except ValueError:
+            return QModelIndex()
+        return self.mapFromSource(self.sourceModel().index(source_row, 0))
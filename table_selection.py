@@ -0,0 +1,37 @@
+from PySide6.QtCore import QObject, QTimer
+
+# Clicks closer together than this collapse into one load of the last table clicked
+CLICK_COALESCE_MS = 150
+
+class TableSelectionDispatcher(QObject):
+    # The single receiver of table clicks, connected once when the UI is built. The first click loads right away;
+    # further clicks within CLICK_COALESCE_MS only remember the latest table, which is loaded once that
+    # 150 ms coalesce window ends.
+    def __init__(self, load_table, parent=None):
+        super().__init__(parent)
+        self.load_table = load_table
+        self.pending = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(CLICK_COALESCE_MS)
+        self._timer.timeout.connect(self.load_pending)
+
+    def select(self, table_info):
+        if not table_info:
+            return
+        if self._timer.isActive():
+            self.pending = table_info
+            return
+        self.load_table(table_info)
+        self._timer.start()
+
+    def load_pending(self):
+        table_info, self.pending = self.pending, None
+        if table_info is not None:
+            self.load_table(table_info)
+            self._timer.start()
+
+    def clear(self):
+        # A click still waiting belongs to the database being left
+        self.pending = None
+        self._timer.stop()
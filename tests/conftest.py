@@ -0,0 +1,44 @@
+import os
+import sqlite3
+import sys
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope='session')
+def qapp():
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+@pytest.fixture
+def sqlite_server(tmp_path):
+    # A SQLite engine dressed up as SQL Server: the sys catalog and INFORMATION_SCHEMA are attached databases
+    from sqlalchemy import create_engine, event
+    catalog_path = str(tmp_path / 'sys.db')
+    information_schema_path = str(tmp_path / 'information_schema.db')
+    connection = sqlite3.connect(catalog_path)
+    connection.executescript('''
+        CREATE TABLE tables (object_id INT, schema_id INT, name TEXT, is_external INT, modify_date TEXT);
+        CREATE TABLE schemas (schema_id INT, name TEXT);
+        CREATE TABLE databases (name TEXT);
+        INSERT INTO schemas VALUES (1, 'dbo');
+        INSERT INTO tables VALUES (1, 1, 'orders', 0, '2024-01-01'), (2, 1, 'customers', 0, '2024-01-02');
+        INSERT INTO databases VALUES ('master'), ('main');
+    ''')
+    connection.close()
+    connection = sqlite3.connect(information_schema_path)
+    connection.executescript('''
+        CREATE TABLE COLUMNS (TABLE_SCHEMA TEXT, TABLE_NAME TEXT, COLUMN_NAME TEXT, DATA_TYPE TEXT,
+                              CHARACTER_MAXIMUM_LENGTH INT, IS_NULLABLE TEXT, ORDINAL_POSITION INT);
+    ''')
+    connection.close()
+    engine = create_engine(f"sqlite:///{tmp_path / 'server.db'}")
+
+    @event.listens_for(engine, 'connect')
+    def attach_catalogs(dbapi_connection, connection_record):
+        dbapi_connection.execute(f"ATTACH '{catalog_path}' AS sys")
+        dbapi_connection.execute(f"ATTACH '{information_schema_path}' AS INFORMATION_SCHEMA")
+
+    yield engine
+    engine.dispose()
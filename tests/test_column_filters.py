@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+from column_store import DictionaryColumn, PackedTextColumn, ResultColumns, filter_mask
+
+ROWS = [(1, 'null', 1.5), (None, None, None), (3, 'x', None)]
+
+@pytest.mark.parametrize('filter_text', ['null', 'NU', 'll'])
+def test_contains_filter_never_matches_null_cells(filter_text):
+    result = ResultColumns.from_rows(['id', 'name', 'amount'], ROWS)
+    assert [filter_mask(column, filter_text).tolist() for column in result.columns] == [
+        [False, False, False], [True, False, False], [False, False, False]]
+
+def test_text_storages_agree_on_nulls():
+    codes = np.array([0, -1, 1, 0], dtype=np.int32)
+    dictionary_column = DictionaryColumn(codes, np.array(['null', 'b'], dtype=object))
+    packed_column = dictionary_column.packed()
+    assert isinstance(packed_column, PackedTextColumn)
+    for filter_text in ('null', 'B'):
+        assert filter_mask(dictionary_column, filter_text).tolist() == filter_mask(packed_column, filter_text).tolist()
+    assert filter_mask(dictionary_column, 'null').tolist() == [True, False, False, True]
+    all_null = dictionary_column.null_column(3)
+    assert filter_mask(all_null, 'null').tolist() == [False, False, False]
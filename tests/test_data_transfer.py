@@ -0,0 +1,82 @@
+import datetime
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from data_transfer import TransferCancelled, clone_table, transfer_rows
+
+ROW_COUNT = 2500
+# Runs for many seconds inside a single execute() on SQLite
+SLOW_QUERY = """
+WITH RECURSIVE counter(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM counter WHERE n < 1000000000)
+SELECT MAX(n) FROM counter
+"""
+
+def order_row(order_id):
+    # Every fifth row has NULLs in the nullable columns
+    if order_id % 5 == 0:
+        return (order_id, f"customer {order_id}", None, None, None)
+    placed = datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=order_id)
+    return (order_id, f"customer {order_id}", order_id / 100, placed.isoformat(' '), order_id * 0.5)
+
+@pytest.fixture
+def source_engine(sqlite_server):
+    with sqlite_server.begin() as connection:
+        connection.execute(text('CREATE TABLE orders (id INTEGER PRIMARY KEY, customer VARCHAR(50) NOT NULL, '
+                                'amount NUMERIC(12, 2), placed DATETIME, weight FLOAT)'))
+        connection.execute(text('INSERT INTO orders VALUES (:id, :customer, :amount, :placed, :weight)'),
+                           [dict(zip(('id', 'customer', 'amount', 'placed', 'weight'), order_row(order_id)))
+                            for order_id in range(1, ROW_COUNT + 1)])
+    return sqlite_server
+
+@pytest.fixture
+def target_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+    yield engine
+    engine.dispose()
+
+def test_clone_copies_rows_types_and_nulls(source_engine, target_engine):
+    progress = []
+    rows_written, _ = clone_table(source_engine, target_engine, 'main', 'orders', target_table='orders_copy',
+                                  batch_size=1000, progress_callback=lambda rows, elapsed: progress.append(rows))
+
+    assert rows_written == ROW_COUNT
+    assert progress == [1000, 2000, 2500]
+    source_columns = inspect(source_engine).get_columns('orders')
+    target_columns = inspect(target_engine).get_columns('orders_copy')
+    assert [(column['name'], str(column['type']), column['nullable']) for column in target_columns] == \
+        [(column['name'], str(column['type']), column['nullable']) for column in source_columns]
+    with source_engine.connect() as connection:
+        source_rows = connection.execute(text('SELECT * FROM orders ORDER BY id')).fetchall()
+    with target_engine.connect() as connection:
+        target_rows = connection.execute(text('SELECT * FROM orders_copy ORDER BY id')).fetchall()
+        null_rows = connection.execute(text('SELECT COUNT(*) FROM orders_copy WHERE amount IS NULL AND placed IS NULL '
+                                            'AND weight IS NULL')).scalar()
+    assert target_rows == source_rows
+    assert null_rows == ROW_COUNT // 5
+
+def test_cancel_stops_the_clone_and_drops_the_target(source_engine, target_engine):
+    cancel_event = threading.Event()
+    progress = []
+
+    def on_progress(rows, elapsed):
+        progress.append(rows)
+        cancel_event.set()
+
+    with pytest.raises(TransferCancelled):
+        clone_table(source_engine, target_engine, 'main', 'orders', target_table='orders_copy', batch_size=100,
+                    progress_callback=on_progress, cancel_event=cancel_event)
+    assert progress == [100]
+    assert not inspect(target_engine).has_table('orders_copy')
+
+def test_cancel_interrupts_a_source_query_that_is_still_executing(source_engine, target_engine):
+    with target_engine.begin() as connection:
+        connection.execute(text('CREATE TABLE counts (n INTEGER)'))
+    cancel_event = threading.Event()
+    threading.Timer(0.3, cancel_event.set).start()
+    started = time.perf_counter()
+
+    with pytest.raises(TransferCancelled):
+        transfer_rows(source_engine, SLOW_QUERY, target_engine, 'INSERT INTO counts (n) VALUES (?)',
+                      cancel_event=cancel_event)
+    assert time.perf_counter() - started < 2
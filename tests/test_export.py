@@ -0,0 +1,87 @@
+import csv
+import os
+import threading
+import time
+import pytest
+from sqlalchemy import text
+from export import ExportWorker, export_query
+
+# Rows exported per format and the slowest acceptable rate; measured here ~600k rows/s for CSV,
+# ~440k for Parquet and ~30k for XLSX
+EXPORT_BENCHMARKS = {
+    'csv': (200000, 100000),
+    'parquet': (200000, 100000),
+    'xlsx': (20000, 10000),
+}
+# Lets slower machines scale every rate down
+RATE_FACTOR = float(os.environ.get('EXPORT_RATE_FACTOR', 1))
+# Runs for many seconds inside a single execute() on SQLite
+SLOW_QUERY = """
+WITH RECURSIVE counter(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM counter WHERE n < 1000000000)
+SELECT MAX(n) FROM counter
+"""
+# abs() of the smallest integer is an overflow error, raised once the rows before it were fetched
+FAILING_QUERY = "SELECT CASE WHEN id > 15000 THEN abs(-9223372036854775807 - 1) ELSE id END AS id FROM numbers"
+
+@pytest.fixture
+def source_engine(sqlite_server):
+    with sqlite_server.begin() as connection:
+        connection.execute(text('CREATE TABLE numbers (id INTEGER PRIMARY KEY, name TEXT, amount REAL, placed TEXT)'))
+        connection.execute(text('''
+            WITH RECURSIVE counter(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM counter WHERE n < 200000)
+            INSERT INTO numbers SELECT n, 'name ' || n, n * 0.25, datetime('2024-01-01', '+' || n || ' minutes')
+            FROM counter
+        '''))
+    return sqlite_server
+
+def exported_row_count(path, export_format):
+    if export_format == 'csv':
+        with open(path, newline='', encoding='utf-8') as file:
+            return sum(1 for _ in csv.reader(file)) - 1
+    if export_format == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True)
+    return sum(sum(1 for _ in sheet.iter_rows()) - 1 for sheet in workbook.worksheets)
+
+@pytest.mark.parametrize('export_format', list(EXPORT_BENCHMARKS))
+def test_export_rate(source_engine, tmp_path, export_format):
+    row_count, min_rows_per_second = EXPORT_BENCHMARKS[export_format]
+    path = str(tmp_path / f"numbers.{export_format}")
+    rows_written, elapsed = export_query(source_engine, f"SELECT * FROM numbers WHERE id <= {row_count}", path)
+    rows_per_second = rows_written / elapsed
+    assert rows_written == row_count
+    assert exported_row_count(path, export_format) == row_count
+    assert rows_per_second >= min_rows_per_second * RATE_FACTOR, \
+        f"{export_format} export ran at {rows_per_second:,.0f} rows/s (floor {min_rows_per_second * RATE_FACTOR:,.0f})"
+
+def test_failed_execute_keeps_an_existing_file(source_engine, tmp_path):
+    path = tmp_path / "report.csv"
+    path.write_text("the user's own file")
+    with pytest.raises(Exception):
+        export_query(source_engine, "SELECT * FROM missing_table", str(path))
+    assert path.read_text() == "the user's own file"
+
+def test_failure_after_writing_removes_the_partial_file(source_engine, tmp_path):
+    path = tmp_path / "report.csv"
+    progress = []
+    with pytest.raises(Exception, match='overflow'):
+        export_query(source_engine, FAILING_QUERY, str(path), batch_size=1000,
+                     progress_callback=lambda rows, elapsed: progress.append(rows))
+    assert progress and progress[-1] <= 15000
+    assert not path.exists()
+
+def test_cancel_interrupts_a_query_that_is_still_executing(source_engine, tmp_path, qapp):
+    path = tmp_path / "report.csv"
+    path.write_text("the user's own file")
+    worker = ExportWorker(source_engine, SLOW_QUERY, str(path))
+    cancelled = []
+    worker.signals.cancelled.connect(lambda: cancelled.append(True))
+    threading.Timer(0.3, worker.cancel).start()
+    started = time.perf_counter()
+
+    worker.run()
+    assert time.perf_counter() - started < 2
+    assert cancelled == [True]
+    assert path.read_text() == "the user's own file"
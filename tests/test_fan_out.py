@@ -0,0 +1,36 @@
+from sqlalchemy import text
+from fan_out import FanOut, FanOutTarget
+
+TABLE_ROWS = 100
+
+class RecordingFanOut(FanOut):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.done = {}
+        self.skipped = []
+        self.limit_messages = []
+
+    def on_target_done(self, target_number, df, seconds, note):
+        self.done[target_number] = len(df)
+
+    def on_target_failed(self, target_number, status, message):
+        if status == 'skipped':
+            self.skipped.append(target_number)
+
+    def on_limit_reached(self, message):
+        self.limit_messages.append(message)
+
+def test_targets_share_the_row_budget(sqlite_server):
+    with sqlite_server.begin() as connection:
+        connection.execute(text('CREATE TABLE items (id INTEGER)'))
+        connection.execute(text('INSERT INTO items VALUES (:id)'), [{'id': item_id} for item_id in range(TABLE_ROWS)])
+    targets = [FanOutTarget('srv', f"db{number}", f"db{number}") for number in range(6)]
+    fan_out = RecordingFanOut(targets, 'SELECT id FROM items', lambda server_name, database_name: sqlite_server,
+                              max_workers=1, max_rows=250)
+
+    assert fan_out.execute() == 3
+    # The third target is only given the 50 rows left of the budget
+    assert fan_out.done == {0: 100, 1: 100, 2: 50}
+    assert fan_out.total_rows == 250
+    assert fan_out.skipped == [3, 4, 5]
+    assert len(fan_out.limit_messages) == 1
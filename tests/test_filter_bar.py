@@ -0,0 +1,25 @@
+from PySide6.QtWidgets import QTableView
+from filter_bar import ColumnFilterBar
+from result_model import ResultTableModel
+
+def test_editors_follow_model_filters_across_results(qapp):
+    model = ResultTableModel()
+    view = QTableView()
+    view.setModel(model)
+    model.set_records(['name', 'city'], [('ann', 'oslo'), ('bob', 'rome')])
+    filter_bar = ColumnFilterBar()
+    filter_bar.bind(view)
+    filter_bar.on_filter_edited(0, 'ann')
+    filter_bar.editors[0].setText('ann')
+    filter_bar.apply_pending_filters()
+    assert model.rowCount() == 1
+    edits = []
+    filter_bar.editors[0].textEdited.connect(edits.append)
+    # Same headers, so the editors are kept; the new result has no filters
+    model.set_records(['name', 'city'], [('cy', 'bern')])
+    assert [editor.text() for editor in filter_bar.editors] == ['', '']
+    assert model.rowCount() == 1
+    # A filter set on the model is shown in its editor
+    model.set_filters({1: 'bern'})
+    assert filter_bar.editors[1].text() == 'bern'
+    assert edits == []
@@ -0,0 +1,54 @@
+import os
+import time
+from PySide6.QtGui import QTextCursor
+from ui_setup import create_sql_editor
+
+# Median cost of one keystroke: the insert with its highlighting, the capitalize pass and the repaint.
+# Measured ~2 ms here at 1k and 20k lines, mostly the repaint; the old QTextEdit took 6 ms at 20k lines
+KEYSTROKE_BUDGET_MS = float(os.environ.get('KEYSTROKE_BUDGET_MS', 5))
+# Largest allowed ratio between the 20k-line and the 1k-line script; the old QTextEdit was ~10
+MAX_GROWTH_RATIO = 2
+SCRIPT_SIZES = (1000, 20000)
+SCRIPT_LINE = "select o.id, 'it''s' as note, [order] from dbo.orders o /* note */ where o.total > 10 -- tail\n"
+TYPED_TEXT = " and o.id in (select id from dbo.customers) "
+
+def median_keystroke_ms(qapp, sql_input, capitalizer, block):
+    cursor = QTextCursor(block)
+    cursor.movePosition(QTextCursor.EndOfBlock)
+    sql_input.setTextCursor(cursor)
+    qapp.processEvents()
+    times = []
+    for character in TYPED_TEXT:
+        started = time.perf_counter()
+        # The capitalize pass normally waits for the typing pause; it is timed with the keystroke here
+        sql_input.textCursor().insertText(character)
+        capitalizer.capitalize_dirty_blocks()
+        qapp.processEvents()
+        times.append((time.perf_counter() - started) * 1000)
+    return sorted(times)[len(times) // 2]
+
+def keystroke_costs(qapp, line_count):
+    # The editor as the main window builds it, shown so layout and painting are part of the cost
+    sql_input, formatter, capitalizer = create_sql_editor()
+    sql_input.resize(900, 600)
+    sql_input.show()
+    sql_input.setPlainText(SCRIPT_LINE * line_count)
+    # Capitalize the loaded script first so only the typed edits are timed
+    while capitalizer._dirty is not None:
+        capitalizer.capitalize_dirty_blocks()
+    document = sql_input.document()
+    costs = {position: median_keystroke_ms(qapp, sql_input, capitalizer, block)
+             for position, block in (('end', document.lastBlock()), ('middle', document.findBlockByNumber(line_count // 2)))}
+    assert document.lastBlock().text().endswith(" and o.id IN (SELECT id FROM dbo.customers) ")
+    sql_input.close()
+    return costs
+
+def test_keystroke_cost_does_not_grow_with_the_script(qapp):
+    small, large = (keystroke_costs(qapp, line_count) for line_count in SCRIPT_SIZES)
+    for position in ('end', 'middle'):
+        assert max(small[position], large[position]) <= KEYSTROKE_BUDGET_MS, \
+            f"keystroke in the {position} took {small[position]:.2f} ms at {SCRIPT_SIZES[0]} lines and " \
+            f"{large[position]:.2f} ms at {SCRIPT_SIZES[1]} (budget {KEYSTROKE_BUDGET_MS} ms)"
+        assert large[position] <= MAX_GROWTH_RATIO * small[position], \
+            f"keystroke in the {position} grew from {small[position]:.2f} ms to {large[position]:.2f} ms " \
+            f"between {SCRIPT_SIZES[0]} and {SCRIPT_SIZES[1]} lines"
@@ -0,0 +1,47 @@
+from object_explorer import ExplorerNode, ObjectTreeModel
+
+def expanded_database(model):
+    model.set_server('server')
+    model.on_loaded(model.root, model.load_generation(model.root), [('sales',)])
+    return model.root.children[0]
+
+def test_load_for_a_refreshed_level_is_dropped(qapp):
+    model = ObjectTreeModel(engine_for=None)
+    database = expanded_database(model)
+    generation = model.load_generation(database)
+    inserts = []
+    model.rowsInserted.connect(lambda *args: inserts.append(args))
+    # The server level is refreshed and read again while the schemas of the old database node are loading
+    model.refresh(model.index_of(model.root))
+    model.on_loaded(model.root, model.load_generation(model.root), [('sales',)])
+    inserts.clear()
+    model.on_loaded(database, generation, [('dbo',)])
+    model.on_error(database, generation, 'timeout')
+    assert inserts == []
+    assert database.children is None and database.error is None
+    assert model.root.children[0] is not database
+
+def test_only_loads_started_after_a_refresh_are_inserted(qapp):
+    model = ObjectTreeModel(engine_for=None)
+    database = expanded_database(model)
+    model.on_loaded(database, model.load_generation(database), [('dbo',)])
+    assert [schema.name for schema in database.children] == ['dbo']
+    started_before = model.load_generation(database)
+
+    model.refresh(model.index_of(database))
+    assert database.children is None
+    started_after = model.load_generation(database)
+    assert started_after != started_before
+    inserts = []
+    model.rowsInserted.connect(lambda parent, first, last: inserts.append((parent.internalPointer(), first, last)))
+    model.on_loaded(database, started_before, [('dbo',), ('sales',)])
+    assert database.children is None and inserts == []
+    model.on_loaded(database, started_after, [('dbo',), ('audit',)])
+    assert [schema.name for schema in database.children] == ['dbo', 'audit']
+    assert inserts == [(database, 0, 1)]
+
+def test_object_name_escapes_closing_brackets():
+    schema = ExplorerNode('schema', 'odd]schema')
+    table = ExplorerNode('table', 'a]]b', schema)
+    columns = ExplorerNode('folder', 'Columns', table)
+    assert columns.object_name == '[odd]]schema].[a]]]]b]'
@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import text
+from query_engine import QueryRun
+
+class RecordingRun(QueryRun):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pages = []
+        self.limit_messages = []
+
+    def make_page(self, columns, rows):
+        return rows, 0
+
+    def on_page(self, result_number, page, elapsed, has_more):
+        self.pages.append((len(page), has_more))
+
+    def on_limit_reached(self, message):
+        self.limit_messages.append(message)
+
+@pytest.fixture
+def engine(sqlite_server):
+    with sqlite_server.begin() as connection:
+        connection.execute(text('CREATE TABLE items (id INTEGER)'))
+        connection.execute(text('INSERT INTO items VALUES (:id)'), [{'id': item_id} for item_id in range(150)])
+    return sqlite_server
+
+@pytest.mark.parametrize('row_count, truncated', [(99, False), (100, False), (101, True)])
+def test_row_limit_is_only_reported_when_rows_were_left(engine, row_count, truncated):
+    run = RecordingRun(engine, f"SELECT id FROM items WHERE id < {row_count}", fetch_size=30, max_rows=100, paged=False)
+    run.execute()
+    assert run.rows_fetched == min(row_count, 100)
+    assert bool(run.limit_messages) == truncated
+    assert run.pages[-1][1] is False
+
+def test_memory_limit_is_not_reported_for_a_result_that_ended(engine):
+    run = RecordingRun(engine, "SELECT id FROM items WHERE id < 100", fetch_size=30, page_size=100, max_bytes=0, paged=False)
+    run.execute()
+    assert run.rows_fetched == 100
+    assert run.limit_messages == []
@@ -0,0 +1,36 @@
+from sqlalchemy import text
+from row_counts import RowCountWorker, SqliteRowCountProvider
+
+TABLE_NAME = 'order "lines"'
+KEY = ('srv', 'main', 'main', TABLE_NAME)
+
+def count_rows(provider, engine, exact):
+    worker = RowCountWorker(provider, engine, KEY, exact)
+    counted, errors = [], []
+    worker.signals.counted.connect(lambda key, row_count, is_exact: counted.append((key, row_count, is_exact)))
+    worker.signals.error.connect(lambda key, message: errors.append(message))
+    worker.run()
+    assert errors == []
+    return counted
+
+def test_estimate_and_exact_count_from_sqlite(qapp, sqlite_server):
+    with sqlite_server.begin() as connection:
+        connection.exec_driver_sql('CREATE TABLE "order ""lines""" (id INTEGER PRIMARY KEY)')
+        connection.execute(text('INSERT INTO "order ""lines""" VALUES (:id)'), [{'id': row_id} for row_id in range(1, 101)])
+        # The estimate is the largest rowid, so deleted rows still count until an exact count
+        connection.exec_driver_sql('DELETE FROM "order ""lines""" WHERE id <= 40')
+    provider = SqliteRowCountProvider()
+
+    assert count_rows(provider, sqlite_server, exact=False) == [(KEY, 100, False)]
+    assert provider.cached_estimate(KEY) == 100
+    assert count_rows(provider, sqlite_server, exact=True) == [(KEY, 60, True)]
+    # The exact count replaces the cached estimate
+    assert count_rows(provider, sqlite_server, exact=False) == [(KEY, 60, False)]
+
+def test_cancelled_count_is_not_reported(qapp, sqlite_server):
+    worker = RowCountWorker(SqliteRowCountProvider(), sqlite_server, KEY)
+    counted = []
+    worker.signals.counted.connect(lambda *args: counted.append(args))
+    worker.cancel()
+    worker.run()
+    assert counted == []
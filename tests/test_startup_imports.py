@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time allowed before the first paint; measured ~180 ms, ~540 ms with pandas and SQLAlchemy eager
+STARTUP_IMPORT_BUDGET_MS = int(os.environ.get('STARTUP_IMPORT_BUDGET_MS', 300))
+DEFERRED_MODULES = ('pandas', 'sqlalchemy')
+
+# Everything up to the first paint: module imports and the window constructor, but no event loop,
+# so the zero-delay warm-up timer never fires
+FIRST_PAINT_SCRIPT = '''
+import os, sys
+from PySide6.QtWidgets import QApplication
+import app
+qt_app = QApplication([])
+window = app.SQLManagementStudioPro()
+print(','.join(sorted({{name.split('.')[0] for name in sys.modules}} & {deferred!r})))
+sys.stdout.flush()
+os._exit(0)
+'''.format(deferred=set(DEFERRED_MODULES))
+
+def parse_importtime(stderr):
+    # "import time: self [us] | cumulative | imported package"; nested imports are indented under their parent
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        entries.append((name[1:].rstrip(), int(cumulative)))
+    return entries
+
+def test_startup_imports_stay_under_budget(tmp_path):
+    environment = dict(os.environ, QT_QPA_PLATFORM='offscreen', PYTHONPATH=REPO_ROOT)
+    # The constructor opens the local store in the working directory
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', FIRST_PAINT_SCRIPT],
+                            cwd=tmp_path, env=environment, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip() == '', f"imported before first paint: {result.stdout.strip()}"
+    entries = parse_importtime(result.stderr)
+    imported = {name.strip() for name, _ in entries}
+    assert not imported & set(DEFERRED_MODULES)
+    total_ms = sum(cumulative for name, cumulative in entries if not name.startswith(' ')) / 1000
+    assert total_ms <= STARTUP_IMPORT_BUDGET_MS, f"startup imports took {total_ms:.0f} ms (budget {STARTUP_IMPORT_BUDGET_MS} ms)"
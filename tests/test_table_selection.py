@@ -0,0 +1,103 @@
+import threading
+import time
+import pytest
+from PySide6.QtCore import Qt, QThreadPool
+from PySide6.QtTest import QTest
+from row_counts import RowCountProvider
+from sql_formatter import CAPITALIZE_DELAY_MS
+from table_selection import CLICK_COALESCE_MS
+
+class CountingRowCountProvider(RowCountProvider):
+    # Stands in for the server: every estimate query is recorded
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+        self._calls_lock = threading.Lock()
+
+    def cached_estimate(self, key):
+        return None
+
+    def query_estimate(self, connection, schema_name, table_name):
+        with self._calls_lock:
+            self.calls.append(table_name)
+        return 1
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        QTest.qWait(20)
+
+def settle():
+    # Past the coalesce window, with every background load finished
+    QTest.qWait(CLICK_COALESCE_MS * 2)
+    QThreadPool.globalInstance().waitForDone()
+    QTest.qWait(50)
+
+@pytest.fixture
+def window(qapp, tmp_path, monkeypatch, sqlite_server):
+    import app
+    from local_store import LocalStore
+    monkeypatch.setattr(app, 'LocalStore', lambda: LocalStore(str(tmp_path / 'store.db')))
+    window = app.SQLManagementStudioPro()
+    window.row_count_provider = CountingRowCountProvider()
+    window.engine_registry.get_engine = lambda server_name, database_name: sqlite_server
+    window.loads = []
+    load_table = window.ui.table_selection.load_table
+    window.ui.table_selection.load_table = lambda table_info: (window.loads.append(table_info), load_table(table_info))
+    window.ui.server_input.setEditText('srv')
+    window.show()
+    window.initial_connect()
+    yield window
+    window.close()
+    QThreadPool.globalInstance().waitForDone()
+    window.local_store.close()
+
+def click_table(window, row):
+    view = window.ui.tables_list_widget
+    wait_until(lambda: window.ui.tables_proxy.rowCount() > row)
+    rect = view.visualRect(window.ui.tables_proxy.index(row, 0))
+    QTest.mouseClick(view.viewport(), Qt.LeftButton, pos=rect.center())
+
+def test_one_server_call_per_click_after_many_database_switches(window):
+    for _ in range(25):
+        window.switch_database('main')
+    settle()
+    window.row_count_provider.calls.clear()
+
+    click_table(window, 0)
+    settle()
+
+    assert len(window.loads) == 1
+    assert len(window.row_count_provider.calls) == 1
+
+def test_rapid_clicks_load_the_first_and_last_table_only(window):
+    window.switch_database('main')
+    settle()
+    window.row_count_provider.calls.clear()
+
+    for click in range(10):
+        click_table(window, click % 2)
+    settle()
+
+    first_table, last_table = (window.ui.tables_proxy.index(row, 0).data(Qt.UserRole) for row in (0, 1))
+    assert window.loads == [first_table, last_table]
+    # The first table's count may be cancelled before it reaches the server; the last one always runs
+    assert window.row_count_provider.calls in ([first_table[1], last_table[1]], [last_table[1]])
+
+def test_capitalizing_a_loaded_query_does_not_trigger_autosave(window):
+    window.switch_database('main')
+    settle()
+    window.local_store.save_query('dbo', 'orders', 'select * from orders')
+    rows = {window.ui.tables_proxy.index(row, 0).data(Qt.UserRole)[1]: row for row in range(2)}
+
+    click_table(window, rows['orders'])
+    settle()
+    QTest.qWait(CAPITALIZE_DELAY_MS * 2)
+    assert window.ui.sql_input.toPlainText() == 'SELECT * FROM orders'
+    assert not window.ui.sql_input.document().isModified()
+
+    click_table(window, rows['customers'])
+    settle()
+    assert window.local_store.get_saved_query('dbo', 'orders').query == 'select * from orders'
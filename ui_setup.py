@@ -1,18 +1,90 @@
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTextEdit, QSplitter, QLineEdit, QComboBox, QSizePolicy, QTableWidget, QListWidget, QLabel
-from PySide6.QtCore import Qt
-from sql_formatter import SQLFormatter
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QPlainTextEdit, QSplitter, QLineEdit, QComboBox, QSizePolicy, QTableView, QHeaderView, QListWidget, QLabel, QTabWidget, QAbstractItemView
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QAction, QKeySequence
+from sql_formatter import SQLFormatter, KeywordCapitalizer
+from result_model import ResultTableModel, toggle_sort, sync_sort_indicator, show_memory_report
+from filter_bar import ColumnFilterBar
+from clipboard import copy_to_clipboard, COPY_FORMATS
+from instrumentation_panel import InstrumentationPanel
+from history_panel import HistoryPanel
+from fan_out_panel import FanOutPanel
+from object_explorer import ObjectExplorerPanel
+from table_selection import TableSelectionDispatcher
+from table_search import TableListModel, TableSearchProxyModel, TABLE_FILTER_DELAY_MS
 
 class UIComponents:
     def __init__(self):
         self.server_input = None
         self.database_list_widget = None
         self.tables_list_widget = None
+        self.tables_model = None
+        self.tables_proxy = None
+        self.table_selection = None
         self.sql_input = None
         self.output_table = None
+        self.output_tabs = None
+        self.filter_bar = None
+        self.refresh_button = None
+        self.fan_out_button = None
+        self.fan_out_panel = None
+        self.export_button = None
         self.formatter = None
+        self.capitalizer = None
         self.table_filter_input = None
+        self.table_filter_timer = None
+        self.favorites_button = None
         self.save_button = None
         self.info_label = None
+        self.execute_button = None
+        self.cancel_button = None
+        self.load_more_button = None
+        self.timings_button = None
+        self.history_button = None
+        self.history_panel = None
+        self.explorer_button = None
+        self.object_explorer = None
+        self.instrumentation_panel = None
+
+def create_result_view():
+    # Every result tab gets its own view and model
+    result_view = QTableView()
+    result_view.setModel(ResultTableModel(result_view))
+    result_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    result_view.verticalHeader().setDefaultSectionSize(result_view.fontMetrics().height() + 6)
+
+    # Sorting runs on the fetched columns in the model, never through the server
+    header = result_view.horizontalHeader()
+    header.setSectionsClickable(True)
+    header.setSortIndicatorShown(True)
+    header.setSortIndicator(-1, Qt.AscendingOrder)
+    header.sectionClicked.connect(lambda section: toggle_sort(result_view, section))
+    result_view.model().modelReset.connect(lambda: sync_sort_indicator(result_view))
+
+    # Copy actions build the clipboard text from the column arrays, not from cell items
+    result_view.setContextMenuPolicy(Qt.ActionsContextMenu)
+    for copy_format, title in COPY_FORMATS.items():
+        action = QAction(title, result_view)
+        action.triggered.connect(lambda checked=False, copy_format=copy_format: copy_to_clipboard(result_view, copy_format))
+        if copy_format == 'tsv':
+            action.setShortcut(QKeySequence.Copy)
+            action.setShortcutContext(Qt.WidgetShortcut)
+        result_view.addAction(action)
+    copy_all_action = QAction("Copy whole result", result_view)
+    copy_all_action.triggered.connect(lambda: copy_to_clipboard(result_view, 'tsv', whole_result=True))
+    result_view.addAction(copy_all_action)
+    memory_action = QAction("Memory report", result_view)
+    memory_action.triggered.connect(lambda: show_memory_report(result_view))
+    result_view.addAction(memory_action)
+    return result_view
+
+def create_sql_editor():
+    # Plain text only, so pasted markup is dropped and layout stays per block; colors come from the highlighter
+    sql_input = QPlainTextEdit()
+    sql_input.setStyleSheet("border: none; border-bottom: 1px solid lightgray;")
+    sql_input.setPlaceholderText("Write your SQL queries here")
+    formatter = SQLFormatter(sql_input.document())
+    capitalizer = KeywordCapitalizer(sql_input, formatter)
+    return sql_input, formatter, capitalizer
 
 def setup_ui(main_window):
     ui = UIComponents()
@@ -83,19 +155,72 @@ def setup_ui(main_window):
     ui.database_list_widget = QListWidget()
     list_splitter.addWidget(ui.database_list_widget)
     
-    # List widget for table buttons
-    ui.tables_list_widget = QListWidget()
+    # Tables list; the proxy shows the rows picked by the search index. A one-column table view only asks
+    # for the visible rows, where QListView lays out every row again after each filter
+    ui.tables_model = TableListModel(main_window)
+    ui.tables_proxy = TableSearchProxyModel(main_window)
+    ui.tables_proxy.setSourceModel(ui.tables_model)
+    ui.tables_list_widget = QTableView()
+    ui.tables_list_widget.setModel(ui.tables_proxy)
+    ui.tables_list_widget.horizontalHeader().setVisible(False)
+    ui.tables_list_widget.horizontalHeader().setStretchLastSection(True)
+    ui.tables_list_widget.verticalHeader().setVisible(False)
+    ui.tables_list_widget.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    ui.tables_list_widget.verticalHeader().setDefaultSectionSize(ui.tables_list_widget.fontMetrics().height() + 4)
+    ui.tables_list_widget.setShowGrid(False)
+    ui.tables_list_widget.setWordWrap(False)
+    ui.tables_list_widget.setSelectionBehavior(QAbstractItemView.SelectRows)
+    ui.tables_list_widget.setSelectionMode(QAbstractItemView.SingleSelection)
+    ui.tables_list_widget.setEditTriggers(QAbstractItemView.NoEditTriggers)
+    ui.tables_list_widget.setContextMenuPolicy(Qt.ActionsContextMenu)
+    favorite_action = QAction("Add to / remove from favorites", ui.tables_list_widget)
+    favorite_action.setShortcut(QKeySequence("Ctrl+D"))
+    favorite_action.setShortcutContext(Qt.WidgetShortcut)
+    favorite_action.triggered.connect(main_window.toggle_favorite_table)
+    ui.tables_list_widget.addAction(favorite_action)
+    clone_action = QAction("Clone table...", ui.tables_list_widget)
+    clone_action.triggered.connect(main_window.clone_table)
+    ui.tables_list_widget.addAction(clone_action)
+    # Connected once; database switches only replace the model's rows
+    ui.table_selection = TableSelectionDispatcher(main_window.load_query, main_window)
+    ui.tables_list_widget.clicked.connect(lambda index: ui.table_selection.select(index.data(Qt.UserRole)))
     list_splitter.addWidget(ui.tables_list_widget)
     
     # Set initial sizes for the lists
     list_splitter.setSizes([100, 200])
     
-    # Table filter input
+    # Table filter input, applied once typing pauses; "schema.table" and fuzzy input are both accepted
     ui.table_filter_input = QLineEdit()
     ui.table_filter_input.setPlaceholderText("Filter tables...")
     ui.table_filter_input.setStyleSheet("border: none; border-bottom: 1px solid lightgray;")
-    ui.table_filter_input.textChanged.connect(main_window.filter_tables)
-    sidebar_layout.addWidget(ui.table_filter_input)
+    ui.table_filter_timer = QTimer(main_window)
+    ui.table_filter_timer.setSingleShot(True)
+    ui.table_filter_timer.setInterval(TABLE_FILTER_DELAY_MS)
+    ui.table_filter_timer.timeout.connect(main_window.filter_tables)
+    ui.table_filter_input.textChanged.connect(ui.table_filter_timer.start)
+    
+    # Favorites button limits the list to starred tables
+    ui.favorites_button = QPushButton("★")
+    ui.favorites_button.setCheckable(True)
+    ui.favorites_button.setToolTip("Show favorite tables only (Ctrl+D on a table stars it)")
+    ui.favorites_button.setStyleSheet("""
+        QPushButton {
+            color: black;
+            background-color: lightGray;
+            border: 1px solid lightGray;
+            padding: 1px 6px;
+        }
+        QPushButton:hover, QPushButton:checked {
+            background-color: lightYellow;
+            border: 1px solid lightYellow;
+        }
+    """)
+    ui.favorites_button.toggled.connect(lambda checked: main_window.filter_tables())
+    
+    table_filter_layout = QHBoxLayout()
+    table_filter_layout.addWidget(ui.table_filter_input)
+    table_filter_layout.addWidget(ui.favorites_button)
+    sidebar_layout.addLayout(table_filter_layout)
     
     # Splitter for input and output
     content_splitter = QSplitter(Qt.Vertical)
@@ -123,8 +248,96 @@ def setup_ui(main_window):
     ui.save_button.setSizePolicy(QSizePolicy.Maximum, QSizePolicy.Fixed)
     ui.save_button.clicked.connect(main_window.save_query)
     
-    execute_button = QPushButton("Run >")
-    execute_button.setStyleSheet("""
+    ui.execute_button = QPushButton("Run >")
+    ui.execute_button.setStyleSheet("""
+        QPushButton {
+            font-weight: bold;
+            color: black;
+            background-color: lightGreen;
+            border: 1px solid lightGreen;
+            padding: 3px 6px;
+        }
+        QPushButton:hover {
+            background-color: lightYellow;
+            border: 1px solid lightYellow;
+        }
+    """)
+    ui.execute_button.clicked.connect(lambda: main_window.execute_sql())
+
+    # Runs the query on several databases or servers at once and merges the results
+    ui.fan_out_button = QPushButton("Run on...")
+    ui.fan_out_button.setStyleSheet("""
+        QPushButton {
+            font-weight: bold;
+            color: black;
+            background-color: lightGreen;
+            border: 1px solid lightGreen;
+            padding: 3px 6px;
+        }
+        QPushButton:hover {
+            background-color: lightYellow;
+            border: 1px solid lightYellow;
+        }
+        QPushButton:disabled {
+            color: gray;
+            background-color: lightGray;
+            border: 1px solid lightGray;
+        }
+    """)
+    ui.fan_out_button.clicked.connect(main_window.fan_out_query)
+    ui.fan_out_panel = FanOutPanel(main_window)
+    main_window.addDockWidget(Qt.BottomDockWidgetArea, ui.fan_out_panel)
+    ui.fan_out_panel.hide()
+
+    # Cancel button, only enabled while a query is running
+    ui.cancel_button = QPushButton("Cancel")
+    ui.cancel_button.setStyleSheet("""
+        QPushButton {
+            font-weight: bold;
+            color: black;
+            background-color: lightCoral;
+            border: 1px solid lightCoral;
+            padding: 3px 6px;
+        }
+        QPushButton:hover {
+            background-color: lightYellow;
+            border: 1px solid lightYellow;
+        }
+        QPushButton:disabled {
+            color: gray;
+            background-color: lightGray;
+            border: 1px solid lightGray;
+        }
+    """)
+    ui.cancel_button.setEnabled(False)
+    ui.cancel_button.clicked.connect(main_window.cancel_query)
+
+    # Load more button, enabled while the current result has unfetched rows
+    ui.load_more_button = QPushButton("Load more")
+    ui.load_more_button.setStyleSheet("""
+        QPushButton {
+            font-weight: bold;
+            color: black;
+            background-color: lightBlue;
+            border: 1px solid lightBlue;
+            padding: 3px 6px;
+        }
+        QPushButton:hover {
+            background-color: lightYellow;
+            border: 1px solid lightYellow;
+        }
+        QPushButton:disabled {
+            color: gray;
+            background-color: lightGray;
+            border: 1px solid lightGray;
+        }
+    """)
+    ui.load_more_button.setEnabled(False)
+    ui.load_more_button.clicked.connect(main_window.load_more_rows)
+
+    # Refresh button re-runs the query even when its result is cached
+    ui.refresh_button = QPushButton("Refresh")
+    ui.refresh_button.setStyleSheet("""
         QPushButton {
             font-weight: bold;
             color: black;
@@ -137,7 +350,30 @@ def setup_ui(main_window):
             border: 1px solid lightYellow;
         }
     """)
-    execute_button.clicked.connect(main_window.execute_sql)
+    ui.refresh_button.clicked.connect(main_window.refresh_query)
+
+    # Export button streams the query straight from the server into a file
+    ui.export_button = QPushButton("Export")
+    ui.export_button.setStyleSheet("""
+        QPushButton {
+            font-weight: bold;
+            color: black;
+            background-color: skyBlue;
+            border: 1px solid skyBlue;
+            padding: 3px 8px;
+        }
+        QPushButton:hover {
+            border: 1px solid lightYellow;
+            background-color: lightYellow;
+        }
+        QPushButton:disabled {
+            color: gray;
+            background-color: lightGray;
+            border: 1px solid lightGray;
+        }
+    """)
+    ui.export_button.setSizePolicy(QSizePolicy.Maximum, QSizePolicy.Fixed)
+    ui.export_button.clicked.connect(main_window.export_results)
 
     # Schema button with custom style
     schema_button = QPushButton("Schema")
@@ -156,19 +392,93 @@ def setup_ui(main_window):
     """)
     schema_button.clicked.connect(main_window.show_table_schema)
     
+    # Timings button shows the dockable panel with per-phase timings of recent operations
+    ui.timings_button = QPushButton("Timings")
+    ui.timings_button.setCheckable(True)
+    ui.timings_button.setStyleSheet("""
+        QPushButton {
+            font-weight: bold;
+            color: black;
+            background-color: lightGray;
+            border: 1px solid lightGray;
+            padding: 3px 6px;
+        }
+        QPushButton:hover, QPushButton:checked {
+            background-color: lightYellow;
+            border: 1px solid lightYellow;
+        }
+    """)
+    ui.instrumentation_panel = InstrumentationPanel(main_window)
+    main_window.addDockWidget(Qt.BottomDockWidgetArea, ui.instrumentation_panel)
+    ui.instrumentation_panel.hide()
+    ui.timings_button.toggled.connect(ui.instrumentation_panel.setVisible)
+    ui.instrumentation_panel.visibilityChanged.connect(ui.timings_button.setChecked)
+    
+    # History button shows the searchable list of executed queries
+    ui.history_button = QPushButton("History")
+    ui.history_button.setCheckable(True)
+    ui.history_button.setStyleSheet("""
+        QPushButton {
+            font-weight: bold;
+            color: black;
+            background-color: lightGray;
+            border: 1px solid lightGray;
+            padding: 3px 6px;
+        }
+        QPushButton:hover, QPushButton:checked {
+            background-color: lightYellow;
+            border: 1px solid lightYellow;
+        }
+    """)
+    ui.history_panel = HistoryPanel(main_window.query_history, main_window)
+    main_window.addDockWidget(Qt.RightDockWidgetArea, ui.history_panel)
+    ui.history_panel.hide()
+    ui.history_button.toggled.connect(ui.history_panel.setVisible)
+    ui.history_panel.visibilityChanged.connect(ui.history_button.setChecked)
+    ui.history_panel.query_selected.connect(main_window.load_history_query)
+    
+    # Explorer button shows the lazily loaded tree of databases, schemas, objects, columns and indexes
+    ui.explorer_button = QPushButton("Explorer")
+    ui.explorer_button.setCheckable(True)
+    ui.explorer_button.setStyleSheet("""
+        QPushButton {
+            font-weight: bold;
+            color: black;
+            background-color: lightGray;
+            border: 1px solid lightGray;
+            padding: 3px 6px;
+        }
+        QPushButton:hover, QPushButton:checked {
+            background-color: lightYellow;
+            border: 1px solid lightYellow;
+        }
+    """)
+    ui.object_explorer = ObjectExplorerPanel(
+        lambda database_name: main_window.engine_registry.get_engine(main_window.current_server, database_name), main_window)
+    main_window.addDockWidget(Qt.LeftDockWidgetArea, ui.object_explorer)
+    ui.object_explorer.hide()
+    ui.explorer_button.toggled.connect(ui.object_explorer.setVisible)
+    ui.object_explorer.visibilityChanged.connect(ui.explorer_button.setChecked)
+    ui.object_explorer.object_activated.connect(main_window.open_explorer_object)
+    
     # Align the Execute, Schema, and Save buttons
     button_bar_layout = QHBoxLayout()
-    button_bar_layout.addWidget(execute_button)
+    button_bar_layout.addWidget(ui.execute_button)
+    button_bar_layout.addWidget(ui.fan_out_button)
+    button_bar_layout.addWidget(ui.cancel_button)
+    button_bar_layout.addWidget(ui.load_more_button)
+    button_bar_layout.addWidget(ui.refresh_button)
     button_bar_layout.addWidget(schema_button)  # Add Schema button here
     button_bar_layout.addStretch()
+    button_bar_layout.addWidget(ui.explorer_button)
+    button_bar_layout.addWidget(ui.history_button)
+    button_bar_layout.addWidget(ui.timings_button)
+    button_bar_layout.addWidget(ui.export_button)
     button_bar_layout.addWidget(ui.save_button)
     sql_input_layout.addLayout(button_bar_layout)
     
     # SQL input
-    ui.sql_input = QTextEdit()
-    ui.sql_input.setStyleSheet("border: none; border-bottom: 1px solid lightgray;")
-    ui.sql_input.setAcceptRichText(True)
-    ui.sql_input.setPlaceholderText("Write your SQL queries here")
+    ui.sql_input, ui.formatter, ui.capitalizer = create_sql_editor()
     sql_input_layout.addWidget(ui.sql_input)
     
     # Information label for table name and record count
@@ -176,17 +486,30 @@ def setup_ui(main_window):
 
     sql_input_layout.addWidget(ui.info_label)
 
-    # Apply SQL formatter
-    ui.formatter = SQLFormatter(ui.sql_input.document())
-    
     # Add SQL input layout to a widget and then to the splitter
     sql_input_widget = QWidget()
     sql_input_widget.setLayout(sql_input_layout)
     content_splitter.addWidget(sql_input_widget)
     
     # Output table
-    ui.output_table = QTableWidget()
-    content_splitter.addWidget(ui.output_table)
+    # Output tabs; output_table always points at the view of the current tab
+    ui.output_tabs = QTabWidget()
+    ui.output_tabs.setTabsClosable(True)
+    ui.output_tabs.setDocumentMode(True)
+    ui.output_table = create_result_view()
+    ui.output_tabs.addTab(ui.output_table, "Results")
+
+    # Per-column filter bar above the tabs, bound to the current result view
+    ui.filter_bar = ColumnFilterBar()
+    ui.filter_bar.bind(ui.output_table)
+    output_layout = QVBoxLayout()
+    output_layout.setContentsMargins(0, 0, 0, 0)
+    output_layout.setSpacing(0)
+    output_layout.addWidget(ui.filter_bar)
+    output_layout.addWidget(ui.output_tabs)
+    output_widget = QWidget()
+    output_widget.setLayout(output_layout)
+    content_splitter.addWidget(output_widget)
     
     # Set initial sizes for the input and output fields
     content_splitter.setSizes([300, 700])